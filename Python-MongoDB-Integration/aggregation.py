@@ -0,0 +1,306 @@
+"""
+Aggregation pipeline engine for the in-memory MockCollection.
+Each stage is a generator over the documents produced by the previous one,
+so a pipeline never materializes more than the stage in flight needs.
+A leading $match is answered through the collection's indexes, and a
+$sort followed by $limit keeps only the top k documents in a bounded heap.
+"""
+
+import heapq
+from itertools import islice
+
+from indexes import index_key, sort_rank
+from query_compiler import compile_query
+
+_MISSING = object()
+
+
+def field_value(doc, path, default=None):
+    """Return the value at a dotted field path, or default if it is missing"""
+    value = doc
+    for part in path.split("."):
+        try:
+            value = value[part]
+        except (KeyError, TypeError, IndexError):
+            return default
+    return value
+
+
+def evaluate(doc, expr):
+    """Evaluate an aggregation expression ("$field", literal or sub-document)"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return field_value(doc, expr[1:])
+    if isinstance(expr, dict):
+        if "$literal" in expr:
+            return expr["$literal"]
+        return {key: evaluate(doc, value) for key, value in expr.items()}
+    return expr
+
+
+def sort_value(value):
+    """Order key following MongoDB's cross-type order: null < numbers < strings < ..."""
+    if value is None or value is _MISSING:
+        return (0,)
+    rank = sort_rank(value)
+    if rank is None:
+        return (5, repr(value))
+    return (1 + rank, value)
+
+
+class _SortKey:
+    """Comparable key for a document under a multi-field $sort spec"""
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for mine, theirs, direction in zip(self.values, other.values, self.directions):
+            if mine != theirs:
+                return (mine < theirs) if direction > 0 else (theirs < mine)
+        return False
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+
+def sort_key(spec):
+    """Return a key function ordering documents by a $sort spec"""
+    fields = list(spec)
+    directions = [spec[field] for field in fields]
+
+    def key(doc):
+        values = [sort_value(field_value(doc, field, _MISSING)) for field in fields]
+        return _SortKey(values, directions)
+
+    return key
+
+
+# ---- stages ----------------------------------------------------------------
+
+def _match(docs, query):
+    return filter(compile_query(query), docs)
+
+
+def _sort(docs, spec, limit=None):
+    """Full stable sort, or a bounded heap of the first limit documents, run on first next()"""
+    key = sort_key(spec)
+    if limit is None:
+        yield from sorted(docs, key=key)
+    else:
+        yield from heapq.nsmallest(limit, docs, key=key)
+
+
+def _skip(docs, count):
+    return islice(docs, count, None)
+
+
+def _limit(docs, count):
+    return islice(docs, count)
+
+
+def _project(docs, spec):
+    include_id = bool(spec.get("_id", 1))
+    computed = {}
+    excluded = []
+    for key, value in spec.items():
+        if key == "_id":
+            continue
+        if isinstance(value, (bool, int, float)):
+            if value:
+                computed[key] = _MISSING
+            else:
+                excluded.append(key)
+        else:
+            computed[key] = value
+    if computed and excluded:
+        raise ValueError(f"Cannot mix inclusion and exclusion in $project: {spec}")
+    if excluded or not computed:
+        dropped = set(excluded) if include_id else set(excluded) | {"_id"}
+        for doc in docs:
+            yield {key: value for key, value in doc.items() if key not in dropped}
+        return
+    for doc in docs:
+        out = {}
+        if include_id and "_id" in doc:
+            out["_id"] = doc["_id"]
+        for key, expr in computed.items():
+            if expr is _MISSING:
+                if key in doc:
+                    out[key] = doc[key]
+            else:
+                value = evaluate(doc, expr)
+                if value is not None:
+                    out[key] = value
+        yield out
+
+
+ACCUMULATORS = ("$sum", "$avg", "$first", "$max", "$min")
+
+
+class _Accumulator:
+    """Running state for one accumulator field of a $group"""
+    __slots__ = ("op", "expr", "value", "count")
+
+    def __init__(self, op, expr):
+        if op not in ACCUMULATORS:
+            raise ValueError(f"Unsupported $group accumulator: {op}")
+        self.op = op
+        self.expr = expr
+        self.value = _MISSING
+        self.count = 0
+
+    def add(self, doc):
+        value = evaluate(doc, self.expr)
+        op = self.op
+        if op == "$first":
+            if self.value is _MISSING:
+                self.value = value
+        elif op in ("$sum", "$avg"):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.value = value if self.value is _MISSING else self.value + value
+                self.count += 1
+        elif value is not None:
+            if self.value is _MISSING:
+                self.value = value
+            elif op == "$max" and sort_value(self.value) < sort_value(value):
+                self.value = value
+            elif op == "$min" and sort_value(value) < sort_value(self.value):
+                self.value = value
+
+    def merge(self, other):
+        """Fold in an accumulator of the same field that saw the documents after this one's"""
+        if other.value is _MISSING:
+            return
+        if self.value is _MISSING:
+            self.value, self.count = other.value, other.count
+        elif self.op in ("$sum", "$avg"):
+            self.value += other.value
+            self.count += other.count
+        elif self.op == "$max" and sort_value(self.value) < sort_value(other.value):
+            self.value = other.value
+        elif self.op == "$min" and sort_value(other.value) < sort_value(self.value):
+            self.value = other.value
+
+    def result(self):
+        if self.op == "$sum":
+            return 0 if self.value is _MISSING else self.value
+        if self.value is _MISSING:
+            return None
+        if self.op == "$avg":
+            return self.value / self.count
+        return self.value
+
+
+def group_states(docs, spec):
+    """Per-group (group _id, [(name, accumulator)], first document), in first-seen order"""
+    id_expr = spec["_id"]
+    fields = [(key, next(iter(acc.items()))) for key, acc in spec.items() if key != "_id"]
+    groups = {}
+    for doc in docs:
+        group_id = evaluate(doc, id_expr)
+        key = index_key(group_id)
+        group = groups.get(key)
+        if group is None:
+            accs = [(name, _Accumulator(op, expr)) for name, (op, expr) in fields]
+            group = groups[key] = (group_id, accs, doc)
+        for _, acc in group[1]:
+            acc.add(doc)
+    return groups
+
+
+def group_output(states):
+    """Output documents of the (group _id, accumulators, ...) states of a $group"""
+    for group_id, accs, *_ in states:
+        out = {"_id": group_id}
+        for name, acc in accs:
+            out[name] = acc.result()
+        yield out
+
+
+def _group(docs, spec):
+    yield from group_output(group_states(docs, spec).values())
+
+
+STAGES = {
+    "$match": _match,
+    "$group": _group,
+    "$sort": _sort,
+    "$project": _project,
+    "$limit": _limit,
+    "$skip": _skip,
+}
+
+
+def _stage(stage):
+    if len(stage) != 1:
+        raise ValueError(f"A pipeline stage must have exactly one operator: {stage}")
+    name, spec = next(iter(stage.items()))
+    if name not in STAGES:
+        raise ValueError(f"Unsupported pipeline stage: {name}")
+    return name, spec
+
+
+def _top_k(stages):
+    """Number of sorted documents the stages after a $sort can consume, or None for all"""
+    skip = 0
+    for name, spec in stages:
+        if name == "$skip":
+            skip += spec
+        elif name == "$limit":
+            return skip + spec
+        else:
+            return None
+    return None
+
+
+def _parallel_group(parallel, stages):
+    """(group documents, remaining stages) when a leading [$match,] $group runs in the pool"""
+    query = stages[0][1] if stages and stages[0][0] == "$match" else None
+    rest = stages[1:] if query is not None else stages
+    if not rest or rest[0][0] != "$group":
+        return None
+    spec = rest[0][1]
+    key = spec.get("_id")
+    if not (isinstance(key, str) and key.startswith("$")):
+        return None
+    accumulators = {name: acc for name, acc in spec.items() if name != "_id"}
+    docs = parallel.group(key[1:], accumulators, query)
+    if docs is None:
+        return None
+    return iter(docs), rest[1:]
+
+
+def apply_stages(docs, stages, probe=None):
+    """Run parsed (name, spec) stages over the docs iterator"""
+    for i, (name, spec) in enumerate(stages):
+        if name == "$sort":
+            docs = _sort(docs, spec, _top_k(stages[i + 1:]))
+        else:
+            docs = STAGES[name](docs, spec)
+        if probe is not None:
+            docs = probe(docs)
+    return docs
+
+
+def run_pipeline(collection, pipeline, probe=None):
+    """
+    Return an iterator over the documents produced by pipeline over collection.
+    probe(docs), if given, wraps the initial scan and the output of every stage.
+    """
+    stages = [_stage(stage) for stage in pipeline]
+    grouped = None
+    if getattr(collection, "parallel", None) is not None and probe is None:
+        grouped = _parallel_group(collection.parallel, stages)
+    if grouped is not None:
+        docs, stages = grouped
+    elif stages and stages[0][0] == "$match":
+        docs = iter(collection._iter_matches(stages[0][1]))
+        stages = stages[1:]
+    else:
+        # The same store scan find() uses, so writes during the pipeline are safe
+        docs = iter(collection._iter_matches(None))
+    if probe is not None:
+        docs = probe(docs)
+    return apply_stages(docs, stages, probe)
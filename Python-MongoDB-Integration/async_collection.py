@@ -0,0 +1,135 @@
+"""
+asyncio interface over a synchronous collection.
+Every operation runs in a thread pool, so the event loop never blocks on
+the collection. The wrapped collection must be safe to call from several
+threads: a PyMongo Collection or a concurrency.ThreadSafeCollection.
+The method names and cursor surface follow PyMongo's async API
+(await insert_many, async-iterable find cursors, await aggregate), so the
+same coroutines also run against pymongo.AsyncMongoClient collections.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from cursor import Cursor
+
+
+class AsyncCursor:
+    """Async-iterable cursor; batches are fetched in the executor"""
+
+    def __init__(self, collection, open_cursor):
+        self._collection = collection
+        self._open_cursor = open_cursor
+        self._modifiers = []
+        self._cursor = None
+        self._batch = []
+        self._batch_size = Cursor.DEFAULT_BATCH_SIZE
+
+    def _modify(self, name, *args):
+        if self._cursor is not None:
+            raise RuntimeError("cannot set options after executing query")
+        self._modifiers.append((name, args))
+        return self
+
+    def limit(self, limit):
+        return self._modify("limit", limit)
+
+    def skip(self, skip):
+        return self._modify("skip", skip)
+
+    def sort(self, key_or_list, direction=None):
+        return self._modify("sort", key_or_list, direction)
+
+    def batch_size(self, batch_size):
+        if batch_size:
+            self._batch_size = batch_size
+        return self._modify("batch_size", batch_size)
+
+    def _fetch(self):
+        """Runs in the executor: open the cursor on first use, then read one batch"""
+        if self._cursor is None:
+            cursor = self._open_cursor()
+            for name, args in self._modifiers:
+                cursor = getattr(cursor, name)(*args)
+            self._cursor = iter(cursor)
+        return list(islice(self._cursor, self._batch_size))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._batch:
+            self._batch = await self._collection._run(self._fetch)
+            if not self._batch:
+                raise StopAsyncIteration
+            self._batch.reverse()
+        return self._batch.pop()
+
+    async def to_list(self, length=None):
+        """Return the remaining documents (at most length of them) as a list"""
+        docs = []
+        async for doc in self:
+            docs.append(doc)
+            if length is not None and len(docs) >= length:
+                break
+        return docs
+
+
+class AsyncCollection:
+    """Awaitable CRUD methods for a thread-safe synchronous collection"""
+
+    def __init__(self, collection, executor=None, max_workers=8):
+        self.collection = collection
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def create_index(self, *args, **kwargs):
+        return await self._run(self.collection.create_index, *args, **kwargs)
+
+    async def insert_one(self, doc):
+        return await self._run(self.collection.insert_one, doc)
+
+    async def insert_many(self, docs, **kwargs):
+        return await self._run(self.collection.insert_many, docs, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run(self.collection.find_one, *args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self, partial(self.collection.find, *args, **kwargs))
+
+    async def count_documents(self, query, **kwargs):
+        return await self._run(self.collection.count_documents, query, **kwargs)
+
+    async def update_one(self, query, update, **kwargs):
+        return await self._run(self.collection.update_one, query, update, **kwargs)
+
+    async def update_many(self, query, update, **kwargs):
+        return await self._run(self.collection.update_many, query, update, **kwargs)
+
+    async def replace_one(self, query, replacement, **kwargs):
+        return await self._run(self.collection.replace_one, query, replacement, **kwargs)
+
+    async def delete_one(self, query, **kwargs):
+        return await self._run(self.collection.delete_one, query, **kwargs)
+
+    async def delete_many(self, query, **kwargs):
+        return await self._run(self.collection.delete_many, query, **kwargs)
+
+    async def bulk_write(self, requests, **kwargs):
+        return await self._run(self.collection.bulk_write, requests, **kwargs)
+
+    async def aggregate(self, pipeline, **kwargs):
+        """Start the pipeline in the executor and return an async cursor over its output"""
+        results = await self._run(self.collection.aggregate, pipeline, **kwargs)
+        return AsyncCursor(self, lambda: results)
+
+    def close(self):
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
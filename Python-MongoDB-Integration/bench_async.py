@@ -0,0 +1,68 @@
+"""
+Benchmark: crud_async workflow, sequential vs concurrent
+Runs the workflow on an AsyncCollection over a ThreadSafeCollection whose
+calls each wait a simulated server round trip first (0 ms is the bare
+in-memory mock). Reports the best wall-clock time of several runs for the
+sequential and the asyncio.gather versions.
+Usage: python bench_async.py [latency_ms ...]
+"""
+
+import asyncio
+import sys
+import time
+from functools import wraps
+
+from async_collection import AsyncCollection
+from concurrency import ThreadSafeCollection
+from crud_async import timed_workflow
+
+LATENCIES_MS = (0, 1, 5)
+RUNS = 5
+
+
+class RemoteCollection:
+    """Proxy that sleeps for one round trip before every collection call"""
+
+    def __init__(self, collection, latency):
+        self.collection = collection
+        self.latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        @wraps(method)
+        def call(*args, **kwargs):
+            time.sleep(self.latency)
+            return method(*args, **kwargs)
+        return call
+
+
+async def best_time(students, concurrent):
+    times = []
+    for _ in range(RUNS):
+        _, seconds = await timed_workflow(students, concurrent)
+        times.append(seconds)
+    return min(times)
+
+
+async def measure(latency):
+    students = AsyncCollection(RemoteCollection(ThreadSafeCollection(), latency))
+    try:
+        sequential = await best_time(students, concurrent=False)
+        concurrent = await best_time(students, concurrent=True)
+    finally:
+        students.close()
+    return sequential, concurrent
+
+
+def main():
+    latencies = [float(arg) for arg in sys.argv[1:]] or LATENCIES_MS
+    print(f"\n{'latency ms':>10} {'sequential ms':>14} {'concurrent ms':>14} {'speedup':>8}")
+    for latency in latencies:
+        sequential, concurrent = asyncio.run(measure(latency / 1000))
+        print(f"{latency:>10g} {sequential * 1000:>14.1f} {concurrent * 1000:>14.1f} "
+              f"{sequential / concurrent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
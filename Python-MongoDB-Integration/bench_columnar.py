@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: dict-per-document MockCollection vs ColumnarCollection
+Measures numeric filters, counts and DataFrame conversion over the same
+student documents stored row-wise and column-wise.
+"""
+
+import time
+
+import pandas as pd
+
+from bench_query_compiler import make_docs
+from columnar import ColumnarCollection
+from crud_demo import MockCollection
+
+DOCS = 200_000
+REPEAT = 5
+
+QUERIES = [
+    {"gpa": {"$gte": 3.7}},
+    {"gpa": {"$gte": 3.7}, "dept": "CS"},
+    {"age": {"$gt": 20, "$lte": 23}, "gpa": {"$lt": 3.0}},
+]
+
+
+def best_of(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load(collection, docs):
+    for doc in docs:
+        del doc["_id"]
+    collection.insert_many(docs)
+    return collection
+
+
+def main():
+    rows = load(MockCollection(), make_docs(DOCS))
+    columns = load(ColumnarCollection(), make_docs(DOCS))
+    print(f"\nMockCollection vs ColumnarCollection over {DOCS:,} documents (best of {REPEAT})\n")
+    print(f"{'operation':<72} {'dict ms':>9} {'columnar ms':>12} {'speedup':>8}")
+
+    def report(label, row_fn, column_fn):
+        row_time = best_of(row_fn)
+        column_time = best_of(column_fn)
+        print(
+            f"{label:<72} {row_time * 1e3:>9.1f} "
+            f"{column_time * 1e3:>12.1f} {row_time / column_time:>7.1f}x"
+        )
+
+    for query in QUERIES:
+        report(
+            f"count {query}",
+            lambda: rows.count_documents(query),
+            lambda: columns.count_documents(query),
+        )
+    query = QUERIES[1]
+    report(
+        f"DataFrame {query}",
+        lambda: pd.DataFrame(rows.find(query)),
+        lambda: columns.find_dataframe(query),
+    )
+    report(
+        "mean gpa of CS students",
+        lambda: pd.DataFrame(rows.find({"dept": "CS"}))["gpa"].mean(),
+        lambda: columns.column("gpa", {"dept": "CS"}).mean(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: mixed read/write workload on ThreadSafeCollection
+Each thread runs a 90% read / 10% write mix (indexed find_one, counts,
+small finds; inserts and updates) for a fixed time. Reports total
+operations per second at 1, 4 and 16 threads, plus an unlocked
+single-threaded MockCollection as the baseline.
+Usage: python bench_concurrency.py [seconds]
+"""
+
+import itertools
+import random
+import sys
+import threading
+import time
+
+from bench_query_compiler import make_docs
+from concurrency import ThreadSafeCollection
+from crud_demo import MockCollection
+
+DOCS = 50_000
+THREADS = (1, 4, 16)
+WRITE_RATIO = 0.1
+
+# Shared across threads and runs so inserted student_ids never collide
+_next_id = itertools.count()
+
+
+def load(factory=ThreadSafeCollection):
+    docs = make_docs(DOCS)
+    for doc in docs:
+        del doc["_id"]
+    students = factory()
+    students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.create_index("gpa", kind="sorted")
+    students.insert_many(docs)
+    return students
+
+
+def worker(students, seed, deadline, counts):
+    rng = random.Random(seed)
+    ops = 0
+    while time.perf_counter() < deadline:
+        if rng.random() < WRITE_RATIO:
+            if rng.random() < 0.5:
+                students.insert_one({
+                    "name": f"Worker {seed}",
+                    "student_id": f"W{next(_next_id)}",
+                    "age": rng.randint(18, 25),
+                    "dept": rng.choice(["CS", "ENG", "MATH"]),
+                    "gpa": round(rng.uniform(2.0, 4.0), 2),
+                })
+            else:
+                students.update_one(
+                    {"student_id": f"STU{rng.randrange(DOCS):05d}"},
+                    {"$set": {"gpa": round(rng.uniform(2.0, 4.0), 2)}},
+                )
+        else:
+            pick = rng.random()
+            if pick < 0.6:
+                students.find_one({"student_id": f"STU{rng.randrange(DOCS):05d}"})
+            elif pick < 0.8:
+                students.count_documents({"gpa": {"$gte": 3.7}})
+            else:
+                students.find({"dept": "CS"}).limit(10).to_list()
+        ops += 1
+    counts.append(ops)
+
+
+def run(students, threads, seconds):
+    counts = []
+    deadline = time.perf_counter() + seconds
+    pool = [
+        threading.Thread(target=worker, args=(students, seed, deadline, counts))
+        for seed in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    print(f"\nMixed workload ({1 - WRITE_RATIO:.0%} reads) on {DOCS:,} documents, "
+          f"{seconds:g} s per run\n")
+    print(f"{'collection':<22} {'threads':>8} {'ops/s':>10}")
+    baseline = run(load(MockCollection), 1, seconds)
+    print(f"{'MockCollection':<22} {1:>8} {baseline:>10,.0f}")
+    students = load()
+    for threads in THREADS:
+        print(f"{'ThreadSafeCollection':<22} {threads:>8} {run(students, threads, seconds):>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: per-department counts, count_documents loop vs count_by()
+Times one count_documents() call per department against a single
+count_by("dept") call, without an index on dept (scans), with a hash index
+(index-only), and with a filter that forces a scan of the matches.
+Usage: python bench_count_by.py [rows]
+"""
+
+import sys
+import time
+
+from bench_query_compiler import make_docs
+from counting import count_by
+from crud_demo import MockCollection
+
+ROWS = 200_000
+REPEAT = 5
+FILTER = {"gpa": {"$gte": 3.0}}
+
+
+def best(fn):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load(rows, indexed):
+    students = MockCollection()
+    if indexed:
+        students.create_index("dept")
+    students.insert_many(make_docs(rows))
+    return students
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    print(f"\n{rows:,} documents, best of {REPEAT}\n")
+    print(f"{'case':<24} {'per-value loop ms':>18} {'count_by ms':>12}")
+    for label, indexed, query in (
+        ("no index", False, {}),
+        ("hash index on dept", True, {}),
+        ("hash index + filter", True, FILTER),
+    ):
+        students = load(rows, indexed)
+        depts = sorted(key for key in count_by(students, "dept") if key is not None)
+
+        def loop():
+            return {dept: students.count_documents({**query, "dept": dept}) for dept in depts}
+
+        expected = loop()
+        grouped = count_by(students, "dept", query)
+        assert all(grouped.get(dept, 0) == count for dept, count in expected.items())
+        print(f"{label:<24} {best(loop) * 1000:>18.3f} "
+              f"{best(lambda: count_by(students, 'dept', query)) * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark: peak memory of MockCollection.find results
+Compares materializing a projected find() into a list (the old behaviour)
+with streaming the lazy cursor, and times sort + limit against a full sort.
+"""
+
+import time
+import tracemalloc
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+
+PROJECTION = {"name": 1, "student_id": 1, "gpa": 1}
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def drain(cursor):
+    for _ in cursor:
+        pass
+
+
+def elapsed_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    print(f"\n{'documents':>10} {'list KiB':>10} {'cursor KiB':>11}")
+    for n in (10_000, 100_000, 300_000):
+        docs = make_docs(n)
+        for doc in docs:
+            del doc["_id"]
+        students = MockCollection()
+        students.insert_many(docs)
+        eager = peak_kib(lambda: list(students.find({}, PROJECTION)))
+        lazy = peak_kib(lambda: drain(students.find({}, PROJECTION)))
+        print(f"{n:>10,} {eager:>10.0f} {lazy:>11.0f}")
+
+    full = elapsed_ms(lambda: students.find().sort("gpa", -1).to_list()[:10])
+    top_k = elapsed_ms(lambda: students.find().sort("gpa", -1).limit(10).to_list())
+    print(f"\nTop 10 by gpa over {n:,} documents: full sort {full:.1f} ms, "
+          f"sort + limit {top_k:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: peak memory of converting a find() result to a DataFrame
+Compares list(find()) + pd.DataFrame (as crud_examples.dataframe_operations
+used to do) with dataframes.find_to_dataframe at 1M rows.
+Usage: python bench_dataframe.py [rows]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from bench_query_compiler import make_docs
+from columnar import STUDENT_SCHEMA
+from crud_demo import MockCollection
+from dataframes import find_to_dataframe
+
+ROWS = 1_000_000
+# Inclusion projection: MockCollection copies each document, as PyMongo decoding does
+PROJECTION = {field: 1 for field in STUDENT_SCHEMA}
+
+
+def measure(fn):
+    """Return (result, seconds, peak MiB) for fn()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    docs = make_docs(rows)
+    for doc in docs:
+        del doc["_id"]
+    students = MockCollection()
+    students.insert_many(docs)
+    del docs
+
+    print(f"\nfind() -> DataFrame over {rows:,} documents\n")
+    print(f"{'method':<28} {'seconds':>8} {'peak MiB':>9} {'frame MiB':>10}")
+    methods = [
+        ("list + pd.DataFrame", lambda: pd.DataFrame(list(students.find({}, PROJECTION)))),
+        ("find_to_dataframe", lambda: find_to_dataframe(
+            students, {}, PROJECTION, schema=STUDENT_SCHEMA)),
+    ]
+    for label, fn in methods:
+        df, elapsed, peak = measure(fn)
+        size = df.memory_usage(deep=True).sum() / 2**20
+        print(f"{label:<28} {elapsed:>8.2f} {peak:>9.1f} {size:>10.1f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
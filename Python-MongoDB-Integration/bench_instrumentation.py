@@ -0,0 +1,74 @@
+"""
+Benchmark: cost of the instrumentation hooks on MockCollection operations
+Times indexed find_one, update_one, count_documents and a small find on a
+100k-document collection three ways: calling the method without the hook wrapper, with
+no listener attached (the default) and with a MetricsCollector attached.
+Usage: python bench_instrumentation.py [documents]
+"""
+
+import sys
+import time
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+from instrumentation import MetricsCollector, instrument, uninstrument
+
+DOCS = 100_000
+RUNS = 20_000
+
+
+def load(n):
+    students = MockCollection()
+    students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.insert_many(make_docs(n))
+    return students
+
+
+def operations(n):
+    """name -> (method, args) for the operations measured"""
+    return {
+        "find_one": (MockCollection.find_one, lambda i: ({"student_id": f"STU{i % n:05d}"},)),
+        "update_one": (
+            MockCollection.update_one,
+            lambda i: ({"student_id": f"STU{i % n:05d}"}, {"$set": {"flag": i}}),
+        ),
+        "count_documents": (MockCollection.count_documents, lambda i: ({"dept": "CS"},)),
+        "find_limit_10": (
+            None, lambda i: ({"dept": "MATH"},),
+        ),
+    }
+
+
+def timed(call, make_args, runs):
+    args = [make_args(i) for i in range(runs)]
+    start = time.perf_counter()
+    for arg in args:
+        call(*arg)
+    return (time.perf_counter() - start) / runs * 1_000_000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DOCS
+    students = load(n)
+    metrics = MetricsCollector(by="operation")
+    print(f"\n{RUNS:,} calls per operation on {n:,} documents (µs per call)\n")
+    print(f"{'operation':<16} {'unhooked':>12} {'no listener':>12} {'metrics':>12}")
+    for name, (method, make_args) in operations(n).items():
+        if method is None:
+            call = lambda query: students.find(query).limit(10).to_list()
+            raw = None
+        else:
+            call = getattr(students, name)
+            raw = timed(lambda *a: method.__wrapped__(students, *a), make_args, RUNS)
+        off = timed(call, make_args, RUNS)
+        instrument(students, metrics)
+        on = timed(call, make_args, RUNS)
+        uninstrument(students)
+        raw = "-" if raw is None else f"{raw:.2f}"
+        print(f"{name:<16} {raw:>12} {off:>12.2f} {on:>12.2f}")
+    print("\n" + metrics.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: reopening a DurableCollection vs re-inserting the fixtures
+Loads ROWS documents once, snapshots them, then times a cold reopen
+(snapshot via mmap + log replay) against insert_many into a fresh
+MockCollection with the same indexes.
+Usage: python bench_persistence.py [rows]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+from persistence import DurableCollection
+
+ROWS = 1_000_000
+LOG_TAIL = 10_000
+
+
+def fixtures(n):
+    docs = make_docs(n)
+    for doc in docs:
+        del doc["_id"]
+    return docs
+
+
+def with_indexes(collection):
+    collection.create_index("student_id", unique=True)
+    collection.create_index("dept")
+    return collection
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    path = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        with with_indexes(DurableCollection(path, snapshot_every=0)) as students:
+            students.insert_many(fixtures(rows - LOG_TAIL))
+            students.snapshot()
+            # Leave some records in the log so reopening also replays
+            students.insert_many(fixtures(rows)[-LOG_TAIL:])
+        write = time.perf_counter() - start
+
+        docs = fixtures(rows)
+        start = time.perf_counter()
+        with_indexes(MockCollection()).insert_many(docs)
+        insert = time.perf_counter() - start
+        del docs
+
+        start = time.perf_counter()
+        with DurableCollection(path) as students:
+            reopen = time.perf_counter() - start
+            count = students.count_documents({})
+    finally:
+        shutil.rmtree(path)
+
+    print(f"\n{count:,} documents ({LOG_TAIL:,} replayed from the log)\n")
+    print(f"initial durable load + snapshot  {write:>7.2f} s")
+    print(f"insert_many into MockCollection  {insert:>7.2f} s")
+    print(f"reopen DurableCollection         {reopen:>7.2f} s  ({insert / reopen:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: read-heavy workload with and without the query result cache
+A fixed set of count_documents, count_by, find and aggregate queries is
+repeated with a small share of writes mixed in: updates to a field no
+query depends on (they keep cached entries valid) and updates to gpa
+(they invalidate the entries that filter or group on gpa).
+Usage: python bench_query_cache.py [operations]
+"""
+
+import random
+import sys
+import time
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+
+DOCS = 20_000
+OPERATIONS = 1_000
+WRITE_RATIO = 0.05
+
+QUERIES = [
+    ("count", {"dept": "CS"}),
+    ("count", {"gpa": {"$gte": 3.7}}),
+    ("count", {"age": {"$gt": 20}}),
+    ("count_by", {"age": {"$gt": 20}}),
+    ("find", {"dept": "MATH", "age": {"$lt": 20}}),
+    ("aggregate", [{"$group": {"_id": "$dept", "avg_gpa": {"$avg": "$gpa"}}}]),
+]
+
+
+def load(cached):
+    students = MockCollection()
+    students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.insert_many(make_docs(DOCS))
+    cache = students.enable_cache() if cached else None
+    return students, cache
+
+
+def run(students, operations, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(operations):
+        if rng.random() < WRITE_RATIO:
+            field = "name" if rng.random() < 0.8 else "gpa"
+            value = f"Renamed {rng.random()}" if field == "name" else round(rng.uniform(2.0, 4.0), 2)
+            students.update_one(
+                {"student_id": f"STU{rng.randrange(DOCS):05d}"}, {"$set": {field: value}}
+            )
+            continue
+        kind, arg = rng.choice(QUERIES)
+        if kind == "count":
+            students.count_documents(arg)
+        elif kind == "count_by":
+            students.count_by("dept", arg)
+        elif kind == "find":
+            students.find(arg).sort("gpa", -1).limit(20).to_list()
+        else:
+            list(students.aggregate(arg))
+    return time.perf_counter() - start
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS
+    print(f"\n{operations:,} operations ({WRITE_RATIO:.0%} writes) on {DOCS:,} documents\n")
+    plain, _ = load(cached=False)
+    baseline = run(plain, operations)
+    students, cache = load(cached=True)
+    seconds = run(students, operations)
+    print(f"{'uncached':<10} {baseline:>8.2f} s {operations / baseline:>10,.0f} ops/s")
+    print(f"{'cached':<10} {seconds:>8.2f} s {operations / seconds:>10,.0f} ops/s "
+          f"({baseline / seconds:.1f}x)")
+    print("\ncache stats:")
+    for key, value in cache.stats().items():
+        print(f"   {key:<14} {value:,.3f}" if isinstance(value, float) else f"   {key:<14} {value:,}")
+
+
+if __name__ == "__main__":
+    main()
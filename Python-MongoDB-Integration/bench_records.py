@@ -0,0 +1,55 @@
+"""
+Benchmark: bytes per document, dict storage vs __slots__ records
+Inserts the same student documents into MockCollection and into
+RecordCollection and reports traced memory per stored document, along
+with the per-document container overhead (excluding the field values).
+Usage: python bench_records.py [rows ...]
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+from records import RecordCollection
+
+SIZES = (100_000, 1_000_000)
+CHUNK = 10_000
+
+
+def fixtures(n):
+    """Yield documents in chunks so the input list never outlives the insert"""
+    for start in range(0, n, CHUNK):
+        docs = make_docs(min(CHUNK, n - start), seed=start)
+        for doc in docs:
+            del doc["_id"]
+        yield from docs
+
+
+def bytes_per_doc(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    collection = factory()
+    collection.insert_many(fixtures(n))
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    doc = collection.find_one()
+    return used / n, doc
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"\n{'documents':>10} {'dict B/doc':>11} {'record B/doc':>13} {'saved':>7}")
+    for n in sizes:
+        dict_bytes, doc = bytes_per_doc(MockCollection, n)
+        record_bytes, record = bytes_per_doc(RecordCollection, n)
+        print(f"{n:>10,} {dict_bytes:>11.0f} {record_bytes:>13.0f} "
+              f"{1 - record_bytes / dict_bytes:>6.0%}")
+    print(f"\ncontainer only: dict {sys.getsizeof(doc)} B, "
+          f"record {sys.getsizeof(record)} B")
+
+
+if __name__ == "__main__":
+    main()
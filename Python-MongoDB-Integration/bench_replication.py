@@ -0,0 +1,94 @@
+"""
+Benchmark: read scaling and replication lag of the ReplicaSet stand-in
+Reader threads look students up by student_id through a read preference
+while one writer thread keeps updating the primary, for a few seconds per
+configuration. Prints reads/s, writes/s, the worst staleness seen by a
+secondary and the apply lag percentiles, from a primary-only set up to
+four secondaries.
+Usage: python bench_replication.py [documents]
+"""
+
+import random
+import sys
+import threading
+import time
+
+from bench_query_compiler import make_docs
+from replication import ReplicaSet
+
+DOCS = 100_000
+READERS = 4
+DURATION = 2.0
+
+CONFIGS = [
+    (0, "primary"),
+    (2, "primary"),
+    (2, "secondaryPreferred"),
+    (2, "nearest"),
+    (4, "secondaryPreferred"),
+]
+
+
+def run(secondaries, read_preference, docs):
+    n = len(docs)
+    with ReplicaSet(secondaries) as replica_set:
+        students = replica_set.collection()
+        students.create_index("student_id", unique=True)
+        students.insert_many([dict(doc) for doc in docs])
+        replica_set.sync()
+        readers = replica_set.collection(read_preference)
+        stop = threading.Event()
+        reads = [0] * READERS
+        writes = [0]
+
+        def read_loop(slot):
+            rng = random.Random(slot)
+            while not stop.is_set():
+                readers.find_one({"student_id": f"STU{rng.randrange(n):05d}"})
+                reads[slot] += 1
+
+        def write_loop():
+            rng = random.Random(-1)
+            while not stop.is_set():
+                students.update_one({"student_id": f"STU{rng.randrange(n):05d}"}, {"$inc": {"age": 1}})
+                writes[0] += 1
+
+        threads = [threading.Thread(target=read_loop, args=(slot,)) for slot in range(READERS)]
+        threads.append(threading.Thread(target=write_loop))
+        replica_set.reset_metrics()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        staleness = 0.0
+        while time.perf_counter() - start < DURATION:
+            time.sleep(0.01)
+            for member in replica_set.secondaries:
+                staleness = max(staleness, replica_set.lag(member))
+        stop.set()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        members = replica_set.status()["members"][1:]
+        p50 = max((member["apply_lag_p50"] for member in members), default=0.0)
+        p99 = max((member["apply_lag_p99"] for member in members), default=0.0)
+        return sum(reads) / seconds, writes[0] / seconds, staleness, p50, p99, replica_set.report()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DOCS
+    docs = make_docs(n)
+    print(f"\n{READERS} readers + 1 writer on {n:,} documents, {DURATION:.0f} s per configuration\n")
+    print(f"{'secondaries':>11} {'read preference':<20} {'reads/s':>10} {'writes/s':>10} "
+          f"{'max stale ms':>13} {'p50 lag ms':>11} {'p99 lag ms':>11}")
+    reports = []
+    for secondaries, read_preference in CONFIGS:
+        reads, writes, staleness, p50, p99, report = run(secondaries, read_preference, docs)
+        print(f"{secondaries:>11} {read_preference:<20} {reads:>10,.0f} {writes:>10,.0f} "
+              f"{staleness * 1000:>13.2f} {p50 * 1000:>11.3f} {p99 * 1000:>11.3f}")
+        reports.append((secondaries, read_preference, report))
+    secondaries, read_preference, report = reports[-1]
+    print(f"\nMembers after the {secondaries}-secondary {read_preference} run\n{report}")
+
+
+if __name__ == "__main__":
+    main()
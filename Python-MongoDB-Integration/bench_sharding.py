@@ -0,0 +1,76 @@
+"""
+Benchmark: one MockCollection vs a ShardedCollection of the same documents
+Times targeted lookups by student_id, a scatter-gather count, a sorted
+find with limit (k-way merge) and the department $group/$avg pipeline on
+an unsharded collection, 4 shards hashed on student_id and 3 shards
+ranged on dept, then prints each layout's shard distribution and
+routing statistics.
+Usage: python bench_sharding.py [documents]
+"""
+
+import sys
+import time
+
+from bench_query_compiler import make_docs
+from crud_demo import MockCollection
+from sharding import ShardedCollection
+
+DOCS = 500_000
+LOOKUPS = 1_000
+REPEAT = 3
+
+WORKLOADS = {
+    f"{LOOKUPS} find_one student_id": lambda c, ids: [c.find_one({"student_id": sid}) for sid in ids],
+    "count dept = CS": lambda c, ids: c.count_documents({"dept": "CS"}),
+    "count gpa >= 3.7": lambda c, ids: c.count_documents({"gpa": {"$gte": 3.7}}),
+    "find sort gpa limit 10": lambda c, ids: c.find({"age": {"$gt": 20}}).sort("gpa", -1).limit(10).to_list(),
+    "$group avg gpa": lambda c, ids: list(c.aggregate([
+        {"$group": {"_id": "$dept", "avg_gpa": {"$avg": "$gpa"}, "count": {"$sum": 1}}},
+        {"$sort": {"avg_gpa": -1}},
+    ])),
+}
+
+
+def layouts():
+    single = MockCollection()
+    ranged = ShardedCollection("dept", strategy="ranged", split_points=["ENG", "MATH"])
+    # student_id is indexed everywhere; the hashed layout indexes it as its shard key
+    for collection in (single, ranged):
+        collection.create_index("student_id")
+    return {
+        "unsharded": single,
+        "hashed student_id x4": ShardedCollection("student_id", shards=4),
+        "ranged dept x3": ranged,
+    }
+
+
+def best_of(call):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DOCS
+    docs = make_docs(n)
+    ids = [f"STU{i:05d}" for i in range(0, n, max(1, n // LOOKUPS))][:LOOKUPS]
+    collections = layouts()
+    for collection in collections.values():
+        collection.insert_many([dict(doc) for doc in docs])
+    print(f"\n{n:,} documents (best of {REPEAT}, seconds)\n")
+    print(f"{'workload':<26}" + "".join(f" {name:>22}" for name in collections))
+    for label, run in WORKLOADS.items():
+        row = f"{label:<26}"
+        for collection in collections.values():
+            row += f" {best_of(lambda: run(collection, ids)):>22.4f}"
+        print(row)
+    for name, collection in collections.items():
+        if isinstance(collection, ShardedCollection):
+            print(f"\n{name}\n{collection.report()}")
+
+
+if __name__ == "__main__":
+    main()
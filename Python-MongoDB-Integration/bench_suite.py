@@ -0,0 +1,325 @@
+"""
+Benchmark suite: every MockCollection operation at growing collection sizes
+Loads student collections of 1k to 1M documents (indexed on student_id,
+dept and gpa) and times insert_one/many, equality, range and projected
+finds, count_documents, update_one/many and delete_one/many, plus the
+crud_demo.main() workflow end to end. Each operation reports throughput,
+p50/p95/p99 latency and the peak memory it allocated. Results are JSON;
+--baseline compares p50 latency and peak memory against an earlier run and
+exits with status 1 when any of them regressed by more than --threshold.
+Usage: python bench_suite.py [--sizes 1000,10000] [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from bench_query_compiler import make_docs
+import crud_demo
+from crud_demo import MockCollection
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+MIN_RUNS = 5
+MAX_RUNS = 1000
+TIME_BUDGET = 1.0  # seconds per operation and size, once MIN_RUNS are done
+THRESHOLD = 0.20
+# Changes below these are noise, whatever the ratio
+LATENCY_FLOOR_MS = 0.01
+MEMORY_FLOOR_KIB = 64
+
+# Unique student_ids for inserted documents across all operations and sizes
+_new_ids = itertools.count()
+
+
+def fixtures(n):
+    docs = make_docs(n)
+    for doc in docs:
+        del doc["_id"]
+    return docs
+
+
+def load(docs):
+    students = MockCollection()
+    students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.create_index("gpa", kind="sorted")
+    students.insert_many(docs)
+    return students
+
+
+def remove_new(students):
+    """Drop the documents inserted by the operations, so every operation sees size n"""
+    students.delete_many({"student_id": {"$gte": "NEW", "$lt": "NEX"}})
+
+
+def new_student(i):
+    return {
+        "name": f"New Student {i}",
+        "student_id": f"NEW{i:07d}",
+        "age": 18 + i % 8,
+        "dept": ("CS", "ENG", "MATH")[i % 3],
+        "gpa": round(2.0 + (i % 200) / 100, 2),
+        "enrolled_date": "2025-09-15",
+    }
+
+
+# ---- operations --------------------------------------------------------------
+# Each entry: name -> (setup, op). setup(students, n, i) runs untimed before
+# run i and returns the argument passed to op(students, arg).
+
+def _no_setup(students, n, i):
+    return i
+
+
+def _existing_id(students, n, i):
+    return f"STU{(i * 7919) % n:05d}"
+
+
+def _batch(students, n, i):
+    return [new_student(next(_new_ids)) for _ in range(1000)]
+
+
+def _victim(students, n, i):
+    doc = new_student(next(_new_ids))
+    students.insert_one(doc)
+    return doc["student_id"]
+
+
+def _victims(students, n, i):
+    students.insert_many([dict(new_student(next(_new_ids)), batch=i) for _ in range(100)])
+    return i
+
+
+OPERATIONS = {
+    "insert_one": (
+        _no_setup,
+        lambda students, i: students.insert_one(new_student(next(_new_ids))),
+    ),
+    "insert_many_1k": (
+        _batch,
+        lambda students, docs: students.insert_many(docs),
+    ),
+    "find_eq_indexed": (
+        _existing_id,
+        lambda students, sid: students.find({"student_id": sid}).to_list(),
+    ),
+    "find_eq_scan": (
+        _no_setup,
+        lambda students, i: students.find({"age": 18 + i % 8}).to_list(),
+    ),
+    "find_range": (
+        _no_setup,
+        lambda students, i: students.find({"gpa": {"$gte": 3.9}}).to_list(),
+    ),
+    "find_projection": (
+        _no_setup,
+        lambda students, i: students.find({"dept": "CS"}, {"name": 1, "gpa": 1}).to_list(),
+    ),
+    "count_documents": (
+        _no_setup,
+        lambda students, i: students.count_documents({"dept": "CS", "age": {"$gt": 20}}),
+    ),
+    "update_one": (
+        _existing_id,
+        lambda students, sid: students.update_one(
+            {"student_id": sid}, {"$set": {"gpa": round(2.0 + hash(sid) % 200 / 100, 2)}}
+        ),
+    ),
+    "update_many": (
+        _no_setup,
+        lambda students, i: students.update_many({"age": 25}, {"$set": {"flag": i}}),
+    ),
+    "delete_one": (
+        _victim,
+        lambda students, sid: students.delete_one({"student_id": sid}),
+    ),
+    "delete_many": (
+        _victims,
+        lambda students, batch: students.delete_many({"batch": batch}),
+    ),
+}
+
+
+# ---- measurement -------------------------------------------------------------
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, peak_bytes):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "runs": len(ordered),
+        "ops_per_sec": len(ordered) / total if total else None,
+        "mean_ms": total / len(ordered) * 1000,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "peak_kib": peak_bytes / 1024,
+    }
+
+
+def peak_allocation(fn, arg):
+    """Peak memory allocated while fn(arg) runs (a separate, untimed run)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(setup, op, students, n, runs=None, min_runs=MIN_RUNS):
+    # Memory first, while the collection is in the same state on every run
+    peak = peak_allocation(lambda a: op(students, a), setup(students, n, 0))
+    latencies = []
+    start = time.perf_counter()
+    for i in itertools.count(1):
+        if runs is not None:
+            if i > runs:
+                break
+        elif i > MAX_RUNS or (i > min_runs and time.perf_counter() - start > TIME_BUDGET):
+            break
+        arg = setup(students, n, i)
+        t0 = time.perf_counter()
+        op(students, arg)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, peak)
+
+
+def bench_size(n):
+    results = {
+        "insert_many_load": measure(
+            lambda _, n, i: fixtures(n), lambda _, docs: load(docs), None, n, min_runs=3
+        ),
+    }
+    results["insert_many_load"]["docs_per_sec"] = n / (results["insert_many_load"]["p50_ms"] / 1000)
+    students = load(fixtures(n))
+    for name, (setup, op) in OPERATIONS.items():
+        results[name] = measure(setup, op, students, n)
+        remove_new(students)
+    return results
+
+
+def run_workflow(directory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        crud_demo.main(csv_file=os.path.join(directory, "students_demo.csv"))
+
+
+def bench_workflow():
+    with tempfile.TemporaryDirectory() as directory:
+        return measure(
+            lambda students, n, i: directory,
+            lambda students, d: run_workflow(d),
+            None, 0, runs=MIN_RUNS,
+        )
+
+
+def metadata(sizes):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": commit,
+        "sizes": list(sizes),
+    }
+
+
+# ---- baseline comparison -----------------------------------------------------
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """List (size, operation, metric, baseline, current) that regressed past threshold"""
+    regressions = []
+    for size, ops in current["sizes"].items():
+        for name, stats in ops.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(name)
+            if before:
+                regressions.extend(_regressed(size, name, before, stats, threshold))
+    before = baseline.get("workflow")
+    if before:
+        regressions.extend(_regressed("workflow", "crud_demo.main", before, current["workflow"], threshold))
+    return regressions
+
+
+def _regressed(size, name, before, after, threshold):
+    found = []
+    if (after["p50_ms"] > before["p50_ms"] * (1 + threshold)
+            and after["p50_ms"] - before["p50_ms"] > LATENCY_FLOOR_MS):
+        found.append((size, name, "p50_ms", before["p50_ms"], after["p50_ms"]))
+    if (after["peak_kib"] > before["peak_kib"] * (1 + threshold)
+            and after["peak_kib"] - before["peak_kib"] > MEMORY_FLOOR_KIB):
+        found.append((size, name, "peak_kib", before["peak_kib"], after["peak_kib"]))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated collection sizes")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown / memory growth as a fraction (default 0.2)")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    # Progress goes to stderr so stdout stays valid JSON
+    log = sys.stderr
+    results = {"meta": metadata(sizes), "sizes": {}}
+    print(f"{'size':>10} {'operation':<18} {'ops/s':>12} {'p50 ms':>10} "
+          f"{'p99 ms':>10} {'peak KiB':>10}", file=log)
+    for n in sizes:
+        results["sizes"][str(n)] = ops = bench_size(n)
+        for name, stats in ops.items():
+            print(f"{n:>10,} {name:<18} {stats['ops_per_sec']:>12,.1f} {stats['p50_ms']:>10.3f} "
+                  f"{stats['p99_ms']:>10.3f} {stats['peak_kib']:>10,.0f}", file=log)
+    results["workflow"] = stats = bench_workflow()
+    print(f"{'':>10} {'crud_demo.main':<18} {stats['ops_per_sec']:>12,.1f} "
+          f"{stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['peak_kib']:>10,.0f}", file=log)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) against {args.baseline} "
+              f"(threshold {args.threshold:.0%})", file=log)
+        for size, name, metric, before, after in regressions:
+            print(f"   {size:>10} {name:<18} {metric:<9} {before:>12,.3f} -> {after:>12,.3f} "
+                  f"({after / before - 1:+.0%})", file=log)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark: update_many over every document of a large collection
+Runs $inc, $set and a combined $inc + $mul update over all
+documents, plus a $set on an indexed field, on the dict-based
+MockCollection (compiled appliers, in-place index patching) and on the
+ColumnarCollection (whole-column NumPy updates where the fields allow).
+Then times upserts by student_id (half existing, half new) with the
+unique index against a find_one + insert_one pair on an unindexed copy.
+Usage: python bench_update.py [documents]
+"""
+
+import sys
+import time
+
+from bench_query_compiler import make_docs
+from columnar import ColumnarCollection
+from crud_demo import MockCollection
+
+DOCS = 1_000_000
+UPSERTS = 200
+
+UPDATES = [
+    ("$inc age", {}, {"$inc": {"age": 1}}),
+    ("$set gpa", {}, {"$set": {"gpa": 3.0}}),
+    ("$inc age + $mul gpa", {}, {"$inc": {"age": 1}, "$mul": {"gpa": 1.01}}),
+    ("$set dept (indexed)", {"dept": "CS"}, {"$set": {"dept": "EE"}}),
+]
+
+
+def load(cls, docs, indexed=True):
+    students = cls()
+    if indexed:
+        students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.insert_many([dict(doc) for doc in docs])
+    return students
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DOCS
+    docs = make_docs(n)
+    print(f"\nupdate_many on {n:,} documents\n")
+    print(f"{'backend':<20} {'update':<22} {'matched':>10} {'modified':>10} {'seconds':>9} {'docs/s':>14}")
+    for cls in (MockCollection, ColumnarCollection):
+        students = load(cls, docs)
+        for label, query, update in UPDATES:
+            start = time.perf_counter()
+            result = students.update_many(query, update)
+            seconds = time.perf_counter() - start
+            print(f"{cls.__name__:<20} {label:<22} {result.matched_count:>10,} "
+                  f"{result.modified_count:>10,} {seconds:>9.3f} {result.matched_count / seconds:>14,.0f}")
+    bench_upserts(n, docs)
+
+
+def bench_upserts(n, docs):
+    ids = [f"STU{i:05d}" for i in range(n - UPSERTS // 2, n + UPSERTS // 2)]
+    update = {"$set": {"dept": "EE"}, "$setOnInsert": {"age": 18}}
+
+    def upsert(students, sid):
+        students.update_one({"student_id": sid}, update, upsert=True)
+
+    def find_then_insert(students, sid):
+        if students.find_one({"student_id": sid}) is None:
+            students.insert_one({"student_id": sid, "dept": "EE", "age": 18})
+        else:
+            students.update_one({"student_id": sid}, {"$set": {"dept": "EE"}})
+
+    print(f"\n{len(ids):,} upserts by student_id on {n:,} documents (half new)\n")
+    print(f"{'method':<40} {'µs per upsert':>14}")
+    for label, indexed, call in (
+        ("update_one(upsert=True), unique index", True, upsert),
+        ("find_one + insert_one, unique index", True, find_then_insert),
+        ("find_one + insert_one, no index", False, find_then_insert),
+    ):
+        students = load(MockCollection, docs, indexed)
+        start = time.perf_counter()
+        for sid in ids:
+            call(students, sid)
+        seconds = time.perf_counter() - start
+        print(f"{label:<40} {seconds / len(ids) * 1_000_000:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+bulk_write() for the in-memory MockCollection.
+Requests are split into runs of the same kind, the way the server splits
+a bulk write into batches: a run of inserts is checked against the unique
+indexes once and indexed in one pass, and a run of deletes collects its
+victims and removes them with one index-maintenance step. Updates in a
+run are applied request by request, each patching only the indexes on
+the fields it changes. Unordered bulk writes group all inserts, updates
+and deletes into one run each.
+The operation classes mirror pymongo's, and pymongo's own InsertOne,
+UpdateOne, ... instances are accepted as well.
+"""
+
+from itertools import groupby, islice
+
+from indexes import DuplicateKeyError
+from update_compiler import WriteError, compile_update
+
+
+class BulkWriteError(Exception):
+    """Raised when one or more requests of a bulk write failed"""
+
+    def __init__(self, details):
+        super().__init__(f"batch op errors occurred: {details['writeErrors']}")
+        self.details = details
+
+
+class _WriteOp:
+    __slots__ = ("_filter", "_doc", "_upsert")
+
+    def __init__(self, filter, doc=None, upsert=False):
+        self._filter = filter
+        self._doc = doc
+        self._upsert = upsert
+
+    def __repr__(self):
+        args = [repr(arg) for arg in (self._filter, self._doc) if arg is not None]
+        if self._upsert:
+            args.append("upsert=True")
+        return f"{type(self).__name__}({', '.join(args)})"
+
+
+class InsertOne(_WriteOp):
+    def __init__(self, document):
+        super().__init__(None, document)
+
+
+def _check_update(update):
+    if not update or not all(key.startswith("$") for key in update):
+        raise ValueError("update only works with $ operators")
+
+
+class UpdateOne(_WriteOp):
+    def __init__(self, filter, update, upsert=False):
+        _check_update(update)
+        super().__init__(filter, update, upsert)
+
+
+class UpdateMany(_WriteOp):
+    def __init__(self, filter, update, upsert=False):
+        _check_update(update)
+        super().__init__(filter, update, upsert)
+
+
+class ReplaceOne(_WriteOp):
+    def __init__(self, filter, replacement, upsert=False):
+        if any(key.startswith("$") for key in replacement):
+            raise ValueError("replacement can not include $ operators")
+        super().__init__(filter, replacement, upsert)
+
+
+class DeleteOne(_WriteOp):
+    def __init__(self, filter):
+        super().__init__(filter)
+
+
+class DeleteMany(_WriteOp):
+    def __init__(self, filter):
+        super().__init__(filter)
+
+
+# Request class name -> the run it is batched into
+_RUNS = {
+    "InsertOne": "insert",
+    "UpdateOne": "update",
+    "UpdateMany": "update",
+    "ReplaceOne": "update",
+    "DeleteOne": "delete",
+    "DeleteMany": "delete",
+}
+_RUN_ORDER = {"insert": 0, "update": 1, "delete": 2}
+
+
+class BulkWriteResult:
+    """Combined counts of a bulk write, mirroring pymongo's BulkWriteResult"""
+
+    def __init__(self):
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_ids = {}
+        self.acknowledged = True
+
+    @property
+    def upserted_count(self):
+        return len(self.upserted_ids)
+
+    @property
+    def bulk_api_result(self):
+        return {
+            "nInserted": self.inserted_count,
+            "nUpserted": self.upserted_count,
+            "nMatched": self.matched_count,
+            "nModified": self.modified_count,
+            "nRemoved": self.deleted_count,
+            "upserted": [
+                {"index": i, "_id": doc_id} for i, doc_id in self.upserted_ids.items()
+            ],
+        }
+
+
+def _write_error(position, request, error):
+    # 11000 is the duplicate key code; 9 (FailedToParse) stands for a bad update
+    code = 11000 if isinstance(error, DuplicateKeyError) else 9
+    return {"index": position, "code": code, "errmsg": str(error), "op": request}
+
+
+def _run_kind(request):
+    kind = _RUNS.get(type(request).__name__)
+    if kind is None:
+        raise TypeError(f"{request!r} is not a valid bulk write request")
+    return kind
+
+
+def checked_inserts(collection, docs, ordered=True):
+    """
+    (documents to insert, {position: index} of those a unique index rejects).
+    Only the accepted documents are given an _id, so rejected ones are left
+    untouched and use up no _id.
+    """
+    duplicates = collection._duplicates(docs)
+    if ordered and duplicates:
+        accepted = docs[:min(duplicates)]
+    else:
+        accepted = [doc for i, doc in enumerate(docs) if i not in duplicates]
+    for doc in accepted:
+        doc["_id"] = collection.counter
+        collection.counter += 1
+    return accepted, duplicates
+
+
+def _insert_run(collection, run, ordered, result, errors):
+    docs, duplicates = checked_inserts(collection, [request._doc for _, request in run], ordered)
+    bad = [min(duplicates)] if ordered and duplicates else sorted(duplicates)
+    collection._add_many(docs)
+    result.inserted_count += len(docs)
+    for i in bad:
+        position, request = run[i]
+        field = duplicates[i].field
+        errors.append(_write_error(position, request, DuplicateKeyError(
+            f"E11000 duplicate key error: {field} {request._doc[field]!r}"
+        )))
+
+
+def _delete_run(collection, run, result):
+    doomed = {}
+    for _, request in run:
+        many = type(request).__name__ == "DeleteMany"
+        for doc in collection._iter_matches(request._filter):
+            if doc["_id"] in doomed:
+                continue
+            doomed[doc["_id"]] = doc
+            if not many:
+                break
+    collection._remove_many(list(doomed.values()))
+    result.deleted_count += len(doomed)
+
+
+def _apply_to(doc, apply):
+    delta = apply(doc)
+    if delta is not None:
+        changes, removed = delta
+        doc.update(changes)
+        for key in removed:
+            del doc[key]
+
+
+def upsert_document(query, apply=None, replacement=None):
+    """
+    New document for an upsert that matched nothing: the replacement, or
+    the query's equality fields with the compiled update apply applied.
+    """
+    if replacement is not None:
+        return {key: val for key, val in replacement.items() if key != "_id"}
+    doc = {}
+    for key, spec in query.items():
+        if key.startswith("$"):
+            continue
+        if not isinstance(spec, dict):
+            doc[key] = spec
+        elif set(spec) == {"$eq"}:
+            doc[key] = spec["$eq"]
+    _apply_to(doc, apply)
+    inserted = apply.update.get("$setOnInsert")
+    if inserted:
+        _apply_to(doc, compile_update({"$set": inserted}))
+    return doc
+
+
+def _update(collection, position, request, result):
+    query = request._filter
+    name = type(request).__name__
+    apply = None if name == "ReplaceOne" else compile_update(request._doc)
+    matches = iter(collection._iter_matches(query))
+    docs = list(matches if name == "UpdateMany" else islice(matches, 1))
+    for doc in docs:
+        if apply is None:
+            before = dict(doc)
+            collection._replace(doc, request._doc)
+            changed = dict(doc) != before
+        else:
+            changed = collection._apply_update(doc, apply)
+        result.matched_count += 1
+        result.modified_count += changed
+    if not docs and request._upsert:
+        replacement = request._doc if apply is None else None
+        doc = upsert_document(query, apply, replacement)
+        result.upserted_ids[position] = collection.insert_one(doc).inserted_id
+
+
+def run_bulk(collection, requests, ordered=True):
+    """Apply requests to collection and return a BulkWriteResult"""
+    ops = [(position, request) for position, request in enumerate(requests)]
+    if not ops:
+        raise ValueError("bulk_write() requires a non-empty list of requests")
+    kinds = {position: _run_kind(request) for position, request in ops}
+    if not ordered:
+        ops.sort(key=lambda op: _RUN_ORDER[kinds[op[0]]])
+    result = BulkWriteResult()
+    errors = []
+    for kind, run in groupby(ops, key=lambda op: kinds[op[0]]):
+        run = list(run)
+        if kind == "insert":
+            _insert_run(collection, run, ordered, result, errors)
+        elif kind == "delete":
+            _delete_run(collection, run, result)
+        else:
+            for position, request in run:
+                try:
+                    _update(collection, position, request, result)
+                except (DuplicateKeyError, WriteError) as e:
+                    errors.append(_write_error(position, request, e))
+                    if ordered:
+                        break
+        if errors and ordered:
+            break
+    if errors:
+        details = result.bulk_api_result
+        details["writeErrors"] = errors
+        raise BulkWriteError(details)
+    return result
@@ -0,0 +1,546 @@
+"""
+NumPy columnar storage engine for MockCollection.
+Fixed-schema fields (gpa, age, dept, ...) live in NumPy arrays, anything
+else goes into a per-row overflow dict. Filters on schema fields run as
+vectorized boolean masks, and results can be handed to pandas straight
+from the column slices.
+"""
+
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+from crud_demo import MockCollection
+from cursor import projected_fields
+from instrumentation import add_scanned
+from query_compiler import OPERATORS, compile_query
+
+# Field -> NumPy dtype for the student documents used throughout the demo
+STUDENT_SCHEMA = {
+    "name": object,
+    "student_id": object,
+    "age": "int64",
+    "dept": object,
+    "gpa": "float64",
+    "enrolled_date": object,
+}
+
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1
+_SCALARS = (str, int, float, type(None))
+
+
+def _fits(kind, value):
+    """True if value can be stored losslessly in a column of the given dtype kind"""
+    if kind == "i":
+        return (isinstance(value, int) and not isinstance(value, bool)
+                and _INT64_MIN <= value <= _INT64_MAX)
+    if kind == "f":
+        return isinstance(value, float)
+    return True
+
+
+def _comparable(kind, value):
+    """True if a query value can be compared against the column without a row loop"""
+    if kind in "if":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _SCALARS)
+
+
+class RowView(MutableMapping):
+    """Dict-like view of one stored row; writes go straight to the columns"""
+    __slots__ = ("store", "row", "doc_id", "generation")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+        self.doc_id = int(store.ids[row])
+        self.generation = store.generation
+
+    def _row(self):
+        if self.generation != self.store.generation:
+            self.row = self.store.rows[self.doc_id]
+            self.generation = self.store.generation
+        return self.row
+
+    def __getitem__(self, key):
+        return self.store.get_value(self._row(), key)
+
+    def __setitem__(self, key, value):
+        self.store.set_value(self._row(), key, value)
+
+    def __delitem__(self, key):
+        self.store.del_value(self._row(), key)
+
+    def __contains__(self, key):
+        return self.store.has_value(self._row(), key)
+
+    def __iter__(self):
+        return iter(self.store.row_keys(self._row()))
+
+    def __len__(self):
+        return len(self.store.row_keys(self._row()))
+
+    def __eq__(self, other):
+        return dict(self) == (dict(other) if isinstance(other, RowView) else other)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def keys(self):
+        return self.store.row_keys(self._row())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, changes=(), **kwargs):
+        for key, value in dict(changes, **kwargs).items():
+            self[key] = value
+
+    def copy(self):
+        return dict(self)
+
+
+class ColumnarStore:
+    """DocumentStore-compatible storage that keeps schema fields in NumPy arrays"""
+
+    INITIAL_CAPACITY = 1024
+    SCAN_CHUNK = 1024
+
+    def __init__(self, schema=None):
+        self.schema = dict(STUDENT_SCHEMA if schema is None else schema)
+        self.columns = {}
+        self.present = {}
+        self.kinds = {}
+        for field, dtype in self.schema.items():
+            dtype = np.dtype(dtype)
+            self.columns[field] = np.empty(self.INITIAL_CAPACITY, dtype=dtype)
+            self.present[field] = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+            self.kinds[field] = dtype.kind
+        self.ids = np.zeros(self.INITIAL_CAPACITY, dtype="int64")
+        self.alive = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self.extras = [None] * self.INITIAL_CAPACITY
+        # Number of rows holding a schema field in the overflow dict because
+        # its value did not fit the column type; such fields skip vectorization
+        self.spilled = dict.fromkeys(self.schema, 0)
+        self.rows = {}
+        self.size = 0
+        self.generation = 0
+
+    # ---- DocumentStore interface -------------------------------------------
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __iter__(self):
+        for row in np.flatnonzero(self.alive[:self.size]):
+            yield RowView(self, row)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.rows
+
+    def get(self, doc_id, default=None):
+        row = self.rows.get(doc_id)
+        return default if row is None else RowView(self, row)
+
+    def scan(self):
+        """Yield views of the rows live when the scan starts, SCAN_CHUNK _ids at a time"""
+        if not self.size:
+            return
+        row, end = 0, self.size
+        end_id = int(self.ids[end - 1])
+        generation = self.generation
+        while row < end:
+            stop = min(end, row + self.SCAN_CHUNK)
+            chunk = self.ids[row:stop][self.alive[row:stop]].tolist()
+            resume_id = int(self.ids[stop - 1])
+            # Views are made by _id as they are read, so rows deleted meanwhile are skipped
+            for doc_id in chunk:
+                view = self.get(doc_id)
+                if view is not None:
+                    yield view
+            if self.generation == generation:
+                row = stop
+            else:
+                # A compaction moved the rows but kept them in _id order: find the place again
+                generation = self.generation
+                ids = self.ids[:self.size]
+                row = int(np.searchsorted(ids, resume_id, side="right"))
+                end = int(np.searchsorted(ids, end_id, side="right"))
+
+    def first(self):
+        return next(iter(self), None)
+
+    def add(self, doc):
+        if self.size == len(self.ids):
+            self._grow()
+        row = self.size
+        self.size += 1
+        self.ids[row] = doc["_id"]
+        self.alive[row] = True
+        self.rows[doc["_id"]] = row
+        for key, value in doc.items():
+            if key != "_id":
+                self.set_value(row, key, value)
+
+    def remove(self, doc_id):
+        self.remove_many([doc_id])
+
+    def remove_many(self, doc_ids):
+        for doc_id in doc_ids:
+            row = self.rows.pop(doc_id)
+            self.alive[row] = False
+            self.extras[row] = None
+            for present in self.present.values():
+                present[row] = False
+        if self.size and len(self.rows) * 2 < self.size:
+            self._compact()
+
+    # ---- cell access -------------------------------------------------------
+
+    def get_value(self, row, key):
+        if key == "_id":
+            return int(self.ids[row])
+        if key in self.columns and self.present[key][row]:
+            value = self.columns[key][row]
+            return value.item() if self.kinds[key] in "if" else value
+        extras = self.extras[row]
+        if extras is None:
+            raise KeyError(key)
+        return extras[key]
+
+    def set_value(self, row, key, value):
+        if key == "_id":
+            raise ValueError("_id is immutable")
+        column = self.columns.get(key)
+        if column is not None:
+            extras = self.extras[row]
+            if _fits(self.kinds[key], value):
+                column[row] = value
+                self.present[key][row] = True
+                if extras is not None and key in extras:
+                    del extras[key]
+                return
+            self.present[key][row] = False
+            self.spilled[key] += 1
+        if self.extras[row] is None:
+            self.extras[row] = {}
+        self.extras[row][key] = value
+
+    def del_value(self, row, key):
+        if key in self.columns and self.present[key][row]:
+            self.present[key][row] = False
+            if self.kinds[key] == "O":
+                self.columns[key][row] = None
+            return
+        extras = self.extras[row]
+        if extras is None:
+            raise KeyError(key)
+        del extras[key]
+
+    def has_value(self, row, key):
+        if key == "_id":
+            return True
+        if key in self.columns and self.present[key][row]:
+            return True
+        extras = self.extras[row]
+        return extras is not None and key in extras
+
+    def row_keys(self, row):
+        keys = [field for field in self.schema if self.present[field][row]]
+        extras = self.extras[row]
+        if extras:
+            keys.extend(extras)
+        keys.append("_id")
+        return keys
+
+    # ---- vectorized queries ------------------------------------------------
+
+    def mask(self, query):
+        """Return (mask, residual): a row mask for the vectorizable part of query
+        and the sub-query that still has to be checked row by row"""
+        n = self.size
+        mask = self.alive[:n].copy()
+        residual = {}
+        for key, spec in query.items():
+            if key == "_id":
+                column, present, kind = self.ids[:n], None, "i"
+            elif key in self.columns and not self.spilled[key]:
+                column, present, kind = self.columns[key][:n], self.present[key][:n], self.kinds[key]
+            else:
+                residual[key] = spec
+                continue
+            if isinstance(spec, dict):
+                ops = [(op, spec[op]) for op in OPERATORS if op in spec]
+            else:
+                ops = [("$eq", spec)]
+            if not all(_comparable(kind, value) for _, value in ops):
+                residual[key] = spec
+                continue
+            if present is not None:
+                mask &= present
+            if kind == "O":
+                # Object columns hold None for missing cells, so only compare live rows
+                rows = np.flatnonzero(mask)
+                values = column[rows]
+                keep = np.ones(len(rows), dtype=bool)
+                for op, value in ops:
+                    keep &= _compare(values, op, value)
+                mask[rows] = keep
+            else:
+                for op, value in ops:
+                    mask &= _compare(column, op, value)
+        return mask, residual
+
+    def frame(self, rows, fields):
+        """Build a DataFrame for the given row numbers straight from the columns"""
+        data = {}
+        for field in fields:
+            if field == "_id":
+                data[field] = self.ids[rows]
+                continue
+            if field in self.columns and not self.spilled[field]:
+                values = self.columns[field][rows]
+                present = self.present[field][rows]
+                if present.all():
+                    data[field] = values
+                    continue
+                if not present.any() and not self._in_extras(rows, field):
+                    continue
+                if self.kinds[field] in "if":
+                    values = values.astype("float64")
+                else:
+                    values = values.copy()
+                values[~present] = np.nan
+                data[field] = values
+                continue
+            if self._in_extras(rows, field):
+                data[field] = [
+                    self.get_value(row, field) if self.has_value(row, field) else np.nan
+                    for row in rows
+                ]
+        return pd.DataFrame(data, columns=list(data))
+
+    def fields(self, rows):
+        """All field names present in the given rows, schema fields first"""
+        fields = [field for field in self.schema if self.present[field][rows].any()]
+        seen = set(fields)
+        for row in rows:
+            extras = self.extras[row]
+            if extras:
+                for key in extras:
+                    if key not in seen:
+                        seen.add(key)
+                        fields.append(key)
+        fields.append("_id")
+        return fields
+
+    def _in_extras(self, rows, field):
+        return any(
+            self.extras[row] is not None and field in self.extras[row] for row in rows
+        )
+
+    # ---- housekeeping ------------------------------------------------------
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        for field, column in self.columns.items():
+            self.columns[field] = _resize(column, capacity)
+            self.present[field] = _resize(self.present[field], capacity)
+        self.ids = _resize(self.ids, capacity)
+        self.alive = _resize(self.alive, capacity)
+        self.extras.extend([None] * (capacity - len(self.extras)))
+
+    def _compact(self):
+        """Drop dead rows so columns stay dense; invalidates cached row numbers"""
+        keep = np.flatnonzero(self.alive[:self.size])
+        n = len(keep)
+        capacity = max(self.INITIAL_CAPACITY, len(self.ids))
+        for field, column in self.columns.items():
+            self.columns[field] = _resize(column[keep], capacity)
+            self.present[field] = _resize(self.present[field][keep], capacity)
+        self.ids = _resize(self.ids[keep], capacity)
+        self.alive = _resize(self.alive[keep], capacity)
+        self.extras = [self.extras[row] for row in keep] + [None] * (capacity - n)
+        self.rows = {int(doc_id): row for row, doc_id in enumerate(self.ids[:n])}
+        self.size = n
+        self.spilled = {
+            field: sum(1 for extras in self.extras[:n] if extras and field in extras)
+            for field in self.schema
+        }
+        self.generation += 1
+
+
+def _resize(array, capacity):
+    resized = np.zeros(capacity, dtype=array.dtype)
+    if array.dtype.kind == "O":
+        resized[:] = None
+    n = min(len(array), capacity)
+    resized[:n] = array[:n]
+    return resized
+
+
+def _compare(values, op, value):
+    if op == "$gt":
+        return values > value
+    if op == "$gte":
+        return values >= value
+    if op == "$lt":
+        return values < value
+    if op == "$lte":
+        return values <= value
+    return values == value
+
+
+def _column_update(op, old, value):
+    """New values of a column slice under a numeric update operator"""
+    if op == "$set":
+        return np.full(len(old), value, dtype=old.dtype)
+    if op == "$inc":
+        return old + value
+    if op == "$mul":
+        return old * value
+    if op == "$min":
+        return np.minimum(old, value)
+    return np.maximum(old, value)
+
+
+def _missing_value(op, value):
+    """Value an update operator gives a field the document does not have"""
+    return value * 0 if op == "$mul" else value
+
+
+def _overflows(op, old, value):
+    """True if $inc / $mul on an int64 slice would leave the int64 range"""
+    if op not in ("$inc", "$mul") or not len(old):
+        return False
+    low, high = int(old.min()), int(old.max())
+    if op == "$inc":
+        return not (_INT64_MIN <= low + value and high + value <= _INT64_MAX)
+    return max(abs(low), abs(high)) * abs(value) > _INT64_MAX
+
+
+class ColumnarCollection(MockCollection):
+    """MockCollection whose schema fields are stored column-wise in NumPy arrays"""
+
+    # Prefer an index over a vectorized scan when it selects less than this fraction
+    INDEX_SELECTIVITY = 0.05
+
+    def __init__(self, schema=None):
+        super().__init__()
+        self.data = ColumnarStore(schema)
+
+    def find_dataframe(self, query=None, projection=None):
+        """Return matching documents as a DataFrame built from column slices"""
+        rows = self._matching_rows(query)
+        fields = projected_fields(projection, self.data.fields(rows))
+        return self.data.frame(rows, fields)
+
+    def column(self, field, query=None):
+        """Return the values of a schema field for matching documents as a NumPy array"""
+        rows = self._matching_rows(query)
+        store = self.data
+        return store.columns[field][rows[store.present[field][rows]]]
+
+    def _count(self, query):
+        if not query:
+            return len(self.data)
+        if self._use_index(query):
+            return super()._count(query)
+        mask, residual = self.data.mask(query)
+        if not residual:
+            add_scanned(len(self.data))
+            return int(np.count_nonzero(mask))
+        return super()._count(query)
+
+    def _update_many(self, query, apply):
+        plan = self._column_plan(apply.update)
+        if plan is None or (query and self._use_index(query)):
+            return super()._update_many(query, apply)
+        store = self.data
+        rows = self._matching_rows(query)
+        updates = []
+        for op, field, value in plan:
+            old = store.columns[field][rows]
+            if store.kinds[field] == "i" and _overflows(op, old, value):
+                return super()._update_many(query, apply)
+            if (not _fits(store.kinds[field], _missing_value(op, value))
+                    and not store.present[field][rows].all()):
+                # The value a missing field would get keeps its own type in a document
+                return super()._update_many(query, apply)
+            updates.append((op, field, value, old))
+        # Checked every column first: from here on nothing can fail half way
+        changed = np.zeros(len(rows), dtype=bool)
+        for op, field, value, old in updates:
+            present = store.present[field][rows]
+            new = _column_update(op, old, value)
+            if not present.all():
+                new[~present] = _missing_value(op, value)
+            changed |= ~present | (new != old)
+            store.columns[field][rows] = new
+            store.present[field][rows] = True
+        modified = int(np.count_nonzero(changed))
+        if modified:
+            self._written(apply.fields)
+        return len(rows), modified
+
+    def _column_plan(self, update):
+        """(op, field, value) list when update can run on whole column slices, else None"""
+        store = self.data
+        plan = []
+        for op, fields in update.items():
+            if op not in ("$set", "$inc", "$mul", "$min", "$max"):
+                return None
+            for field, value in fields.items():
+                kind = store.kinds.get(field)
+                if kind not in ("i", "f") or store.spilled[field] or field in self.indexes:
+                    return None
+                # $inc / $mul of a float column by an int still stores a float
+                if not (_fits(kind, value) or (kind == "f" and op in ("$inc", "$mul")
+                                               and _fits("i", value))):
+                    return None
+                plan.append((op, field, value))
+        return plan
+
+    def _plan(self, query):
+        if not query or self._use_index(query):
+            return super()._plan(query)
+        _, _, rejected = super()._plan(query)
+        return {"stage": "COLUMN_SCAN", "filter": query}, 0, rejected
+
+    def _use_index(self, query):
+        ids, _ = self._index_ids(query)
+        return ids is not None
+
+    def _matching_rows(self, query):
+        store = self.data
+        if not query:
+            return np.flatnonzero(store.alive[:store.size])
+        mask, residual = store.mask(query)
+        add_scanned(len(store))
+        rows = np.flatnonzero(mask)
+        if residual:
+            match = compile_query(residual)
+            rows = np.array(
+                [row for row in rows if match(RowView(store, row))], dtype="int64"
+            )
+        return rows
+
+    def _iter_matches(self, query):
+        if not query or self._use_index(query):
+            return super()._iter_matches(query)
+        store = self.data
+        # Views are made by _id as they are read, so deletes behind an open cursor are skipped
+        return self._live(map(store.get, store.ids[self._matching_rows(query)].tolist()))
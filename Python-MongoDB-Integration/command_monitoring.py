@@ -0,0 +1,112 @@
+"""
+PyMongo command monitoring feeding the instrumentation listeners.
+CommandInstrumentation turns the driver's started / succeeded / failed
+command events into the OperationEvents MockCollection reports, so the
+same MetricsCollector works against a live server. The server does not
+report documents examined, so scanned is None; getMore commands keep the
+query shape of the find or aggregate that opened their cursor.
+Register it before the first client is created:
+    monitoring.register(CommandInstrumentation(MetricsCollector()))
+"""
+
+import threading
+
+from pymongo import monitoring
+
+from instrumentation import OperationEvent, shape_of
+
+# Commands reported; everything else (hello, ping, endSessions, ...) is ignored
+COMMANDS = ("find", "getMore", "aggregate", "count", "distinct", "insert", "update",
+            "delete", "findAndModify")
+
+
+def _shape(name, command):
+    if name in ("find", "count", "distinct"):
+        return shape_of(command.get("filter", command.get("query", {})))
+    if name == "aggregate":
+        return shape_of(command.get("pipeline", []))
+    if name == "update" and command.get("updates"):
+        return shape_of(command["updates"][0].get("q", {}))
+    if name == "delete" and command.get("deletes"):
+        return shape_of(command["deletes"][0].get("q", {}))
+    if name == "findAndModify":
+        return shape_of(command.get("query", {}))
+    return None
+
+
+def _outcome(event, name, reply):
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        event.returned = len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    elif name in ("count", "distinct", "findAndModify"):
+        event.returned = 1
+    if name == "update":
+        event.modified = reply.get("nModified", 0) + len(reply.get("upserted", ()))
+    elif name in ("insert", "delete"):
+        event.modified = reply.get("n", 0)
+    elif name == "findAndModify":
+        event.modified = reply.get("lastErrorObject", {}).get("n", 0)
+
+
+class CommandInstrumentation(monitoring.CommandListener):
+    """CommandListener reporting server commands to OperationListeners"""
+
+    def __init__(self, *listeners):
+        self.listeners = listeners
+        self._pending = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        if name not in COMMANDS:
+            return
+        command = event.command
+        cursor_id = None
+        if name == "getMore":
+            collection = command.get("collection")
+            cursor_id = command.get(name)
+            with self._lock:
+                shape = self._cursors.get(cursor_id)
+        else:
+            collection = command.get(name)
+            shape = _shape(name, command)
+        operation = OperationEvent(name, name, f"{event.database_name}.{collection}", shape)
+        operation.scanned = None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = operation, cursor_id
+        for listener in self.listeners:
+            listener.started(operation)
+
+    def _finish(self, event):
+        with self._lock:
+            operation, cursor_id = self._pending.pop(
+                (event.connection_id, event.request_id), (None, None)
+            )
+            if cursor_id is not None:
+                self._cursors.pop(cursor_id, None)
+        if operation is not None:
+            operation.duration = event.duration_micros / 1_000_000
+        return operation
+
+    def succeeded(self, event):
+        operation = self._finish(event)
+        if operation is None:
+            return
+        reply = event.reply
+        _outcome(operation, event.command_name, reply)
+        cursor = reply.get("cursor")
+        if cursor is not None and cursor.get("id"):
+            # Keep the shape for the getMores of a cursor that is still open
+            with self._lock:
+                self._cursors[cursor["id"]] = operation.shape
+        for listener in self.listeners:
+            listener.finished(operation)
+
+    def failed(self, event):
+        operation = self._finish(event)
+        if operation is None:
+            return
+        operation.failure = repr(event.failure)
+        for listener in self.listeners:
+            listener.finished(operation)
@@ -0,0 +1,131 @@
+"""
+Thread-safe MockCollection.
+A reader/writer lock lets any number of reads run together while writes
+are serialized. Lazy results (find cursors, aggregate pipelines) collect
+their matching documents under the read lock, so a later write can never
+change the store underneath an iteration that is still in progress.
+"""
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from crud_demo import MockCollection
+from cursor import Cursor
+
+
+class RWLock:
+    """
+    Writer-preferring reader/writer lock.
+    Reentrant for the writing thread: it may take the write or read lock
+    again (a write that upserts through insert_one, for example).
+    Upgrading a held read lock to a write lock is not supported.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if self._writer == me:
+                    self._depth -= 1
+                else:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+def _reader(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _writer(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class LockedCursor(Cursor):
+    """Cursor that gathers its matches under the collection's read lock"""
+
+    def _execute(self):
+        with self.collection.lock.read():
+            return iter(list(super()._execute()))
+
+    def explain(self):
+        with self.collection.lock.read():
+            return super().explain()
+
+
+class ThreadSafeCollection(MockCollection):
+    """MockCollection safe to share between threads: parallel reads, serialized writes"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = RWLock()
+
+    def find(self, query=None, projection=None):
+        return LockedCursor(self, query, projection)
+
+    @_reader
+    def aggregate(self, pipeline, explain=False):
+        result = super().aggregate(pipeline, explain)
+        return result if explain else iter(list(result))
+
+    find_one = _reader(MockCollection.find_one)
+    count_documents = _reader(MockCollection.count_documents)
+    count_by = _reader(MockCollection.count_by)
+
+    create_index = _writer(MockCollection.create_index)
+    insert_one = _writer(MockCollection.insert_one)
+    insert_many = _writer(MockCollection.insert_many)
+    update_one = _writer(MockCollection.update_one)
+    update_many = _writer(MockCollection.update_many)
+    replace_one = _writer(MockCollection.replace_one)
+    delete_one = _writer(MockCollection.delete_one)
+    delete_many = _writer(MockCollection.delete_many)
+    bulk_write = _writer(MockCollection.bulk_write)
@@ -0,0 +1,93 @@
+"""
+Lazily created, shared MongoClient.
+The URI, database, collection and pool settings come from configure()
+calls, then MONGODB_* environment variables, then the defaults below.
+Nothing connects at import: the first get_client() builds one pooled
+client, and every later caller in the process shares it.
+"""
+
+import atexit
+import os
+import threading
+
+DEFAULT_URI = "mongodb://localhost:27017"
+DEFAULT_DATABASE = "school"
+DEFAULT_COLLECTION = "students"
+
+# MongoClient option -> (environment variable, parser)
+POOL_OPTIONS = {
+    "maxPoolSize": ("MONGODB_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGODB_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGODB_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGODB_WAIT_QUEUE_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGODB_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGODB_SOCKET_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGODB_SERVER_SELECTION_TIMEOUT_MS", int),
+    "compressors": ("MONGODB_COMPRESSORS", str),
+    "appname": ("MONGODB_APPNAME", str),
+}
+
+_overrides = {}
+_client = None
+_lock = threading.Lock()
+
+
+def configure(uri=None, database=None, collection=None, **options):
+    """Override the environment; must be called before the client is created"""
+    unknown = set(options) - set(POOL_OPTIONS)
+    if unknown:
+        raise ValueError(f"unknown client options: {sorted(unknown)}")
+    with _lock:
+        if _client is not None:
+            raise RuntimeError("configure() called after the client was created")
+        for key, val in (("uri", uri), ("database", database), ("collection", collection)):
+            if val is not None:
+                _overrides[key] = val
+        _overrides.update(options)
+
+
+def settings(env=None):
+    """Resolved (uri, database, collection, client options)"""
+    env = os.environ if env is None else env
+    uri = _overrides.get("uri") or env.get("MONGODB_URI", DEFAULT_URI)
+    database = _overrides.get("database") or env.get("MONGODB_DATABASE", DEFAULT_DATABASE)
+    collection = _overrides.get("collection") or env.get("MONGODB_COLLECTION", DEFAULT_COLLECTION)
+    options = {}
+    for option, (var, parse) in POOL_OPTIONS.items():
+        if option in _overrides:
+            options[option] = _overrides[option]
+        elif env.get(var):
+            options[option] = parse(env[var])
+    return uri, database, collection, options
+
+
+def get_client():
+    """The shared MongoClient, created on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from pymongo import MongoClient
+
+                uri, _, _, options = settings()
+                # connect=False: no sockets or monitor threads until the first operation
+                _client = MongoClient(uri, connect=False, **options)
+    return _client
+
+
+def get_collection(name=None, database=None):
+    """A collection on the shared client, defaulting to the configured one"""
+    _, default_database, default_collection, _ = settings()
+    return get_client()[database or default_database][name or default_collection]
+
+
+def close_client():
+    """Close the shared client; the next get_client() creates a new one"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
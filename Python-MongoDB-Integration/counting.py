@@ -0,0 +1,25 @@
+"""
+Grouped counts in a single pass.
+count_by(collection, field, filter) returns {value: count} for every value
+of field among the matching documents, with missing fields counted under
+None as $group does. PyMongo collections run one $group aggregation;
+MockCollection counts during one scan, or straight off a hash index.
+"""
+
+
+def count_pipeline(field, filter=None):
+    """Aggregation pipeline producing one {_id: value, count: n} document per value"""
+    pipeline = [{"$match": filter}] if filter else []
+    pipeline.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+    return pipeline
+
+
+def count_by(collection, field, filter=None):
+    """Return {value: count} of field over the documents matching filter"""
+    # Looked up on the class: pymongo's Collection turns unknown attributes into sub-collections
+    if callable(getattr(type(collection), "count_by", None)):
+        return collection.count_by(field, filter)
+    return {
+        doc["_id"]: doc["count"]
+        for doc in collection.aggregate(count_pipeline(field, filter))
+    }
@@ -0,0 +1,200 @@
+"""
+asyncio version of the crud_examples.py workflow.
+The read, count and aggregation sections only read the collection, so after
+the inserts they run concurrently with asyncio.gather, as do the
+independent queries inside each section. Sections return their report
+lines instead of printing, so concurrent output stays in order.
+Works with pymongo.AsyncMongoClient collections and with
+async_collection.AsyncCollection wrappers around a synchronous collection.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+from connection import settings
+from counting import count_pipeline
+
+
+async def _sequential(*aws):
+    """Drop-in for asyncio.gather that awaits one operation at a time"""
+    return [await aw for aw in aws]
+
+
+async def create_operations(students, gather=asyncio.gather):
+    """Insert the sample students"""
+    lines = ["\n=== CREATE OPERATIONS ===\n", "1. Insert Single Document:"]
+    student1 = {
+        "name": "Ahmet Yılmaz",
+        "student_id": "STU001",
+        "age": 21,
+        "dept": "CS",
+        "gpa": 3.8,
+        "enrolled_date": datetime.now()
+    }
+    result = await students.insert_one(student1)
+    lines.append(f"   Inserted document ID: {result.inserted_id}")
+
+    lines.append("\n2. Insert Multiple Documents:")
+    students_data = [
+        {"name": "Fatima Ahmed", "student_id": "STU002", "age": 20, "dept": "ENG",
+         "gpa": 3.6, "enrolled_date": datetime.now()},
+        {"name": "Hassan Ali", "student_id": "STU003", "age": 22, "dept": "CS",
+         "gpa": 3.9, "enrolled_date": datetime.now()},
+        {"name": "Aisha Mohamed", "student_id": "STU004", "age": 21, "dept": "MATH",
+         "gpa": 3.7, "enrolled_date": datetime.now()},
+    ]
+    result = await students.insert_many(students_data)
+    lines.append(f"   Inserted {len(result.inserted_ids)} documents")
+    lines.append(f"   IDs: {result.inserted_ids}")
+    return lines
+
+
+async def read_operations(students, gather=asyncio.gather):
+    """find_one() and find() queries, issued together"""
+    first, everyone, cs_students, projected = await gather(
+        students.find_one({"dept": "CS"}),
+        students.find().to_list(),
+        students.find({"dept": "CS"}).to_list(),
+        students.find({}, {"name": 1, "student_id": 1, "dept": 1, "_id": 0}).to_list(),
+    )
+    lines = ["\n=== READ OPERATIONS ===\n", "1. find_one() - Get Single Document:"]
+    if first:
+        lines.append(f"   Found: {first['name']} - {first['student_id']}")
+    lines.append("\n2. find() - Get All Documents:")
+    for count, student in enumerate(everyone, 1):
+        lines.append(f"   {count}. {student['name']} ({student['student_id']}) - {student['dept']}")
+    lines.append("\n3. find() with Filter (dept='CS'):")
+    lines.extend(f"   - {student['name']}: GPA {student['gpa']}" for student in cs_students)
+    lines.append("\n4. find() with Projection (select specific fields):")
+    lines.extend(f"   {doc}" for doc in projected)
+    return lines
+
+
+async def count_operations(students, gather=asyncio.gather):
+    """count_documents() queries, issued together"""
+    total, by_dept, high_gpa = await gather(
+        students.count_documents({}),
+        _aggregate(students, count_pipeline("dept")),
+        students.count_documents({"gpa": {"$gt": 3.7}}),
+    )
+    by_dept = {doc["_id"]: doc["count"] for doc in by_dept}
+    return [
+        "\n=== COUNT DOCUMENTS ===\n",
+        "1. Total Documents in Collection:",
+        f"   Total: {total}",
+        "\n2. Count Documents by Department:",
+        *(f"   {dept}: {by_dept.get(dept, 0)}" for dept in ["CS", "ENG", "MATH"]),
+        "\n3. Count with Condition (GPA > 3.7):",
+        f"   Students with GPA > 3.7: {high_gpa}",
+    ]
+
+
+async def _aggregate(students, pipeline):
+    cursor = await students.aggregate(pipeline)
+    return await cursor.to_list()
+
+
+async def aggregation_operations(students, gather=asyncio.gather):
+    """The three crud_examples pipelines, run together"""
+    pipeline1 = [
+        {"$group": {"_id": "$dept", "avg_gpa": {"$avg": "$gpa"}, "count": {"$sum": 1}}},
+        {"$sort": {"avg_gpa": -1}}
+    ]
+    pipeline2 = [
+        {"$match": {"gpa": {"$gte": 3.7}}},
+        {"$project": {"name": 1, "student_id": 1, "gpa": 1, "_id": 0}},
+        {"$sort": {"gpa": -1}}
+    ]
+    pipeline3 = [
+        {"$sort": {"gpa": -1}},
+        {"$group": {
+            "_id": "$dept",
+            "top_student": {"$first": "$name"},
+            "highest_gpa": {"$first": "$gpa"},
+            "students": {"$sum": 1}
+        }},
+        {"$project": {
+            "department": "$_id", "top_student": 1, "highest_gpa": 1, "students": 1, "_id": 0
+        }}
+    ]
+    by_dept, high_gpa, top = await gather(
+        _aggregate(students, pipeline1),
+        _aggregate(students, pipeline2),
+        _aggregate(students, pipeline3),
+    )
+    lines = ["\n=== AGGREGATION OPERATIONS ===\n", "1. Group by Department - Average GPA:"]
+    lines.extend(f"   {doc['_id']}: Avg GPA={doc['avg_gpa']:.2f}, Count={doc['count']}"
+                 for doc in by_dept)
+    lines.append("\n2. Filter (Match) and Select Fields:")
+    lines.extend(f"   {doc['name']} ({doc['student_id']}): {doc['gpa']}" for doc in high_gpa)
+    lines.append("\n3. Complex Aggregation - Top Students by Dept:")
+    lines.extend(f"   {doc['department']}: {doc['top_student']} (GPA: {doc['highest_gpa']})"
+                 for doc in top)
+    return lines
+
+
+async def update_operations(students, gather=asyncio.gather):
+    """Single and multi-document updates"""
+    lines = ["\n=== UPDATE OPERATIONS ===\n", "1. Update Single Document:"]
+    result = await students.update_one(
+        {"student_id": "STU001"},
+        {"$set": {"age": 22, "gpa": 3.85}}
+    )
+    lines.append(f"   Modified: {result.modified_count} document(s)")
+    lines.append("\n2. Update Multiple Documents (Increment GPA for CS students):")
+    result = await students.update_many({"dept": "CS"}, {"$inc": {"gpa": 0.1}})
+    lines.append(f"   Modified: {result.modified_count} document(s)")
+    return lines
+
+
+async def run_workflow(students, concurrent=True):
+    """Run the workflow on a fresh collection and return the report lines per section"""
+    gather = asyncio.gather if concurrent else _sequential
+    await students.delete_many({})
+    sections = [await create_operations(students, gather)]
+    sections += await gather(
+        read_operations(students, gather),
+        count_operations(students, gather),
+        aggregation_operations(students, gather),
+    )
+    sections.append(await update_operations(students, gather))
+    return sections
+
+
+async def timed_workflow(students, concurrent=True):
+    """run_workflow() plus its wall-clock time in seconds"""
+    start = time.perf_counter()
+    sections = await run_workflow(students, concurrent)
+    return sections, time.perf_counter() - start
+
+
+async def main():
+    """Run the workflow against the configured server, sequentially and then concurrently"""
+    from pymongo import AsyncMongoClient
+
+    uri, database, collection, options = settings()
+    client = AsyncMongoClient(uri, **options)
+    try:
+        students = client[database][collection]
+        _, sequential = await timed_workflow(students, concurrent=False)
+        sections, concurrent = await timed_workflow(students)
+
+        print("\n" + "="*70)
+        print("MONGODB CRUD OPERATIONS WITH ASYNCIO")
+        print("="*70)
+        for lines in sections:
+            print("\n".join(lines))
+        print("\n=== WALL-CLOCK TIME ===")
+        print(f"Sequential: {sequential * 1000:.1f} ms")
+        print(f"Concurrent: {concurrent * 1000:.1f} ms ({sequential / concurrent:.1f}x)")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"\nError: {e}")
+        print(f"Make sure MongoDB is running at {settings()[0]}")
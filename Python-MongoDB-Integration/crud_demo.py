@@ -7,143 +7,460 @@ Use this for testing and understanding the concepts.
 import pandas as pd
 from datetime import datetime
 import json
+from collections import Counter
+from functools import partial
+from operator import methodcaller
+
+from aggregation import field_value, run_pipeline
+from bulk import (
+    DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne, checked_inserts, run_bulk,
+    upsert_document,
+)
+from counting import count_by
+from cursor import Cursor
+from dataframes import find_to_dataframe
+from explain import collection_scan, explain_aggregate, index_scan, plan_summary
+from exports import export_csv
+from indexes import DuplicateKeyError, INDEX_KINDS, IndexRange
+from instrumentation import (
+    counted, found, grouped, inserted_many, inserted_one, instrumented, scanned, written,
+)
+from parallel import ParallelScanner
+from query_cache import (
+    QueryCache, cache_aggregate, cache_count_by, cache_count_documents, cache_find_one,
+)
+from query_compiler import compile_query
+from storage import DocumentStore
+from update_compiler import compile_update
 
 # Simulate MongoDB collection with in-memory storage
 class MockCollection:
     """Mock MongoDB collection for demonstration"""
+    # Read through an index only when it selects at most this fraction of the
+    # store; past that a collection scan is cheaper, and finds a first match sooner.
+    # Below SCAN_MIN_DOCS documents either plan is instant and the index is kept.
+    INDEX_SELECTIVITY = 0.1
+    SCAN_MIN_DOCS = 1000
+    # Hash buckets holding more than this fraction of the store are read by
+    # walking the store and keeping their members, so a cursor can stop early
+    BUCKET_WALK_RATIO = 0.02
+    
     def __init__(self):
-        self.data = []
+        self.data = DocumentStore()
         self.counter = 1
-    
+        self.indexes = {}
+        self.cache = None
+        # Bumped by every write; membership_version when documents come or go,
+        # field_versions[field] when a stored value of field changes
+        self.write_version = 0
+        self.membership_version = 0
+        self.field_versions = {}
+        # OperationListeners attached by instrumentation.instrument()
+        self.listeners = ()
+        self.parallel = None
+    
+    def enable_cache(self, max_bytes=None):
+        """Cache query results, invalidated by writes; returns the QueryCache for its stats"""
+        self.cache = QueryCache() if max_bytes is None else QueryCache(max_bytes)
+        return self.cache
+    
+    def enable_parallel(self, workers=None, threshold=None):
+        """Run large scans in a pool of worker processes; returns the ParallelScanner"""
+        if self.parallel is not None:
+            self.parallel.close()
+        self.parallel = ParallelScanner(self, workers, threshold)
+        return self.parallel
+    
+    def create_index(self, field, unique=False, kind="hash"):
+        """Build an index on field: "hash" for equality, "sorted" for range queries"""
+        if field not in self.indexes:
+            index = INDEX_KINDS[kind](field, unique=unique)
+            index.build(self.data)
+            self.indexes[field] = index
+        return f"{field}_1"
+    
+    @instrumented("insert_one", "insert", outcome=inserted_one)
     def insert_one(self, doc):
         doc['_id'] = self.counter
+        self._add(doc)
         self.counter += 1
-        self.data.append(doc)
         class Result:
             def __init__(self, doc_id):
                 self.inserted_id = doc_id
         return Result(doc['_id'])
     
+    @instrumented("insert_many", "insert", outcome=inserted_many)
     def insert_many(self, docs):
-        ids = []
-        for doc in docs:
-            doc['_id'] = self.counter
-            ids.append(self.counter)
-            self.counter += 1
-            self.data.append(doc)
+        docs = list(docs)
+        # Ordered insert: keep everything before the first conflict
+        accepted, duplicates = checked_inserts(self, docs)
+        self._add_many(accepted)
+        if duplicates:
+            first = min(duplicates)
+            field = duplicates[first].field
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error: {field} {docs[first][field]!r}"
+            )
+        ids = [doc['_id'] for doc in docs]
         class Result:
             def __init__(self, ids):
                 self.inserted_ids = ids
         return Result(ids)
     
+    @instrumented("find_one", "find", "query", found)
+    @cache_find_one
     def find_one(self, query=None):
         if query is None:
-            return self.data[0] if self.data else None
-        for doc in self.data:
-            if self._match(doc, query):
-                return doc
-        return None
+            return self.data.first()
+        return next(iter(self._iter_matches(query)), None)
     
     def find(self, query=None, projection=None):
-        results = []
-        for doc in self.data:
-            if query is None or self._match(doc, query):
-                if projection:
-                    filtered = {}
-                    for key, val in projection.items():
-                        if val == 1 and key in doc:
-                            filtered[key] = doc[key]
-                    results.append(filtered)
-                else:
-                    results.append(doc)
-        return results
+        return Cursor(self, query, projection)
     
+    @instrumented("count_documents", "aggregate", "query", counted)
+    @cache_count_documents
     def count_documents(self, query=None):
+        return self._count(query)
+    
+    def _count(self, query):
+        # An index that answers the query exactly counts without a scan
+        ids = self._exact_ids(query)
+        if ids is not None:
+            return len(ids)
+        if self.parallel is not None:
+            count = self.parallel.count(query)
+            if count is not None:
+                return count
         count = 0
-        for doc in self.data:
-            if query is None or self._match(doc, query):
-                count += 1
+        for _ in self._iter_matches(query):
+            count += 1
         return count
     
-    def update_one(self, query, update):
-        for doc in self.data:
-            if self._match(doc, query):
-                if "$set" in update:
-                    doc.update(update["$set"])
-                class Result:
-                    def __init__(self):
-                        self.modified_count = 1
-                return Result()
+    @instrumented("count_by", "aggregate", "filter", grouped)
+    @cache_count_by
+    def count_by(self, field, filter=None):
+        """Return {value: count} of field in one pass; index-only when field has a hash index"""
+        index = self.indexes.get(field)
+        if not filter and index is not None and index.kind == "hash":
+            counts = index.counts()
+            if counts is not None:
+                missing = len(self.data) - sum(counts.values())
+                if missing:
+                    counts[None] = counts.get(None, 0) + missing
+                return counts
+        if self.parallel is not None:
+            counts = self.parallel.count_by(field, filter)
+            if counts is not None:
+                return counts
+        if "." in field:
+            value = partial(field_value, path=field)
+        else:
+            value = methodcaller("get", field)
+        return dict(Counter(map(value, self._iter_matches(filter))))
+    
+    @instrumented("update_one", "update", "query", written)
+    def update_one(self, query, update, upsert=False):
+        apply = compile_update(update)
+        matched = modified = 0
+        upserted_id = None
+        for doc in self._iter_matches(query):
+            matched = 1
+            modified = int(self._apply_update(doc, apply))
+            break
+        else:
+            if upsert:
+                upserted_id = self._upsert(query, apply)
         class Result:
-            def __init__(self):
-                self.modified_count = 0
-        return Result()
-    
-    def update_many(self, query, update):
-        modified = 0
-        for doc in self.data:
-            if self._match(doc, query):
-                if "$set" in update:
-                    doc.update(update["$set"])
-                elif "$inc" in update:
-                    for key, val in update["$inc"].items():
-                        if key in doc:
-                            doc[key] += val
-                modified += 1
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+    
+    @instrumented("update_many", "update", "query", written)
+    def update_many(self, query, update, upsert=False):
+        apply = compile_update(update)
+        matched, modified = self._update_many(query, apply)
+        upserted_id = self._upsert(query, apply) if upsert and not matched else None
         class Result:
-            def __init__(self, count):
-                self.modified_count = count
-        return Result(modified)
-    
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+    
+    @instrumented("replace_one", "update", "query", written)
+    def replace_one(self, query, replacement, upsert=False):
+        if any(key.startswith("$") for key in replacement):
+            raise ValueError("replacement can not include $ operators")
+        matched = modified = 0
+        upserted_id = None
+        for doc in self._iter_matches(query):
+            matched = 1
+            before = dict(doc)
+            self._replace(doc, replacement)
+            modified = int(dict(doc) != before)
+            break
+        else:
+            if upsert:
+                upserted_id = self._upsert(query, replacement=replacement)
+        class Result:
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+    
+    def _upsert(self, query, apply=None, replacement=None):
+        """Insert the document an upsert of query creates and return its _id"""
+        # Callers only get here after _iter_matches found nothing; with a unique
+        # index on a field of query that was a single hash probe, not a scan
+        return self.insert_one(upsert_document(query, apply, replacement)).inserted_id
+    
+    def _update_many(self, query, apply):
+        """Apply a compiled update to every match; return (matched, modified) counts"""
+        # Only indexes on fields the update can change need patching
+        touched = [index for field, index in self.indexes.items() if field in apply.fields]
+        patch = self._patch
+        matched = modified = 0
+        matches = self._iter_matches(query)
+        if touched:
+            # Patching an indexed field can move a match further along the index being walked
+            matches = list(matches)
+        try:
+            for doc in matches:
+                matched += 1
+                delta = apply(doc)
+                if delta is not None:
+                    patch(doc, delta[0], delta[1], touched)
+                    modified += 1
+        finally:
+            # One write version bump for the whole batch
+            if modified:
+                self._written(apply.fields)
+        return matched, modified
+    
+    @instrumented("delete_one", "delete", "query", written)
     def delete_one(self, query):
-        for i, doc in enumerate(self.data):
-            if self._match(doc, query):
-                self.data.pop(i)
-                class Result:
-                    def __init__(self):
-                        self.deleted_count = 1
-                return Result()
+        for doc in self._iter_matches(query):
+            self._remove(doc)
+            class Result:
+                def __init__(self):
+                    self.deleted_count = 1
+            return Result()
         class Result:
             def __init__(self):
                 self.deleted_count = 0
         return Result()
     
+    @instrumented("delete_many", "delete", "query", written)
     def delete_many(self, query):
-        deleted = 0
-        for doc in list(self.data):
-            if self._match(doc, query):
-                self.data.remove(doc)
-                deleted += 1
+        doomed = list(self._iter_matches(query))
+        self._remove_many(doomed)
         class Result:
             def __init__(self, count):
                 self.deleted_count = count
-        return Result(deleted)
+        return Result(len(doomed))
+    
+    @instrumented("bulk_write", "bulkWrite", outcome=written)
+    def bulk_write(self, requests, ordered=True):
+        """Apply InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany/ReplaceOne requests"""
+        return run_bulk(self, requests, ordered=ordered)
+    
+    def aggregate(self, pipeline, explain=False):
+        """Run an aggregation pipeline lazily; explain=True returns its plan and execution stats"""
+        if explain:
+            return explain_aggregate(self, pipeline)
+        return self._aggregate(pipeline)
+    
+    @instrumented("aggregate", "aggregate", "pipeline", "lazy")
+    @cache_aggregate
+    def _aggregate(self, pipeline):
+        """Run an aggregation pipeline lazily, one generator stage at a time"""
+        return run_pipeline(self, pipeline)
+    
+    def _add(self, doc):
+        for field, index in self.indexes.items():
+            if field in doc:
+                index.check(doc[field])
+        self.data.add(doc)
+        for index in self.indexes.values():
+            index.add(doc)
+        self._written()
+    
+    def _add_many(self, docs):
+        """Insert docs already checked by _duplicates, one index pass per index"""
+        for doc in docs:
+            self.data.add(doc)
+        for index in self.indexes.values():
+            index.add_many(docs)
+        self._written()
+    
+    def _duplicates(self, docs):
+        """Map each position in docs that would break a unique index to that index"""
+        found = {}
+        for index in self.indexes.values():
+            for i in index.duplicates(docs):
+                found.setdefault(i, index)
+        return found
+    
+    def _remove(self, doc):
+        for index in self.indexes.values():
+            index.remove(doc)
+        self.data.remove(doc['_id'])
+        self._written()
+    
+    def _remove_many(self, docs):
+        for index in self.indexes.values():
+            index.remove_many(docs)
+        self.data.remove_many([doc['_id'] for doc in docs])
+        self._written()
+    
+    def _set_fields(self, doc, changes, removed=()):
+        """Assign changes and delete removed fields of doc, patching only the indexes on them"""
+        self._patch(doc, changes, removed)
+        self._written((*changes, *removed))
+    
+    def _patch(self, doc, changes, removed, touched=None):
+        """Update doc and the indexes on the changed fields, without bumping the write version"""
+        if touched is None:
+            touched = [
+                index for field, index in self.indexes.items()
+                if field in changes or field in removed
+            ]
+        for index in touched:
+            if index.field in changes:
+                index.check(changes[index.field], doc['_id'])
+        for index in touched:
+            index.remove(doc)
+        doc.update(changes)
+        for field in removed:
+            del doc[field]
+        for index in touched:
+            index.add(doc)
+    
+    def _apply_update(self, doc, apply):
+        """Apply a compiled update (see update_compiler) to doc; return True if it changed"""
+        delta = apply(doc)
+        if delta is None:
+            return False
+        self._set_fields(doc, *delta)
+        return True
+    
+    def _replace(self, doc, replacement):
+        """Swap every field of doc except _id for replacement, keeping indexes in sync"""
+        new = {key: val for key, val in replacement.items() if key != '_id'}
+        for index in self.indexes.values():
+            if index.field in new:
+                index.check(new[index.field], doc['_id'])
+        for index in self.indexes.values():
+            index.remove(doc)
+        changed = set(doc) | set(new)
+        for key in [key for key in doc if key != '_id']:
+            del doc[key]
+        doc.update(new)
+        for index in self.indexes.values():
+            index.add(doc)
+        self._written(changed)
+    
+    def _written(self, fields=None):
+        """Advance the write version; fields=None means documents were added or removed"""
+        self.write_version += 1
+        if fields is None:
+            self.membership_version = self.write_version
+        else:
+            for field in fields:
+                self.field_versions[field] = self.write_version
+    
+    def _choose_index(self, query):
+        """Return (index, ids, exact) for the most selective indexed predicate in query"""
+        chosen = best = None
+        exact = False
+        for key, spec in (query or {}).items():
+            index = self.indexes.get(key)
+            if index is None:
+                continue
+            selection = index.select(spec)
+            if selection is None:
+                continue
+            ids, covered = selection
+            if best is None or len(ids) < len(best):
+                chosen = index
+                best = ids
+                exact = covered and len(query) == 1
+        return chosen, best, exact
+    
+    def _selective(self, ids):
+        """True when reading ids through their index beats a collection scan"""
+        n = len(self.data)
+        return n < self.SCAN_MIN_DOCS or len(ids) <= n * self.INDEX_SELECTIVITY
+    
+    def _index_ids(self, query):
+        """Return (ids, exact) for the index a scan of query reads through, or (None, False)"""
+        _, ids, exact = self._choose_index(query)
+        if ids is None or not self._selective(ids):
+            return None, False
+        return ids, exact
+    
+    def _plan(self, query):
+        """Return the winning plan stage for query, the index keys it examines and the rejected plans"""
+        index, ids, exact = self._choose_index(query)
+        if index is None:
+            return collection_scan(query), 0, []
+        plan = index_scan(index, query, exact)
+        if not self._selective(ids):
+            # The index matches too much of the store: scanning it is cheaper
+            return collection_scan(query), 0, [plan]
+        return plan, len(ids), []
+    
+    def _exact_ids(self, query):
+        """Return the matching _ids when an index answers query on its own, however many"""
+        _, ids, exact = self._choose_index(query)
+        return ids if exact else None
+    
+    def _iter_matches(self, query):
+        """Return a lazy iterable of the documents matching query"""
+        ids, exact = self._index_ids(query)
+        if ids is None:
+            # The store scan is lazy and carries on over writes made while a cursor is open
+            docs = scanned(self.data.scan())
+            if query:
+                docs = filter(compile_query(query), docs)
+            return self._live(docs)
+        docs = scanned(self._live(self._fetch(ids)))
+        if exact:
+            return docs
+        return filter(compile_query(query), docs)
+    
+    def _fetch(self, ids):
+        """Documents of index-selected _ids: sorted ranges in index order, hash buckets in natural order"""
+        if isinstance(ids, IndexRange):
+            return map(self.data.get, ids)
+        if len(ids) <= len(self.data) * self.BUCKET_WALK_RATIO:
+            return map(self.data.get, sorted(ids))
+        # A big bucket is merged with the store order as it is read, not sorted up front
+        return (doc for doc in self.data.scan() if doc['_id'] in ids)
+    
+    def _live(self, docs):
+        """Skip documents deleted since the scan started, so an open cursor survives writes"""
+        version = self.membership_version
+        data = self.data
+        for doc in docs:
+            if doc is None:
+                continue
+            if self.membership_version != version and doc['_id'] not in data:
+                continue
+            yield doc
     
     def _match(self, doc, query):
-        for key, value in query.items():
-            if key not in doc:
-                return False
-            if isinstance(value, dict):
-                if "$gt" in value and not (doc[key] > value["$gt"]):
-                    return False
-                if "$gte" in value and not (doc[key] >= value["$gte"]):
-                    return False
-                if "$lt" in value and not (doc[key] < value["$lt"]):
-                    return False
-                if "$lte" in value and not (doc[key] <= value["$lte"]):
-                    return False
-                if "$eq" in value and doc[key] != value["$eq"]:
-                    return False
-            elif doc[key] != value:
-                return False
-        return True
+        return compile_query(query)(doc)
 
 
 # ============================================================================
 # DEMONSTRATION
 # ============================================================================
 
-def main():
+def main(csv_file="students_demo.csv"):
     """Main demonstration function"""
     
     print("\n" + "="*70)
@@ -152,6 +469,9 @@ def main():
     
     # Initialize mock collection
     students = MockCollection()
+    students.create_index("student_id", unique=True)
+    students.create_index("dept")
+    students.create_index("gpa", kind="sorted")
     
     # ====== CREATE ======
     print("\n=== CREATE OPERATIONS ===\n")
@@ -206,14 +526,24 @@ def main():
     print(f"   ✓ Total students: {total}")
     
     print("\n2. Count by Department:")
+    by_dept = count_by(students, "dept")
     for dept in ["CS", "ENG", "MATH"]:
-        count = students.count_documents({"dept": dept})
+        count = by_dept.get(dept, 0)
         print(f"   • {dept}: {count} students")
     
     print("\n3. Count with Condition (GPA >= 3.7):")
     high_gpa = students.count_documents({"gpa": {"$gte": 3.7}})
     print(f"   ✓ Students with GPA >= 3.7: {high_gpa}")
     
+    # ====== QUERY PLANS ======
+    print("\n=== QUERY PLANS ===\n")
+    print("1. explain() - Index Scan vs Collection Scan:")
+    for query in ({"dept": "CS"}, {"gpa": {"$gte": 3.7}}, {"age": {"$gt": 20}}):
+        stats = students.find(query).explain()["executionStats"]
+        print(f"   • {query}: {plan_summary(stats['executionStages'])}, "
+              f"keys examined {stats['totalKeysExamined']}, "
+              f"docs examined {stats['totalDocsExamined']}, returned {stats['nReturned']}")
+    
     # ====== UPDATE ======
     print("\n=== UPDATE OPERATIONS ===\n")
     print("1. Update Single Document:")
@@ -230,33 +560,78 @@ def main():
     )
     print(f"   ✓ Modified: {result.modified_count} document(s)")
     
+    print("\n3. Upsert Operation (Update or Insert):")
+    result = students.update_one(
+        {"student_id": "STU999"},
+        {"$set": {"name": "New Student", "dept": "CS", "gpa": 3.5}},
+        upsert=True
+    )
+    print(f"   ✓ Upserted: {result.upserted_id if result.upserted_id else 'Updated'}")
+    
     # ====== AGGREGATION ======
     print("\n=== AGGREGATION OPERATIONS ===\n")
     print("1. Group by Department - Average GPA:")
-    
-    # Manual aggregation for demo
-    dept_stats = {}
-    for doc in students.find():
-        dept = doc['dept']
-        if dept not in dept_stats:
-            dept_stats[dept] = {'total_gpa': 0, 'count': 0}
-        dept_stats[dept]['total_gpa'] += doc['gpa']
-        dept_stats[dept]['count'] += 1
-    
-    for dept in sorted(dept_stats.keys()):
-        avg_gpa = dept_stats[dept]['total_gpa'] / dept_stats[dept]['count']
-        count = dept_stats[dept]['count']
-        print(f"   • {dept}: Avg GPA = {avg_gpa:.2f}, Count = {count}")
+    pipeline1 = [
+        {
+            "$group": {
+                "_id": "$dept",
+                "avg_gpa": {"$avg": "$gpa"},
+                "count": {"$sum": 1}
+            }
+        },
+        {"$sort": {"avg_gpa": -1}}
+    ]
+    for doc in students.aggregate(pipeline1):
+        print(f"   • {doc['_id']}: Avg GPA = {doc['avg_gpa']:.2f}, Count = {doc['count']}")
     
     print("\n2. Top Students (GPA >= 3.7):")
-    top_students = sorted(
-        [s for s in students.find() if s['gpa'] >= 3.7],
-        key=lambda x: x['gpa'],
-        reverse=True
-    )
-    for student in top_students:
+    pipeline2 = [
+        {"$match": {"gpa": {"$gte": 3.7}}},
+        {"$project": {"name": 1, "student_id": 1, "gpa": 1, "_id": 0}},
+        {"$sort": {"gpa": -1}}
+    ]
+    for student in students.aggregate(pipeline2):
         print(f"   • {student['name']} ({student['student_id']}): {student['gpa']}")
     
+    print("\n3. Top Student by Department:")
+    pipeline3 = [
+        {"$sort": {"gpa": -1}},
+        {"$group": {
+            "_id": "$dept",
+            "top_student": {"$first": "$name"},
+            "highest_gpa": {"$first": "$gpa"},
+            "students": {"$sum": 1}
+        }},
+        {"$project": {
+            "department": "$_id",
+            "top_student": 1,
+            "highest_gpa": 1,
+            "students": 1,
+            "_id": 0
+        }}
+    ]
+    for doc in students.aggregate(pipeline3):
+        print(f"   • {doc['department']}: {doc['top_student']} (GPA: {doc['highest_gpa']})")
+    
+    # ====== BULK WRITE ======
+    print("\n=== BULK WRITE ===\n")
+    print("1. bulk_write() with Mixed Operations:")
+    requests = [
+        InsertOne({"name": "Zeynep Kaya", "student_id": "STU006", "age": 23, "dept": "ENG", "gpa": 3.4}),
+        UpdateOne({"student_id": "STU002"}, {"$set": {"gpa": 3.65}}),
+        UpdateMany({"dept": "MATH"}, {"$inc": {"age": 1}}),
+        ReplaceOne(
+            {"student_id": "STU007"},
+            {"name": "Can Demir", "student_id": "STU007", "age": 19, "dept": "CS", "gpa": 3.3},
+            upsert=True
+        ),
+        DeleteOne({"student_id": "STU006"}),
+    ]
+    result = students.bulk_write(requests, ordered=False)
+    print(f"   ✓ Inserted: {result.inserted_count}, Matched: {result.matched_count}, "
+          f"Modified: {result.modified_count}, Deleted: {result.deleted_count}, "
+          f"Upserted: {result.upserted_count}")
+    
     # ====== DELETE ======
     print("\n=== DELETE OPERATIONS ===\n")
     print("1. Delete Document with GPA < 3.5:")
@@ -266,8 +641,7 @@ def main():
     # ====== DATAFRAME ======
     print("\n=== DATAFRAME CONVERSION ===\n")
     print("1. Convert All Data to DataFrame:")
-    data = students.find({})
-    df = pd.DataFrame(data)
+    df = find_to_dataframe(students)
     print("\nDataFrame:")
     print(df[['name', 'student_id', 'dept', 'gpa', 'age']])
     print(f"\nShape: {df.shape}")
@@ -283,9 +657,8 @@ def main():
     print(df.groupby('dept')['gpa'].mean())
     
     print("\n3. Export to CSV:")
-    csv_file = "/home/abod/Workspace/Projects/Python-MongoDB-Integration/students_demo.csv"
-    df.to_csv(csv_file, index=False)
-    print(f"   ✓ Exported to: {csv_file}")
+    result = export_csv(students.find({}), csv_file, df.columns)
+    print(f"   ✓ Exported {result.rows} rows to: {csv_file} ({result.rows_per_second:,.0f} rows/s)")
     
     # ====== FINAL STATUS ======
     print("\n=== FINAL STATUS ===")
@@ -5,21 +5,27 @@ Topics: CRUD, aggregate(), find_one(), count_documents(), DataFrame conversion
 Student No: [INSERT YOUR STUDENT NUMBER]
 """
 
-from pymongo import MongoClient
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, monitoring
 import pandas as pd
 from datetime import datetime
 
-# Connection
-client = MongoClient("mongodb://localhost:27017")
-db = client["school"]
-students = db["students"]
+from connection import get_collection, settings
+from command_monitoring import CommandInstrumentation
+from counting import count_by
+from dataframes import find_to_dataframe
+from exports import export_csv, export_xlsx
+from instrumentation import MetricsCollector, instrument
+
+# Columns written by the CSV/Excel exports
+EXPORT_COLUMNS = ["name", "student_id", "age", "dept", "gpa", "enrolled_date"]
+EXPORT_PROJECTION = {**{column: 1 for column in EXPORT_COLUMNS}, "_id": 0}
 
 
 # ============================================================================
 # 1. CREATE (INSERT) OPERATIONS
 # ============================================================================
 
-def create_operations():
+def create_operations(students):
     """Create/Insert documents into MongoDB collection"""
     print("\n=== CREATE OPERATIONS ===\n")
     
@@ -73,7 +79,7 @@ def create_operations():
 # 2. READ OPERATIONS (find, find_one)
 # ============================================================================
 
-def read_operations():
+def read_operations(students):
     """Read documents from MongoDB collection"""
     print("\n=== READ OPERATIONS ===\n")
     
@@ -107,7 +113,7 @@ def read_operations():
 # 3. COUNT DOCUMENTS
 # ============================================================================
 
-def count_operations():
+def count_operations(students):
     """Count documents in collection"""
     print("\n=== COUNT DOCUMENTS ===\n")
     
@@ -116,15 +122,11 @@ def count_operations():
     total = students.count_documents({})
     print(f"   Total: {total}")
     
-    # Count with filter
+    # Count per department with one $group aggregation
     print("\n2. Count Documents by Department:")
-    cs_count = students.count_documents({"dept": "CS"})
-    eng_count = students.count_documents({"dept": "ENG"})
-    math_count = students.count_documents({"dept": "MATH"})
-    
-    print(f"   CS: {cs_count}")
-    print(f"   ENG: {eng_count}")
-    print(f"   MATH: {math_count}")
+    by_dept = count_by(students, "dept")
+    for dept in ["CS", "ENG", "MATH"]:
+        print(f"   {dept}: {by_dept.get(dept, 0)}")
     
     # Count with complex filter
     print("\n3. Count with Condition (GPA > 3.7):")
@@ -136,7 +138,7 @@ def count_operations():
 # 4. UPDATE OPERATIONS
 # ============================================================================
 
-def update_operations():
+def update_operations(students):
     """Update documents in MongoDB collection"""
     print("\n=== UPDATE OPERATIONS ===\n")
     
@@ -175,7 +177,7 @@ def update_operations():
 # 5. AGGREGATION PIPELINE
 # ============================================================================
 
-def aggregation_operations():
+def aggregation_operations(students):
     """Aggregate data using MongoDB aggregation pipeline"""
     print("\n=== AGGREGATION OPERATIONS ===\n")
     
@@ -233,7 +235,7 @@ def aggregation_operations():
 # 6. DELETE OPERATIONS
 # ============================================================================
 
-def delete_operations():
+def delete_operations(students):
     """Delete documents from MongoDB collection"""
     print("\n=== DELETE OPERATIONS ===\n")
     
@@ -248,18 +250,40 @@ def delete_operations():
     print(f"   Deleted: {result.deleted_count} document(s)")
 
 
+def bulk_operations(students):
+    """Send several writes to the server in as few batches as possible"""
+    print("\n=== BULK WRITE ===\n")
+    
+    # Unordered: the driver groups the requests by type into server batches
+    print("1. bulk_write() with Mixed Operations:")
+    requests = [
+        InsertOne({"name": "Zeynep Kaya", "student_id": "STU006", "age": 23, "dept": "ENG", "gpa": 3.4}),
+        UpdateOne({"student_id": "STU002"}, {"$set": {"gpa": 3.65}}),
+        UpdateMany({"dept": "MATH"}, {"$inc": {"age": 1}}),
+        ReplaceOne(
+            {"student_id": "STU007"},
+            {"name": "Can Demir", "student_id": "STU007", "age": 19, "dept": "CS", "gpa": 3.3},
+            upsert=True
+        ),
+        DeleteOne({"student_id": "STU006"}),
+    ]
+    result = students.bulk_write(requests, ordered=False)
+    print(f"   Inserted: {result.inserted_count}, Matched: {result.matched_count}, "
+          f"Modified: {result.modified_count}, Deleted: {result.deleted_count}, "
+          f"Upserted: {result.upserted_count}")
+
+
 # ============================================================================
 # 7. PANDAS DATAFRAME CONVERSION
 # ============================================================================
 
-def dataframe_operations():
+def dataframe_operations(students, csv_file="students.csv", excel_file="students.xlsx"):
     """Convert MongoDB data to Pandas DataFrame"""
     print("\n=== DATAFRAME CONVERSION ===\n")
     
-    # Fetch all data and convert to DataFrame
+    # Stream the cursor into preallocated columns instead of a list of dicts
     print("1. Convert All Data to DataFrame:")
-    data = list(students.find({}, {"_id": 0}))
-    df = pd.DataFrame(data)
+    df = find_to_dataframe(students, {}, {"_id": 0})
     print("\nDataFrame:")
     print(df)
     print(f"\nShape: {df.shape}")
@@ -275,20 +299,18 @@ def dataframe_operations():
     print(f"\nAverage GPA by Department:")
     print(df.groupby('dept')['gpa'].mean())
     
-    # Export to CSV
+    # Export to CSV, streaming rows from the cursor
     print("\n3. Export to CSV:")
-    csv_file = "/home/abod/Workspace/Projects/Python-MongoDB-Integration/students.csv"
-    df.to_csv(csv_file, index=False)
-    print(f"   Exported to: {csv_file}")
+    result = export_csv(students.find({}, EXPORT_PROJECTION), csv_file, EXPORT_COLUMNS)
+    print(f"   Exported {result.rows} rows to: {csv_file} ({result.rows_per_second:,.0f} rows/s)")
     
     # Export to Excel
     print("\n4. Export to Excel:")
-    excel_file = "/home/abod/Workspace/Projects/Python-MongoDB-Integration/students.xlsx"
     try:
-        df.to_excel(excel_file, index=False, sheet_name="Students")
-        print(f"   Exported to: {excel_file}")
-    except Exception as e:
-        print(f"   Note: Excel export requires openpyxl ({e})")
+        result = export_xlsx(students.find({}, EXPORT_PROJECTION), excel_file, EXPORT_COLUMNS)
+        print(f"   Exported {result.rows} rows to: {excel_file} ({result.rows_per_second:,.0f} rows/s)")
+    except ImportError as e:
+        print(f"   Note: {e}")
     
     return df
 
@@ -297,8 +319,16 @@ def dataframe_operations():
 # 8. COMPLETE WORKFLOW
 # ============================================================================
 
-def main():
-    """Main function to run all operations"""
+def main(students=None, metrics=None):
+    """Run all operations on students (default: the configured server collection)"""
+    if metrics is not None:
+        if students is None:
+            # Before get_collection() creates the client, so it picks up the listener
+            monitoring.register(CommandInstrumentation(metrics))
+        else:
+            instrument(students, metrics)
+    if students is None:
+        students = get_collection()
     
     print("\n" + "="*70)
     print("MONGODB CRUD OPERATIONS WITH PYMONGO")
@@ -306,20 +336,27 @@ def main():
     
     # Clear collection for fresh start
     students.delete_many({})
+    # Upserts by student_id then find their document with one index probe
+    students.create_index("student_id", unique=True)
     print("\n[Database cleaned - Starting fresh]")
     
     # Run all operations
-    create_operations()
-    read_operations()
-    count_operations()
-    aggregation_operations()
-    update_operations()
-    dataframe_operations()
+    create_operations(students)
+    read_operations(students)
+    count_operations(students)
+    aggregation_operations(students)
+    update_operations(students)
+    bulk_operations(students)
+    dataframe_operations(students)
     
     # Final count
     print("\n=== FINAL STATUS ===")
     print(f"Total documents in collection: {students.count_documents({})}")
     
+    if metrics is not None:
+        print("\n=== OPERATION METRICS ===\n")
+        print(metrics.report())
+    
     print("\n" + "="*70)
     print("EXECUTION COMPLETED SUCCESSFULLY")
     print("="*70 + "\n")
@@ -327,7 +364,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        main(metrics=MetricsCollector(by="command"))
     except Exception as e:
         print(f"\nError: {e}")
-        print("Make sure MongoDB is running on localhost:27017")
+        print(f"Make sure MongoDB is running at {settings()[0]}")
@@ -0,0 +1,175 @@
+"""
+Lazy cursor returned by MockCollection.find.
+Mirrors the PyMongo Cursor surface (limit, skip, sort, batch_size, to_list)
+but evaluates on demand: documents are matched and projected one batch at
+a time, iteration stops as soon as the limit is reached, and sort + limit
+keeps only the top k documents instead of sorting the whole result.
+"""
+
+from collections import deque
+from itertools import islice
+
+from aggregation import _sort
+from explain import explain_find
+from instrumentation import nested, observe, traced
+from query_cache import cached_find
+
+
+class InvalidOperation(Exception):
+    """Raised when a cursor is modified after iteration has started"""
+
+
+def _sort_spec(key_or_list, direction=None):
+    """Normalize PyMongo sort arguments to an ordered {field: direction} dict"""
+    if isinstance(key_or_list, str):
+        return {key_or_list: 1 if direction is None else direction}
+    return dict(key_or_list)
+
+
+def projected_fields(projection, fields):
+    """Apply PyMongo projection rules (inclusion or exclusion) to a field list"""
+    if not projection:
+        return fields
+    included = [key for key, val in projection.items() if val and key != "_id"]
+    if included:
+        keep = [field for field in fields if field in included]
+        if projection.get("_id", 1) and "_id" in fields:
+            keep.append("_id")
+        return keep
+    return [field for field in fields if projection.get(field, 1)]
+
+
+def _project(doc, projection):
+    """Copy the fields selected by projection out of doc"""
+    return {key: doc[key] for key in projected_fields(projection, doc)}
+
+
+class Cursor:
+    """Lazy result set of a MockCollection.find() call"""
+
+    DEFAULT_BATCH_SIZE = 101
+
+    def __init__(self, collection, query=None, projection=None):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._limit = 0
+        self._skip = 0
+        self._sort = None
+        self._batch_size = 0
+        self._docs = None
+        self._buffer = deque()
+
+    # ---- modifiers ---------------------------------------------------------
+
+    def _check_okay_to_chain(self):
+        if self._docs is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def limit(self, limit):
+        """Return at most limit documents (0 means no limit)"""
+        if not isinstance(limit, int):
+            raise TypeError("limit must be an integer")
+        self._check_okay_to_chain()
+        self._limit = abs(limit)
+        return self
+
+    def skip(self, skip):
+        """Skip the first skip matching documents"""
+        if not isinstance(skip, int):
+            raise TypeError("skip must be an integer")
+        if skip < 0:
+            raise ValueError("skip must be >= 0")
+        self._check_okay_to_chain()
+        self._skip = skip
+        return self
+
+    def sort(self, key_or_list, direction=None):
+        """Order results by a field name and direction, or a list of (field, direction) pairs"""
+        self._check_okay_to_chain()
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def batch_size(self, batch_size):
+        """Number of documents matched and projected per batch (0 means the default)"""
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        self._check_okay_to_chain()
+        self._batch_size = batch_size
+        return self
+
+    # ---- iteration ---------------------------------------------------------
+
+    def _execute(self):
+        collection = self.collection
+        if collection.listeners and not nested(collection):
+            event, docs = observe(collection, "find", "find", self.query or {}, self._matches)
+            return traced(collection, event, docs)
+        return self._matches()
+
+    def _matches(self):
+        if self.collection.cache is not None:
+            return cached_find(self, self._run)
+        return self._run()
+
+    def _run(self):
+        collection = self.collection
+        docs = None
+        if collection.parallel is not None and (self._sort or not self._limit):
+            # Only reads of the whole result set are worth a pool scan
+            docs = collection.parallel.matches(self.query)
+        if docs is None:
+            docs = collection._iter_matches(self.query)
+        docs = iter(docs)
+        if self._sort:
+            top_k = self._skip + self._limit if self._limit else None
+            docs = _sort(docs, self._sort, top_k)
+        stop = self._skip + self._limit if self._limit else None
+        return islice(docs, self._skip, stop)
+
+    def _refresh(self):
+        if self._docs is None:
+            self._docs = self._execute()
+        batch = islice(self._docs, self._batch_size or self.DEFAULT_BATCH_SIZE)
+        if self.projection:
+            projection = self.projection
+            self._buffer.extend(_project(doc, projection) for doc in batch)
+        else:
+            self._buffer.extend(batch)
+        return len(self._buffer)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._buffer and not self._refresh():
+            raise StopIteration
+        return self._buffer.popleft()
+
+    def next(self):
+        return self.__next__()
+
+    def to_list(self, length=None):
+        """Return the remaining documents (at most length of them) as a list"""
+        if length is None:
+            return list(self)
+        if length < 1:
+            raise ValueError("to_list() length must be greater than 0")
+        return list(islice(self, length))
+
+    def rewind(self):
+        """Reset the cursor so the query runs again on the next iteration"""
+        self._docs = None
+        self._buffer.clear()
+        return self
+
+    def explain(self):
+        """Return the query plan and execution stats (MongoDB explain format) of this query"""
+        return explain_find(self)
+
+    def close(self):
+        """Release the underlying iterator"""
+        self._docs = iter(())
+        self._buffer.clear()
@@ -0,0 +1,149 @@
+"""
+Cursor-to-DataFrame conversion with bounded memory.
+Works with both PyMongo collections and MockCollection: documents are read
+from the cursor chunk_rows at a time and written into preallocated NumPy
+columns, so the full result never exists as a list of dicts next to the
+finished frame.
+"""
+
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from cursor import projected_fields
+
+CHUNK_ROWS = 10_000
+
+
+def _dtype_of(value):
+    """NumPy dtype used for a column whose first value is value"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return np.dtype("int64")
+    if isinstance(value, float):
+        return np.dtype("float64")
+    return np.dtype(object)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return value is None or isinstance(value, float) or _is_int(value)
+
+
+def _fields(projection, schema):
+    """Columns to fetch: the schema fields selected by projection, _id last if kept"""
+    return projected_fields(projection, list(schema))
+
+
+def _find(collection, filter, fields, chunk_rows):
+    """Open a cursor that only returns fields, fetching chunk_rows per batch"""
+    projection = {field: 1 for field in fields}
+    if "_id" not in fields:
+        projection["_id"] = 0
+    return collection.find(filter or {}, projection).batch_size(chunk_rows)
+
+
+def _chunks(cursor, chunk_rows):
+    while True:
+        chunk = list(islice(cursor, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _store(columns, field, start, values):
+    """Write values into columns[field] at start, widening the dtype if they do not fit"""
+    column = columns[field]
+    kind = column.dtype.kind
+    if kind == "i" and not all(map(_is_int, values)):
+        kind = "f"
+    if kind == "f" and not all(map(_is_number, values)):
+        kind = "O"
+    if kind != column.dtype.kind:
+        column = columns[field] = column.astype("float64" if kind == "f" else object)
+    try:
+        column[start:start + len(values)] = values
+    except OverflowError:
+        column = columns[field] = column.astype(object)
+        column[start:start + len(values)] = values
+
+
+def _open(collection, filter, projection, schema, chunk_rows):
+    """(cursor, fields) for schema, or for the fields the documents bring when it is None"""
+    if schema is None:
+        cursor = collection.find(filter or {}, projection).batch_size(chunk_rows)
+        return cursor, []
+    fields = _fields(projection, schema)
+    return _find(collection, filter, fields, chunk_rows), fields
+
+
+def _add_columns(columns, fields, chunk, start, capacity):
+    """
+    Give every field first seen in chunk a column, so documents that do not
+    share the first one's fields keep theirs. Rows before start are NaN.
+    """
+    for doc in chunk:
+        for field, value in doc.items():
+            if field in columns:
+                continue
+            fields.append(field)
+            if start:
+                columns[field] = np.full(capacity, np.nan)
+            else:
+                columns[field] = np.empty(capacity, dtype=_dtype_of(value))
+
+
+def _fill(columns, fields, chunk, start, capacity, infer):
+    if infer:
+        _add_columns(columns, fields, chunk, start, capacity)
+    for field in fields:
+        _store(columns, field, start, [doc.get(field) for doc in chunk])
+
+
+def iter_dataframes(collection, filter=None, projection=None, schema=None,
+                    chunk_rows=CHUNK_ROWS):
+    """
+    Yield one DataFrame per chunk_rows matching documents.
+    Without a schema each frame has a column for every field its documents
+    carry; later frames may have columns the earlier ones lack.
+    """
+    cursor, fields = _open(collection, filter, projection, schema, chunk_rows)
+    for chunk in _chunks(cursor, chunk_rows):
+        if schema is None:
+            fields = []
+            columns = {}
+        else:
+            columns = {field: np.empty(len(chunk), dtype=schema[field]) for field in fields}
+        _fill(columns, fields, chunk, 0, len(chunk), schema is None)
+        yield pd.DataFrame(columns, columns=fields, copy=False)
+
+
+def find_to_dataframe(collection, filter=None, projection=None, schema=None,
+                      chunk_rows=CHUNK_ROWS):
+    """
+    Return the documents matching filter as one DataFrame.
+    schema maps field -> dtype and fixes the columns; when omitted there is
+    one column per field found in any matching document, typed from its first
+    value and left missing (NaN or None) where a document lacks it. Columns
+    are preallocated from count_documents() and filled chunk by chunk
+    straight from the cursor.
+    """
+    filter = filter or {}
+    cursor, fields = _open(collection, filter, projection, schema, chunk_rows)
+    capacity = collection.count_documents(filter)
+    columns = {field: np.empty(capacity, dtype=schema[field]) for field in fields}
+    rows = 0
+    for chunk in _chunks(cursor, chunk_rows):
+        if rows + len(chunk) > capacity:
+            # Documents were inserted between the count and the scan
+            capacity = max(capacity * 2, rows + len(chunk))
+            for field in fields:
+                columns[field] = np.resize(columns[field], capacity)
+        _fill(columns, fields, chunk, rows, capacity, schema is None)
+        rows += len(chunk)
+    if rows < capacity:
+        columns = {field: column[:rows] for field, column in columns.items()}
+    return pd.DataFrame(columns, columns=fields, copy=False)
@@ -0,0 +1,166 @@
+"""
+Query plans for MockCollection, shaped like MongoDB's explain output.
+find(...).explain() and aggregate(..., explain=True) report the winning
+plan (COLLSCAN, IXSCAN + FETCH on a named index, COLUMN_SCAN for the
+columnar backend) with the SORT / SKIP / LIMIT / PROJECTION stages on top,
+and list an index plan under rejectedPlans when the index selects too much
+of the collection to beat a scan. They then run the query to fill in
+executionStats: nReturned, keys and documents examined and the execution time.
+"""
+
+import copy
+import time
+
+from aggregation import run_pipeline
+from instrumentation import examined
+
+_BOUND_OPS = {"$gt": "(", "$gte": "[", "$lt": ")", "$lte": "]"}
+
+
+def index_bounds(spec):
+    """MongoDB-style bounds ("[3.7, inf.0]") for the predicate an index answers"""
+    if not isinstance(spec, dict):
+        return [f"[{spec!r}, {spec!r}]"]
+    if "$eq" in spec:
+        return [f"[{spec['$eq']!r}, {spec['$eq']!r}]"]
+    low, low_bracket = "MinKey", "["
+    high, high_bracket = "MaxKey", "]"
+    for op, value in spec.items():
+        if op in ("$gt", "$gte"):
+            low, low_bracket = repr(value), _BOUND_OPS[op]
+        elif op in ("$lt", "$lte"):
+            high, high_bracket = repr(value), _BOUND_OPS[op]
+    return [f"{low_bracket}{low}, {high}{high_bracket}"]
+
+
+def collection_scan(query):
+    stage = {"stage": "COLLSCAN", "direction": "forward"}
+    if query:
+        stage["filter"] = query
+    return stage
+
+
+def index_scan(index, query, exact):
+    """FETCH over an IXSCAN of index; the FETCH re-checks query unless the index answers it"""
+    ixscan = {
+        "stage": "IXSCAN",
+        "keyPattern": {index.field: 1},
+        "indexName": f"{index.field}_1",
+        "indexType": index.kind,
+        "isUnique": index.unique,
+        "indexBounds": {index.field: index_bounds(query[index.field])},
+    }
+    fetch = {"stage": "FETCH", "inputStage": ixscan}
+    if not exact:
+        fetch["filter"] = query
+    return fetch
+
+
+def plan_summary(plan):
+    """One-line view of a plan, innermost stage first (IXSCAN dept_1 -> FETCH -> LIMIT)"""
+    stages = []
+    while plan is not None:
+        name = plan["stage"]
+        if "indexName" in plan:
+            name += f" {plan['indexName']}"
+        stages.append(name)
+        plan = plan.get("inputStage")
+    return " -> ".join(reversed(stages))
+
+
+def _annotate(stage, keys, docs, returned):
+    """Copy of a plan with the execution counters on the stages that produced them"""
+    stage = copy.deepcopy(stage)
+    stage["nReturned"] = returned
+    leaf = stage
+    while "inputStage" in leaf:
+        if leaf["stage"] == "FETCH":
+            leaf["docsExamined"] = docs
+        leaf = leaf["inputStage"]
+    if leaf["stage"] == "IXSCAN":
+        leaf["keysExamined"] = keys
+    else:
+        leaf["docsExamined"] = docs
+    return stage
+
+
+def _report(collection, query, plan, rejected, keys, docs, returned, seconds):
+    """queryPlanner + executionStats document for a plan that has been run"""
+    return {
+        "queryPlanner": {
+            "namespace": getattr(collection, "name", type(collection).__name__),
+            "parsedQuery": query or {},
+            "winningPlan": plan,
+            "rejectedPlans": rejected,
+        },
+        "executionStats": {
+            "executionSuccess": True,
+            "nReturned": returned,
+            "executionTimeMillis": round(seconds * 1000, 3),
+            "totalKeysExamined": keys,
+            "totalDocsExamined": docs,
+            "executionStages": _annotate(plan, keys, docs, returned),
+        },
+    }
+
+
+def explain_find(cursor):
+    """Plan and execution stats of a find cursor (the cursor itself is not consumed)"""
+    plan, keys, rejected = cursor.collection._plan(cursor.query)
+    if cursor._sort:
+        sort = {"stage": "SORT", "sortPattern": dict(cursor._sort)}
+        if cursor._limit:
+            sort["limitAmount"] = cursor._skip + cursor._limit
+        sort["inputStage"] = plan
+        plan = sort
+    if cursor._skip:
+        plan = {"stage": "SKIP", "skipAmount": cursor._skip, "inputStage": plan}
+    if cursor._limit:
+        plan = {"stage": "LIMIT", "limitAmount": cursor._limit, "inputStage": plan}
+    if cursor.projection:
+        plan = {"stage": "PROJECTION_SIMPLE", "transformBy": cursor.projection, "inputStage": plan}
+    found, scanned, seconds = examined(lambda: list(cursor._run()))
+    return _report(cursor.collection, cursor.query, plan, rejected, keys, scanned, len(found), seconds)
+
+
+class _Probe:
+    """Iterator counting the documents a pipeline stage hands on, and the time spent so far"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.returned = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            doc = next(self.docs)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.returned += 1
+        return doc
+
+
+def explain_aggregate(collection, pipeline):
+    """Plan and per-stage execution stats of an aggregation pipeline"""
+    probes = []
+
+    def probe(docs):
+        probes.append(_Probe(docs))
+        return probes[-1]
+
+    pushed = pipeline[:1] if pipeline and "$match" in pipeline[0] else []
+    query = pushed[0]["$match"] if pushed else None
+    plan, keys, rejected = collection._plan(query)
+    _, scanned, _ = examined(lambda: list(run_pipeline(collection, pipeline, probe)))
+    # probes[0] is the $cursor stage (with the pushed-down $match), then one per stage
+    source = probes[0]
+    cursor = _report(collection, query, plan, rejected, keys, scanned, source.returned, source.seconds)
+    stages = [{"$cursor": cursor}] + [dict(stage) for stage in pipeline[len(pushed):]]
+    for stage, stats in zip(stages, probes):
+        stage["nReturned"] = stats.returned
+        stage["executionTimeMillisEstimate"] = round(stats.seconds * 1000, 3)
+    return {"explainVersion": "1", "stages": stages, "command": {"pipeline": pipeline}}
@@ -0,0 +1,88 @@
+"""
+Streaming CSV/Excel export straight from a cursor.
+Rows are written as they come off the cursor (buffered, flush_rows at a
+time for CSV; through a write-only workbook for XLSX), so export memory
+stays constant no matter how many documents the collection holds.
+"""
+
+import csv
+import time
+
+FLUSH_ROWS = 1000
+
+
+class ExportResult:
+    """Outcome of an export: rows written, elapsed seconds and throughput"""
+
+    def __init__(self, path, rows, seconds):
+        self.path = path
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+    def __repr__(self):
+        return (f"ExportResult(path={self.path!r}, rows={self.rows}, "
+                f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:,.0f})")
+
+
+def _row(doc, columns):
+    return [doc.get(column) for column in columns]
+
+
+def export_csv(cursor, path, columns, flush_rows=FLUSH_ROWS, encoding="utf-8"):
+    """
+    Write the documents from cursor to a CSV file at path.
+    columns is the list of fields to export (a schema dict works too); missing
+    fields are left empty. Rows are buffered and written flush_rows at a time.
+    """
+    if flush_rows < 1:
+        raise ValueError("flush_rows must be >= 1")
+    columns = list(columns)
+    start = time.perf_counter()
+    rows = 0
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        buffer = []
+        for doc in cursor:
+            buffer.append(_row(doc, columns))
+            if len(buffer) >= flush_rows:
+                writer.writerows(buffer)
+                rows += len(buffer)
+                buffer.clear()
+        writer.writerows(buffer)
+        rows += len(buffer)
+    return ExportResult(path, rows, time.perf_counter() - start)
+
+
+def _cell(value):
+    """openpyxl only stores scalars; embedded lists and documents become text"""
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return value
+
+
+def export_xlsx(cursor, path, columns, sheet_name="Students"):
+    """
+    Write the documents from cursor to an XLSX file at path.
+    Uses an openpyxl write-only workbook, which streams rows to disk
+    instead of keeping every cell in memory.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("Excel export requires openpyxl (pip install openpyxl)") from e
+    columns = list(columns)
+    start = time.perf_counter()
+    rows = 0
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(columns)
+    for doc in cursor:
+        sheet.append([_cell(value) for value in _row(doc, columns)])
+        rows += 1
+    workbook.save(path)
+    return ExportResult(path, rows, time.perf_counter() - start)
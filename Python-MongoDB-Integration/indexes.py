@@ -0,0 +1,345 @@
+"""
+Secondary indexes for the in-memory MockCollection.
+Hash indexes map field values to the set of matching document _ids so that
+equality queries only touch the documents they return. Sorted indexes keep
+(value, _id) entries in order so range predicates resolve to a slice.
+"""
+
+import math
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime
+
+_EMPTY = frozenset()
+
+
+class DuplicateKeyError(Exception):
+    """Raised when a write would break a unique index"""
+
+
+class _ListKey:
+    """Tag that keeps list values distinct from tuples inside index keys"""
+
+
+class _DictKey:
+    """Tag that keeps embedded documents distinct from tuples inside index keys"""
+
+
+def index_key(value):
+    """Return a hashable key for value with the same equality semantics"""
+    if isinstance(value, list):
+        return (_ListKey, tuple(index_key(v) for v in value))
+    if isinstance(value, dict):
+        return (_DictKey, tuple((k, index_key(v)) for k, v in value.items()))
+    return value
+
+
+def _eq_value(spec):
+    """Return (True, value) when spec is a plain or $eq-only equality predicate"""
+    if not isinstance(spec, dict):
+        return True, spec
+    if len(spec) == 1 and "$eq" in spec:
+        return True, spec["$eq"]
+    return False, None
+
+
+class HashIndex:
+    """Hash index mapping each value of a field to the set of matching _ids"""
+    kind = "hash"
+
+    def __init__(self, field, unique=False):
+        self.field = field
+        self.unique = unique
+        self.entries = {}
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.entries.values())
+
+    def add(self, doc):
+        if self.field not in doc:
+            return
+        key = index_key(doc[self.field])
+        ids = self.entries.get(key)
+        if ids is None:
+            self.entries[key] = {doc["_id"]}
+        else:
+            ids.add(doc["_id"])
+
+    def add_many(self, docs):
+        for doc in docs:
+            self.add(doc)
+
+    def remove(self, doc):
+        if self.field not in doc:
+            return
+        key = index_key(doc[self.field])
+        ids = self.entries.get(key)
+        if ids is None:
+            return
+        ids.discard(doc["_id"])
+        if not ids:
+            del self.entries[key]
+
+    def remove_many(self, docs):
+        for doc in docs:
+            self.remove(doc)
+
+    def check(self, value, doc_id=None):
+        """Raise DuplicateKeyError if value is already taken by another document"""
+        if not self.unique:
+            return
+        ids = self.entries.get(index_key(value), _EMPTY)
+        if ids and ids != {doc_id}:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error: {self.field} {value!r}"
+            )
+
+    def duplicates(self, docs):
+        """Positions in docs whose value is taken by the index or by an earlier doc"""
+        if not self.unique:
+            return []
+        seen = set()
+        bad = []
+        for i, doc in enumerate(docs):
+            if self.field not in doc:
+                continue
+            key = index_key(doc[self.field])
+            if key in self.entries or key in seen:
+                bad.append(i)
+            else:
+                seen.add(key)
+        return bad
+
+    def build(self, docs):
+        """Index every document in docs"""
+        for doc in docs:
+            if self.field in doc:
+                self.check(doc[self.field], doc["_id"])
+            self.add(doc)
+
+    def lookup(self, value):
+        """Return the set of _ids whose field equals value"""
+        return self.entries.get(index_key(value), _EMPTY)
+
+    def counts(self):
+        """Return {value: number of _ids}, or None if a key is an array or embedded document"""
+        if any(isinstance(key, tuple) for key in self.entries):
+            return None
+        return {key: len(ids) for key, ids in self.entries.items()}
+
+    def select(self, spec):
+        """Return (ids, exact) for the query predicate spec, or None if unusable"""
+        is_eq, value = _eq_value(spec)
+        if is_eq:
+            return self.lookup(value), True
+        if "$eq" in spec:
+            return self.lookup(spec["$eq"]), False
+        return None
+
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte", "$eq")
+
+_AFTER = (math.inf,)
+
+
+def sort_rank(value):
+    """Return the type bracket used to order value, or None if it cannot be ranked"""
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return 0
+    if isinstance(value, str):
+        return 1
+    if isinstance(value, datetime):
+        return 2
+    if isinstance(value, date):
+        return 3
+    return None
+
+
+class IndexRange:
+    """Lazy view over the _ids in a slice of a SortedIndex, in index order"""
+    __slots__ = ("index", "start", "stop")
+
+    def __init__(self, index, start, stop):
+        self.index = index
+        self.start = start
+        self.stop = max(start, stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        index = self.index
+        entries = index.entries
+        version = index.version
+        i, stop = self.start, self.stop
+        if i == stop:
+            return
+        high = entries[stop - 1]
+        while i < stop:
+            entry = entries[i]
+            yield entry[2]
+            if index.version == version:
+                i += 1
+            else:
+                # The index changed under the open scan: find the place again by key
+                entries = index.entries
+                version = index.version
+                i = bisect_right(entries, entry)
+                stop = bisect_right(entries, high)
+
+
+class SortedIndex:
+    """Ordered index of (value, _id) entries for range queries on numbers, strings and dates"""
+    kind = "sorted"
+
+    def __init__(self, field, unique=False):
+        self.field = field
+        self.unique = unique
+        self.entries = []
+        # Bumped by every change to entries, so open IndexRange scans can re-seek
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _entry(self, doc):
+        if self.field not in doc:
+            return None
+        value = doc[self.field]
+        rank = sort_rank(value)
+        if rank is None:
+            return None
+        return (rank, value, doc["_id"])
+
+    def add(self, doc):
+        entry = self._entry(doc)
+        if entry is not None:
+            insort(self.entries, entry)
+            self.version += 1
+
+    def add_many(self, docs):
+        """Add the entries of docs with one merge sort instead of one insort each"""
+        entries = [entry for entry in map(self._entry, docs) if entry is not None]
+        self.version += 1
+        if len(entries) < 32:
+            for entry in entries:
+                insort(self.entries, entry)
+            return
+        self.entries.extend(entries)
+        self.entries.sort()
+
+    def remove(self, doc):
+        entry = self._entry(doc)
+        if entry is None:
+            return
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+            self.version += 1
+
+    def remove_many(self, docs):
+        """Drop the entries of docs in one pass instead of one list shift per document"""
+        self.version += 1
+        if len(docs) < 32:
+            for doc in docs:
+                self.remove(doc)
+            return
+        doomed = {doc["_id"] for doc in docs}
+        self.entries = [entry for entry in self.entries if entry[2] not in doomed]
+
+    def build(self, docs):
+        """Index every document in docs with a single sort"""
+        entries = [entry for entry in map(self._entry, docs) if entry is not None]
+        entries.sort()
+        if self.unique:
+            for prev, entry in zip(entries, entries[1:]):
+                if prev[:2] == entry[:2]:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error: {self.field} {entry[1]!r}"
+                    )
+        self.entries = entries
+        self.version += 1
+
+    def _holders(self, rank, value):
+        """Range of entry positions holding value"""
+        lo = bisect_left(self.entries, (rank, value))
+        hi = bisect_right(self.entries, (rank, value) + _AFTER)
+        return range(lo, hi)
+
+    def check(self, value, doc_id=None):
+        """Raise DuplicateKeyError if value is already taken by another document"""
+        if not self.unique:
+            return
+        rank = sort_rank(value)
+        if rank is None:
+            return
+        if any(self.entries[i][2] != doc_id for i in self._holders(rank, value)):
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error: {self.field} {value!r}"
+            )
+
+    def duplicates(self, docs):
+        """Positions in docs whose value is taken by the index or by an earlier doc"""
+        if not self.unique:
+            return []
+        seen = set()
+        bad = []
+        for i, doc in enumerate(docs):
+            # Keyed without _id, so documents can be checked before they get one
+            if self.field not in doc:
+                continue
+            value = doc[self.field]
+            rank = sort_rank(value)
+            if rank is None:
+                continue
+            key = (rank, value)
+            if key in seen or self._holders(*key):
+                bad.append(i)
+            else:
+                seen.add(key)
+        return bad
+
+    def bounds(self, spec):
+        """Return the (start, stop) slice matching spec, or None if the index cannot answer it"""
+        if not isinstance(spec, dict):
+            spec = {"$eq": spec}
+        if not spec or any(op not in RANGE_OPERATORS for op in spec):
+            return None
+        ranks = {sort_rank(value) for value in spec.values()}
+        if len(ranks) != 1 or None in ranks:
+            return None
+        rank = ranks.pop()
+        entries = self.entries
+        start = bisect_left(entries, (rank,))
+        stop = bisect_left(entries, (rank + 1,))
+        for op, value in spec.items():
+            if op in ("$gt", "$lte"):
+                pos = bisect_right(entries, (rank, value) + _AFTER, start, max(start, stop))
+            else:
+                pos = bisect_left(entries, (rank, value), start, max(start, stop))
+            if op in ("$gt", "$gte", "$eq"):
+                start = max(start, pos)
+            if op in ("$lt", "$lte", "$eq"):
+                if op == "$eq":
+                    pos = bisect_right(entries, (rank, value) + _AFTER, start, max(start, stop))
+                stop = min(stop, pos)
+        return start, max(start, stop)
+
+    def count(self, spec):
+        """Count the entries matching spec without touching any document"""
+        bounds = self.bounds(spec)
+        return None if bounds is None else bounds[1] - bounds[0]
+
+    def select(self, spec):
+        """Return (ids, exact) for the query predicate spec, or None if unusable"""
+        bounds = self.bounds(spec)
+        if bounds is None:
+            return None
+        return IndexRange(self, *bounds), True
+
+
+INDEX_KINDS = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+}
@@ -0,0 +1,352 @@
+"""
+Per-operation instrumentation for MockCollection.
+Listeners attached with instrument() get started(event) and finished(event)
+calls for every collection operation, with the operation name, query shape,
+duration and the documents scanned, returned and modified. With no
+listener attached an operation only pays for an attribute check and a
+thread-local lookup.
+MetricsCollector is the built-in listener: counters and latency histograms.
+command_monitoring.py feeds the same events from PyMongo's command monitoring.
+"""
+
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one is open
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"),
+)
+
+_local = threading.local()
+
+
+class OperationEvent:
+    """One collection operation, filled in as it runs"""
+    __slots__ = (
+        "operation", "command", "namespace", "shape", "started_at", "duration",
+        "scanned", "returned", "modified", "failure", "source", "_finished",
+    )
+
+    def __init__(self, operation, command, namespace, shape=None, source=None):
+        self.operation = operation
+        self.command = command
+        self.namespace = namespace
+        self.shape = shape
+        self.started_at = time.time()
+        self.duration = 0.0
+        # None when the backend cannot tell (PyMongo does not report docsExamined)
+        self.scanned = 0
+        self.returned = 0
+        self.modified = 0
+        self.failure = None
+        # The collection reporting the event
+        self.source = source
+        self._finished = False
+
+    def __repr__(self):
+        return (f"OperationEvent({self.operation} {self.shape or ''} "
+                f"{self.duration * 1000:.3f} ms scanned={self.scanned} "
+                f"returned={self.returned} modified={self.modified})")
+
+
+class OperationListener:
+    """Base class for instrumentation listeners"""
+
+    def started(self, event):
+        pass
+
+    def finished(self, event):
+        pass
+
+
+def shape_of(value):
+    """Query or pipeline with every literal replaced by "?" (field references are kept)"""
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {shape_of(val)}" for key, val in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(shape_of(val) for val in value) + "]"
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def instrument(collection, *listeners):
+    """Start reporting the operations of collection to listeners"""
+    collection.listeners = tuple(collection.listeners) + listeners
+    return collection
+
+
+def uninstrument(collection, *listeners):
+    """Detach listeners (all of them if none are given)"""
+    collection.listeners = tuple(
+        listener for listener in collection.listeners if listeners and listener not in listeners
+    )
+    return collection
+
+
+# ---- event lifecycle ----------------------------------------------------------
+
+def start(collection, operation, command, query=None):
+    name = getattr(collection, "name", type(collection).__name__)
+    shape = None if query is None else shape_of(query)
+    event = OperationEvent(operation, command, name, shape, collection)
+    for listener in collection.listeners:
+        listener.started(event)
+    return event
+
+
+def finish(collection, event):
+    if event._finished:
+        return
+    event._finished = True
+    for listener in collection.listeners:
+        listener.finished(event)
+
+
+class _Active:
+    """Make event the current operation of this thread while its code runs"""
+    __slots__ = ("event", "previous", "began")
+
+    def __init__(self, event):
+        self.event = event
+
+    def __enter__(self):
+        self.previous = getattr(_local, "event", None)
+        _local.event = self.event
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.event.duration += time.perf_counter() - self.began
+        _local.event = self.previous
+
+
+def nested(collection):
+    """True inside another operation of collection (a bulk_write upserting through insert_one)"""
+    event = getattr(_local, "event", None)
+    return event is not None and event.source is collection
+
+
+def scanned(docs):
+    """Count the documents drawn from docs against the running operation, if any"""
+    event = getattr(_local, "event", None)
+    if event is None:
+        return docs
+    return _counting(docs, event)
+
+
+def _counting(docs, event):
+    for doc in docs:
+        event.scanned += 1
+        yield doc
+
+
+def add_scanned(count):
+    """Charge documents examined in bulk (a vectorized scan) to the running operation"""
+    event = getattr(_local, "event", None)
+    if event is not None:
+        event.scanned += count
+
+
+def examined(call):
+    """Run call() as an unreported operation; return (result, documents scanned, seconds)"""
+    event = OperationEvent(None, None, None)
+    with _Active(event):
+        result = call()
+    return result, event.scanned, event.duration
+
+
+def traced(collection, event, docs):
+    """Yield from docs, charging the time spent producing each document to event"""
+    docs = iter(docs)
+    try:
+        while True:
+            with _Active(event):
+                try:
+                    doc = next(docs)
+                except StopIteration:
+                    return
+            event.returned += 1
+            yield doc
+    except Exception as e:
+        event.failure = repr(e)
+        raise
+    finally:
+        finish(collection, event)
+
+
+def observe(collection, operation, command, query, call):
+    """Start an event and run call() as its active operation; return (event, result) unfinished"""
+    event = start(collection, operation, command, query)
+    try:
+        with _Active(event):
+            result = call()
+    except Exception as e:
+        event.failure = repr(e)
+        finish(collection, event)
+        raise
+    return event, result
+
+
+def instrumented(operation, command, argument=None, outcome=None):
+    """
+    Decorator reporting a collection method to the collection's listeners.
+    argument names the filter or pipeline parameter that gives the shape;
+    outcome(event, result) fills in the counts, or is "lazy" for methods
+    returning an iterator, whose event finishes when the iterator does.
+    """
+    def decorate(method):
+        position = list(inspect.signature(method).parameters).index(argument) - 1 if argument else None
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.listeners or nested(self):
+                return method(self, *args, **kwargs)
+            query = None
+            if argument:
+                query = args[position] if len(args) > position else kwargs.get(argument)
+                if query is None:
+                    query = {}
+            event, result = observe(self, operation, command, query, lambda: method(self, *args, **kwargs))
+            if outcome == "lazy":
+                return traced(self, event, result)
+            if outcome is not None:
+                outcome(event, result)
+            finish(self, event)
+            return result
+        return wrapper
+    return decorate
+
+
+def inserted_one(event, result):
+    event.modified = 1
+
+
+def inserted_many(event, result):
+    event.modified = len(result.inserted_ids)
+
+
+def found(event, result):
+    event.returned = int(result is not None)
+
+
+def counted(event, result):
+    event.returned = 1
+
+
+def grouped(event, result):
+    event.returned = len(result)
+
+
+def written(event, result):
+    event.modified = (
+        getattr(result, "inserted_count", 0) + getattr(result, "modified_count", 0)
+        + getattr(result, "deleted_count", 0) + getattr(result, "upserted_count", 0)
+    )
+    if getattr(result, "upserted_id", None) is not None:
+        event.modified += 1
+
+
+# ---- built-in aggregator ----------------------------------------------------------
+
+class _Stats:
+    __slots__ = ("count", "errors", "total", "max", "scanned", "returned", "modified",
+                 "histogram", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.scanned = 0
+        self.returned = 0
+        self.modified = 0
+        self.histogram = [0] * len(BUCKETS)
+        self.shapes = {}
+
+    def add(self, event):
+        self.count += 1
+        self.errors += event.failure is not None
+        self.total += event.duration
+        self.max = max(self.max, event.duration)
+        if event.scanned is not None:
+            self.scanned += event.scanned
+        self.returned += event.returned
+        self.modified += event.modified
+        self.histogram[bisect_left(BUCKETS, event.duration)] += 1
+        if event.shape is not None:
+            self.shapes[event.shape] = self.shapes.get(event.shape, 0) + 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (capped at the max seen)"""
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.histogram):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+            "scanned": self.scanned,
+            "returned": self.returned,
+            "modified": self.modified,
+            "histogram_ms": {
+                ("inf" if bound == float("inf") else bound * 1000): n
+                for bound, n in zip(BUCKETS, self.histogram) if n
+            },
+            "shapes": dict(self.shapes),
+        }
+
+
+class MetricsCollector(OperationListener):
+    """
+    Counters and latency histograms per command (insert, find, update, ...),
+    the key PyMongo's command events and MockCollection's operations share;
+    by="operation" splits them per MockCollection method instead.
+    """
+
+    def __init__(self, by="command"):
+        self.by = by
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def finished(self, event):
+        key = getattr(event, self.by)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _Stats()
+            stats.add(event)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.as_dict() for key, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def report(self):
+        """Text table of the snapshot"""
+        lines = [f"{self.by:<16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} "
+                 f"{'scanned':>9} {'returned':>9} {'modified':>9}"]
+        for key, stats in sorted(self.snapshot().items()):
+            lines.append(
+                f"{key:<16} {stats['count']:>7} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+                f"{stats['max_ms']:>9.3f} {stats['scanned']:>9} {stats['returned']:>9} "
+                f"{stats['modified']:>9}"
+            )
+        return "\n".join(lines)
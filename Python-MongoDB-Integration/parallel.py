@@ -0,0 +1,529 @@
+"""
+Process-pool scans for large in-memory MockCollections.
+The fields a query needs are copied once per collection version into
+shared-memory column buffers: numbers as int64/float64 arrays, any other
+value as int32 codes into a category list. Worker processes attach to the
+buffers by name, so no document is ever pickled; each one filters, counts
+or groups a chunk of rows and sends back a small partial (a count, the
+matching _ids, per-group sums) that the parent merges. Scans the serial
+path finishes cheaply, below PARALLEL_THRESHOLD documents, stay serial.
+"""
+
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indexes import index_key
+from instrumentation import add_scanned
+from query_compiler import OPERATORS, compile_query
+
+# Documents the serial path would examine before a scan is sent to the pool
+PARALLEL_THRESHOLD = 200_000
+
+# Category codes handed to workers as a list; larger selections go as a lookup table
+MAX_CODE_LIST = 64
+
+# $group accumulators that can be computed from per-chunk partials
+PARTIAL_ACCUMULATORS = ("$sum", "$avg", "$min", "$max")
+
+_MISSING = object()
+_SCALARS = (str, int, float, type(None))
+_INT64_MAX = 2**63 - 1
+_EXACT_FLOAT = 2**53
+
+_COMPARE = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$eq": np.equal,
+}
+
+
+# ---- worker side -------------------------------------------------------------
+
+# Shared blocks this worker has attached to: name -> (SharedMemory, array)
+_ATTACHED = {}
+
+
+def _attach(spec):
+    name, dtype, length = spec
+    entry = _ATTACHED.get(name)
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=name)
+        entry = _ATTACHED[name] = (shm, np.ndarray(length, dtype, buffer=shm.buf))
+    return entry[1]
+
+
+def _release(live):
+    """Detach from blocks the parent has since replaced, so their memory can be freed"""
+    for name in [name for name in _ATTACHED if name not in live]:
+        shm, array = _ATTACHED.pop(name)
+        del array
+        shm.close()
+
+
+def _mask(predicates, start, stop):
+    """Row mask of the chunk for all predicates, or None when there are none"""
+    mask = None
+    for kind, specs, arg in predicates:
+        if kind == "num":
+            values = _attach(specs[0])[start:stop]
+            if specs[1] is None:
+                keep = np.ones(stop - start, dtype=bool)
+            else:
+                keep = _attach(specs[1])[start:stop].copy()
+            for op, value in arg:
+                keep &= _COMPARE[op](values, value)
+        elif kind == "codes":
+            keep = np.isin(_attach(specs[0])[start:stop], arg)
+        else:
+            # Lookup table over the codes; its last entry answers code -1 (missing)
+            keep = arg[_attach(specs[0])[start:stop]]
+        if mask is None:
+            mask = keep
+        else:
+            mask &= keep
+    return mask
+
+
+def _group_partial(mask, start, stop, key, size, values):
+    """Per-group counts, first rows and value partials of one chunk"""
+    rows = np.arange(start, stop) if mask is None else np.flatnonzero(mask) + start
+    # Slot 0 is the missing field, slot c + 1 category c
+    slots = _attach(key)[start:stop] + 1
+    if mask is not None:
+        slots = slots[mask]
+    first = np.full(size, _INT64_MAX)
+    # With repeated indices the last assignment wins, so go backwards to keep the first row
+    first[slots[::-1]] = rows[::-1]
+    partial = {"count": np.bincount(slots, minlength=size), "first": first}
+    for field, (value_spec, present_spec) in values.items():
+        column = _attach(value_spec)[start:stop]
+        present = np.ones(stop - start, dtype=bool) if present_spec is None else (
+            _attach(present_spec)[start:stop]
+        )
+        if mask is not None:
+            column, present = column[mask], present[mask]
+        column, where = column[present], slots[present]
+        if column.dtype.kind == "i":
+            sums = np.zeros(size, dtype="int64")
+            np.add.at(sums, where, column)
+            low = np.full(size, np.iinfo("int64").max)
+            high = np.full(size, np.iinfo("int64").min)
+        else:
+            sums = np.bincount(where, weights=column, minlength=size)
+            low = np.full(size, np.inf)
+            high = np.full(size, -np.inf)
+        np.minimum.at(low, where, column)
+        np.maximum.at(high, where, column)
+        partial[field] = (np.bincount(where, minlength=size), sums, low, high)
+    return partial
+
+
+def _scan(task):
+    """Run one chunk of a scan in a worker process"""
+    action, start, stop, predicates, arg, live = task
+    _release(live)
+    mask = _mask(predicates, start, stop)
+    if action == "count":
+        return stop - start if mask is None else int(np.count_nonzero(mask))
+    if action == "ids":
+        ids = _attach(arg)[start:stop]
+        return ids.copy() if mask is None else ids[mask]
+    return _group_partial(mask, start, stop, *arg)
+
+
+# ---- parent side: column snapshots -------------------------------------------
+
+def _values(store, field):
+    """(values, present) of field over the stored documents, in storage order"""
+    columns = getattr(store, "columns", None)
+    if columns is not None:
+        # ColumnarStore: schema fields are NumPy columns already
+        rows = np.flatnonzero(store.alive[:store.size])
+        if field == "_id":
+            return store.ids[rows], None
+        if field in columns and not store.spilled[field]:
+            return columns[field][rows], store.present[field][rows]
+        docs = map(store.get, store.ids[rows].tolist())
+    else:
+        docs = iter(store)
+    n = len(store)
+    if field == "_id":
+        return np.fromiter((doc["_id"] for doc in docs), dtype=object, count=n), None
+    values = np.fromiter((doc.get(field, _MISSING) for doc in docs), dtype=object, count=n)
+    present = np.fromiter((value is not _MISSING for value in values), dtype=bool, count=n)
+    return values, present
+
+
+def _numbers(values, present):
+    """
+    (numbers, mixed): values as an int64 or float64 array (0 where missing),
+    mixed if ints and floats had to share it; None if one is not a number.
+    """
+    if values.dtype.kind in "if":
+        return values, False
+    live = values if present is None else values[present]
+    kind = pd.api.types.infer_dtype(live, skipna=False)
+    mixed = kind == "mixed-integer-float"
+    try:
+        if kind == "integer":
+            numbers = live.astype("int64")
+        elif kind == "floating" or kind == "empty":
+            numbers = live.astype("float64")
+        elif mixed:
+            # Mixed ints only compare exactly as floats below 2**53
+            if any(type(value) is int and abs(value) > _EXACT_FLOAT for value in live):
+                return None
+            numbers = live.astype("float64")
+        else:
+            return None
+    except OverflowError:
+        return None
+    if present is None:
+        return numbers, mixed
+    column = np.zeros(len(values), dtype=numbers.dtype)
+    column[present] = numbers
+    return column, mixed
+
+
+def _categories(values, present):
+    """(codes, categories): int32 codes into the distinct values, -1 where missing"""
+    codes = np.full(len(values), -1, dtype="int32")
+    live = values if present is None else values[present]
+    if values.dtype.kind in "if" or pd.api.types.infer_dtype(live, skipna=False) == "string":
+        found, uniques = pd.factorize(live, use_na_sentinel=False)
+        codes[present if present is not None else slice(None)] = found
+        return codes, list(uniques.tolist())
+    # Other values are keyed like $group keys them, so equal values share a code
+    lookup = {}
+    categories = []
+    found = np.empty(len(live), dtype="int32")
+    try:
+        for i, value in enumerate(live):
+            key = index_key(value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(categories)
+                categories.append(value)
+            found[i] = code
+    except TypeError:
+        return None
+    codes[present if present is not None else slice(None)] = found
+    return codes, categories
+
+
+class _Column:
+    """One field of a collection version, held in shared memory"""
+    __slots__ = ("specs", "categories", "strings", "mixed", "nan", "peak", "segments")
+
+    def __init__(self, arrays, categories=None, mixed=False):
+        self.segments = []
+        self.specs = tuple(None if array is None else self._share(array) for array in arrays)
+        self.categories = categories
+        # Vectorized category matching is only safe when every category is a str
+        self.strings = categories is not None and all(type(c) is str for c in categories)
+        # ints stored as floats: sums and extremes would come back with the wrong type
+        self.mixed = mixed
+        kind = arrays[0].dtype.kind if categories is None else None
+        self.nan = kind == "f" and bool(np.isnan(arrays[0]).any())
+        # Largest magnitude in an int64 column, to rule out overflowing sums
+        self.peak = int(np.abs(arrays[0]).max()) if kind == "i" and len(arrays[0]) else 0
+
+    def _share(self, array):
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(len(array), array.dtype, buffer=shm.buf)[:] = array
+        self.segments.append(shm)
+        return shm.name, array.dtype.str, len(array)
+
+    def release(self):
+        for shm in self.segments:
+            shm.close()
+            shm.unlink()
+        self.segments = []
+
+
+def _shutdown(columns, executor):
+    for _, column in columns.values():
+        if column is not None:
+            column.release()
+    columns.clear()
+    if executor:
+        executor[0].shutdown()
+
+
+# ---- parent side: scanner ----------------------------------------------------
+
+def _numeric_ops(spec):
+    """[(op, value)] of a query clause when it only compares with numbers, else None"""
+    if isinstance(spec, dict):
+        ops = [(op, spec[op]) for op in OPERATORS if op in spec]
+    else:
+        ops = [("$eq", spec)]
+    for _, value in ops:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        if isinstance(value, int) and abs(value) > _INT64_MAX:
+            return None
+    return ops
+
+
+def _allowed(column, field, spec):
+    """Boolean per category: does a document holding it match {field: spec}"""
+    categories = column.categories
+    if isinstance(spec, dict):
+        ops = [(op, spec[op]) for op in OPERATORS if op in spec]
+    else:
+        ops = [("$eq", spec)]
+    if column.strings and all(isinstance(value, _SCALARS) for _, value in ops):
+        array = np.array(categories, dtype=object)
+        allowed = np.ones(len(categories), dtype=bool)
+        for op, value in ops:
+            # Object-array comparisons call the same str operators as the compiled query
+            allowed &= _COMPARE[op](array, value).astype(bool)
+        return allowed
+    match = compile_query({field: spec})
+    return np.fromiter(
+        (match({field: value}) for value in categories), dtype=bool, count=len(categories)
+    )
+
+
+def _group_plan(accumulators):
+    """[(name, (op, source field or number to sum))] for $group accumulators, or None"""
+    plan = []
+    for name, accumulator in accumulators.items():
+        if len(accumulator) != 1:
+            return None
+        op, expr = next(iter(accumulator.items()))
+        if op not in PARTIAL_ACCUMULATORS:
+            return None
+        if isinstance(expr, str) and expr.startswith("$") and "." not in expr:
+            plan.append((name, (op, expr[1:])))
+        elif op == "$sum" and isinstance(expr, (int, float)) and not isinstance(expr, bool):
+            plan.append((name, (op, expr)))
+        else:
+            return None
+    return plan
+
+
+def _merge_groups(partials, categories, plan):
+    """$group output documents from the chunk partials, in first-seen order"""
+    counts = sum(partial["count"] for partial in partials)
+    first = np.minimum.reduce([partial["first"] for partial in partials])
+    sources = {source for _, (_, source) in plan if isinstance(source, str)}
+    merged = {}
+    for source in sources:
+        parts = [partial[source] for partial in partials]
+        merged[source] = [
+            sum(part[0] for part in parts),
+            sum(part[1] for part in parts),
+            np.minimum.reduce([part[2] for part in parts]),
+            np.maximum.reduce([part[3] for part in parts]),
+        ]
+    # A missing field and a null value are the same $group key
+    null = next((i + 1 for i, value in enumerate(categories) if value is None), None)
+    if null is not None and counts[0]:
+        counts[null] += counts[0]
+        counts[0] = 0
+        first[null] = min(first[null], first[0])
+        for n, sums, low, high in merged.values():
+            n[null] += n[0]
+            sums[null] += sums[0]
+            low[null] = min(low[null], low[0])
+            high[null] = max(high[null], high[0])
+    slots = np.flatnonzero(counts)
+    docs = []
+    for slot in slots[np.argsort(first[slots], kind="stable")].tolist():
+        doc = {"_id": None if slot == 0 else categories[slot - 1]}
+        for name, (op, source) in plan:
+            if not isinstance(source, str):
+                doc[name] = int(counts[slot]) * source
+                continue
+            n, sums, low, high = merged[source]
+            if not n[slot]:
+                doc[name] = 0 if op == "$sum" else None
+            elif op == "$sum":
+                doc[name] = sums[slot].item()
+            elif op == "$avg":
+                doc[name] = sums[slot].item() / int(n[slot])
+            else:
+                doc[name] = (low if op == "$min" else high)[slot].item()
+        docs.append(doc)
+    return docs
+
+
+class ParallelScanner:
+    """Splits large filter, count and group scans of a MockCollection across worker processes"""
+
+    def __init__(self, collection, workers=None, threshold=None):
+        self.collection = collection
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = PARALLEL_THRESHOLD if threshold is None else threshold
+        self.parallel_runs = 0
+        self.serial_runs = 0
+        # (field, "num" | "cat") -> (version, _Column or None if field cannot be encoded so)
+        self._columns = {}
+        self._executor = []
+        # Held by each scan from planning to merge: readers sharing the
+        # collection's read lock must not release a column another one's
+        # workers are still reading
+        self._lock = threading.RLock()
+        self._finalizer = weakref.finalize(self, _shutdown, self._columns, self._executor)
+
+    def close(self):
+        """Stop the worker processes and free the shared column buffers"""
+        with self._lock:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- public scans ------------------------------------------------------
+
+    def count(self, query):
+        """Number of documents matching query, or None if the serial path should answer"""
+        with self._lock:
+            predicates = self._prepare(query) if query else None
+            if predicates is None:
+                return None
+            return sum(self._run("count", predicates))
+
+    def ids(self, query):
+        """_ids of the documents matching query in natural order, or None to stay serial"""
+        with self._lock:
+            predicates = self._prepare(query)
+            ids = None if predicates is None else self._column("_id", "num")
+            if ids is None:
+                return None
+            chunks = self._run("ids", predicates, ids.specs[0])
+        return np.concatenate(chunks).tolist() if chunks else []
+
+    def matches(self, query):
+        """Documents matching query in natural order, or None to stay serial"""
+        ids = self.ids(query)
+        if ids is None:
+            return None
+        collection = self.collection
+        return collection._live(map(collection.data.get, ids))
+
+    def count_by(self, field, filter=None):
+        """{value: count} of field over documents matching filter, or None to stay serial"""
+        groups = self.group(field, {"count": {"$sum": 1}}, filter)
+        if groups is None:
+            return None
+        return {doc["_id"]: doc["count"] for doc in groups}
+
+    def group(self, field, accumulators, query=None):
+        """
+        Output of {"$group": {"_id": "$field", **accumulators}} over the documents
+        matching query, in first-seen order like the serial $group, or None
+        when an accumulator cannot be split into partials or the scan is
+        not worth the pool.
+        """
+        plan = _group_plan(accumulators)
+        if plan is None or "." in field or field.startswith("$"):
+            return None
+        with self._lock:
+            predicates = self._prepare(query)
+            key = None if predicates is None else self._column(field, "cat")
+            if key is None:
+                return None
+            values = {}
+            n = len(self.collection.data)
+            for _, (op, source) in plan:
+                if isinstance(source, str):
+                    column = self._column(source, "num")
+                    if column is None or column.peak * n > _INT64_MAX:
+                        return None
+                    if op != "$avg" and column.mixed or op in ("$min", "$max") and column.nan:
+                        return None
+                    values[source] = column.specs
+            size = len(key.categories) + 1
+            partials = self._run("group", predicates, (key.specs[0], size, values))
+        return _merge_groups(partials, key.categories, plan)
+
+    # ---- planning ----------------------------------------------------------
+
+    def _worth(self, query):
+        """True when the serial path would examine at least threshold documents"""
+        collection = self.collection
+        n = len(collection.data)
+        if not n or n < self.threshold:
+            return False
+        ids, _ = collection._index_ids(query) if query else (None, False)
+        return ids is None or len(ids) >= self.threshold
+
+    def _prepare(self, query):
+        """Worker predicates for query, or None if it should run serially"""
+        if not self._worth(query):
+            self.serial_runs += 1
+            return None
+        predicates = []
+        for field, spec in (query or {}).items():
+            ops = _numeric_ops(spec)
+            column = None if ops is None else self._column(field, "num")
+            if column is not None:
+                predicates.append(("num", column.specs, ops))
+                continue
+            column = self._column(field, "cat")
+            if column is None:
+                self.serial_runs += 1
+                return None
+            allowed = np.append(_allowed(column, field, spec), False)
+            hits = np.flatnonzero(allowed)
+            if len(hits) <= MAX_CODE_LIST:
+                predicates.append(("codes", column.specs, hits.astype("int32")))
+            else:
+                predicates.append(("table", column.specs, allowed))
+        return predicates
+
+    def _column(self, field, kind):
+        """Shared-memory column of field for the current collection version, or None"""
+        collection = self.collection
+        version = (collection.membership_version, collection.field_versions.get(field, 0))
+        cached = self._columns.get((field, kind))
+        if cached is not None:
+            if cached[0] == version:
+                return cached[1]
+            if cached[1] is not None:
+                cached[1].release()
+        values, present = _values(collection.data, field)
+        if kind == "num":
+            numbers = _numbers(values, present)
+            if field == "_id" and numbers is not None and numbers[0].dtype.kind != "i":
+                numbers = None
+            column = None if numbers is None else _Column((numbers[0], present), mixed=numbers[1])
+        else:
+            encoded = _categories(values, present)
+            column = None if encoded is None else _Column((encoded[0],), encoded[1])
+        self._columns[(field, kind)] = (version, column)
+        return column
+
+    # ---- execution ---------------------------------------------------------
+
+    def _run(self, action, predicates, arg=None):
+        """Run action over every chunk of rows in the pool; return the partials in row order"""
+        if not self._executor:
+            self._executor.append(ProcessPoolExecutor(max_workers=self.workers))
+        n = len(self.collection.data)
+        bounds = np.linspace(0, n, self.workers + 1).astype(int).tolist()
+        live = frozenset(
+            shm.name for _, column in self._columns.values()
+            if column is not None for shm in column.segments
+        )
+        tasks = [
+            (action, start, stop, predicates, arg, live)
+            for start, stop in zip(bounds, bounds[1:]) if stop > start
+        ]
+        self.parallel_runs += 1
+        add_scanned(n)
+        return list(self._executor[0].map(_scan, tasks))
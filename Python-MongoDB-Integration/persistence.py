@@ -0,0 +1,279 @@
+"""
+Durable on-disk mode for MockCollection.
+Every write is appended to an operation log as a physical record (the
+inserted document, the final field values of an update or replacement,
+the deleted _ids).
+Records are fsynced in groups, at the latest sync_interval seconds after
+the first of them was written (a timer covers writes followed by idle
+time, and an exit hook the ones still pending when the interpreter stops).
+The log is periodically folded into a compact snapshot that is loaded back
+through a memory map on reopen.
+"""
+
+import atexit
+import gc
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+
+from crud_demo import MockCollection
+from indexes import INDEX_KINDS
+
+SNAPSHOT_FILE = "snapshot.pkl"
+LOG_FILE = "oplog.{}.bin"
+
+_HEADER = struct.Struct("<I")
+_PROTOCOL = 5
+
+
+def _read_records(path):
+    """Return (records, valid_bytes) for the log at path, stopping at a torn tail"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return [], 0
+    records = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        offset = 0
+        end = len(buf)
+        while offset + _HEADER.size <= end:
+            (length,) = _HEADER.unpack_from(buf, offset)
+            start = offset + _HEADER.size
+            if start + length > end:
+                break
+            try:
+                records.append(pickle.loads(buf[start:start + length]))
+            except Exception:
+                break
+            offset = start + length
+    return records, offset
+
+
+def _load_snapshot(path):
+    if not os.path.exists(path):
+        return None
+    # Millions of fresh dicts would otherwise trigger repeated full GC passes
+    # while they are unpickled; collection resumes as before once loaded
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return pickle.loads(buf)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _fsync_dir(path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def apply_record(collection, record):
+    """Redo one log record on collection through the plain MockCollection write paths"""
+    op = record[0]
+    if op == "i":
+        doc = record[1]
+        MockCollection._add(collection, doc)
+        collection.counter = max(collection.counter, doc["_id"] + 1)
+    elif op == "I":
+        MockCollection._add_many(collection, record[1])
+        collection.counter = max(collection.counter, record[1][-1]["_id"] + 1)
+    elif op == "u":
+        # Logs written before $unset support have no removed fields
+        removed = record[3] if len(record) > 3 else ()
+        MockCollection._patch(collection, collection.data.get(record[1]), record[2], removed)
+        collection._written((*record[2], *removed))
+    elif op == "r":
+        MockCollection._replace(collection, collection.data.get(record[1]), record[2])
+    elif op == "d":
+        MockCollection._remove_many(collection, [collection.data.get(doc_id) for doc_id in record[1]])
+    elif op == "x":
+        MockCollection.create_index(collection, record[1], unique=record[2], kind=record[3])
+
+
+class DurableCollection(MockCollection):
+    """MockCollection persisted to a directory as snapshot + append-only log"""
+
+    def __init__(self, path, sync_every=512, sync_interval=0.05, snapshot_every=100_000):
+        """
+        sync_every / sync_interval: group commit, fsync once that many records
+        are pending or, at the latest, that many seconds after the first of them.
+        snapshot_every: fold the log into a new snapshot after that many records.
+        """
+        super().__init__()
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.generation = 0
+        self._pending = []
+        self._last_sync = time.monotonic()
+        self._log_records = 0
+        # Guards _pending and the log file against the flush timer's thread
+        self._lock = threading.Lock()
+        self._timer = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        self._log = open(self._log_path(self.generation), "ab")
+        atexit.register(self._flush)
+
+    # ---- write hooks -------------------------------------------------------
+
+    def create_index(self, field, unique=False, kind="hash"):
+        if field in self.indexes:
+            return super().create_index(field, unique=unique, kind=kind)
+        name = super().create_index(field, unique=unique, kind=kind)
+        self._append(("x", field, unique, kind))
+        return name
+
+    def _add(self, doc):
+        super()._add(doc)
+        self._append(("i", doc))
+
+    def _add_many(self, docs):
+        super()._add_many(docs)
+        if docs:
+            # One record per batch, so a snapshot can never split it
+            self._append(("I", docs))
+
+    def _patch(self, doc, changes, removed, touched=None):
+        super()._patch(doc, changes, removed, touched)
+        self._append(("u", doc["_id"], changes, removed))
+
+    def _replace(self, doc, replacement):
+        super()._replace(doc, replacement)
+        self._append(("r", doc["_id"], dict(doc)))
+
+    def _remove(self, doc):
+        super()._remove(doc)
+        self._append(("d", [doc["_id"]]))
+
+    def _remove_many(self, docs):
+        super()._remove_many(docs)
+        if docs:
+            self._append(("d", [doc["_id"] for doc in docs]))
+
+    # ---- log and snapshots -------------------------------------------------
+
+    def _append(self, record):
+        payload = pickle.dumps(record, protocol=_PROTOCOL)
+        with self._lock:
+            self._pending.append(_HEADER.pack(len(payload)) + payload)
+            first = len(self._pending) == 1
+        self._log_records += 1
+        if (len(self._pending) >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+        elif first:
+            # Without another write to trigger it, the timer commits this group
+            self._timer = threading.Timer(self.sync_interval, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        """Write pending log records and fsync them; also run by the timer and at exit"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending and not self._log.closed:
+                self._log.write(b"".join(self._pending))
+                self._pending.clear()
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Write pending log records and fsync them (one group commit)"""
+        self._flush()
+        if self.snapshot_every and self._log_records >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the whole collection to a new snapshot and start a fresh log"""
+        generation = self.generation + 1
+        log = open(self._log_path(generation), "ab")
+        state = {
+            "generation": generation,
+            "counter": self.counter,
+            "indexes": [
+                (field, index.unique, index.kind, index.entries)
+                for field, index in self.indexes.items()
+            ],
+            "docs": self.data.docs,
+        }
+        target = os.path.join(self.path, SNAPSHOT_FILE)
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        # The rename is the commit point: the new snapshot names the new log,
+        # so a crash on either side of it never replays a record twice
+        os.replace(tmp, target)
+        _fsync_dir(self.path)
+        with self._lock:
+            # The snapshot holds every pending record's change
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending.clear()
+            self._log.close()
+            os.remove(self._log_path(self.generation))
+            self._log = log
+        self.generation = generation
+        self._log_records = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Flush the log and release the file handle"""
+        if not self._log.closed:
+            self.sync()
+            with self._lock:
+                self._log.close()
+            atexit.unregister(self._flush)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- recovery ----------------------------------------------------------
+
+    def _log_path(self, generation):
+        return os.path.join(self.path, LOG_FILE.format(generation))
+
+    def _load(self):
+        state = _load_snapshot(os.path.join(self.path, SNAPSHOT_FILE))
+        if state is not None:
+            self.generation = state["generation"]
+            self.counter = state["counter"]
+            self.data.docs = state["docs"]
+            for field, unique, kind, entries in state["indexes"]:
+                # Index entries are saved with the snapshot, so nothing is rebuilt
+                index = INDEX_KINDS[kind](field, unique=unique)
+                index.entries = entries
+                self.indexes[field] = index
+        log_path = self._log_path(self.generation)
+        for name in os.listdir(self.path):
+            # Logs of other generations were superseded by the snapshot or never committed
+            if name.startswith("oplog.") and os.path.join(self.path, name) != log_path:
+                os.remove(os.path.join(self.path, name))
+        records, valid = _read_records(log_path)
+        for record in records:
+            self._replay(record)
+        self._log_records = len(records)
+        if os.path.exists(log_path) and os.path.getsize(log_path) > valid:
+            # Drop a record torn by a crash mid-write
+            with open(log_path, "r+b") as f:
+                f.truncate(valid)
+
+    def _replay(self, record):
+        apply_record(self, record)
@@ -0,0 +1,263 @@
+"""
+Versioned result cache for the in-memory MockCollection.
+Results of find, find_one, count_documents, count_by and aggregate are
+kept in an LRU bounded by an estimated byte budget, keyed by the
+normalized query, sort, pipeline, ... of the call. Every write bumps the
+collection's write version; an entry stays valid while no document was
+added or removed and none of the fields it depends on was modified.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+from operator import itemgetter
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Rough cost of the entry itself: key tuple, entry list and dict slot
+ENTRY_OVERHEAD = 200
+
+_MISS = object()
+
+
+def freeze(value):
+    """Hashable, order-preserving form of value; booleans stay distinct from 0 and 1"""
+    if isinstance(value, dict):
+        return (dict, tuple((key, freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(freeze(val) for val in value))
+    if isinstance(value, bool):
+        return (bool, value)
+    return value
+
+
+def query_key(query):
+    """freeze() a filter with its fields and operators sorted: their order has no meaning"""
+    if not query:
+        return ()
+    items = []
+    for key, spec in query.items():
+        if isinstance(spec, dict) and spec and all(op.startswith("$") for op in spec):
+            spec = (dict, tuple(sorted(
+                ((op, freeze(val)) for op, val in spec.items()), key=itemgetter(0)
+            )))
+        else:
+            spec = freeze(spec)
+        items.append((key, spec))
+    return tuple(sorted(items, key=itemgetter(0)))
+
+
+def query_fields(query):
+    """Fields whose values decide which documents match query"""
+    return frozenset(query or ())
+
+
+def _paths(fields):
+    """fields plus the top-level field of every dotted path"""
+    return frozenset(fields) | {field.split(".")[0] for field in fields}
+
+
+def _references(expr, found):
+    """Collect the field paths an aggregation expression reads ("$field" strings)"""
+    if isinstance(expr, str):
+        if expr.startswith("$") and not expr.startswith("$$"):
+            found.add(expr[1:])
+    elif isinstance(expr, dict):
+        for value in expr.values():
+            _references(value, found)
+    elif isinstance(expr, list):
+        for value in expr:
+            _references(value, found)
+
+
+def pipeline_fields(pipeline):
+    """Stored fields the output of pipeline depends on, or None if it may be any field"""
+    found = set()
+    for stage in pipeline:
+        if not isinstance(stage, dict) or len(stage) != 1:
+            return None
+        name, spec = next(iter(stage.items()))
+        if name in ("$match", "$sort"):
+            found.update(spec)
+        elif name == "$group":
+            # Everything after a $group works on its output, not on stored documents
+            _references(spec, found)
+            return _paths(found)
+        elif name == "$project":
+            kept = [key for key, value in spec.items() if key != "_id" and value not in (0, False)]
+            if not kept or len(kept) < len(spec) - ("_id" in spec):
+                # Exclusion projection: every other stored field passes through
+                return None
+            for key, value in spec.items():
+                if value in (1, True):
+                    found.add(key)
+                else:
+                    _references(value, found)
+            return _paths(found)
+        elif name not in ("$skip", "$limit"):
+            return None
+    # Output is the stored documents themselves, copied when handed out
+    return _paths(found)
+
+
+def _doc_bytes(doc):
+    return sys.getsizeof(doc) + sum(map(sys.getsizeof, doc.values()))
+
+
+class QueryCache:
+    """LRU of query results with write-version invalidation and hit/miss counters"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh(self, entry, collection):
+        version, fields = entry[2], entry[3]
+        if collection.write_version == version:
+            return True
+        if fields is None or collection.membership_version > version:
+            return False
+        field_versions = collection.field_versions
+        return all(field_versions.get(field, 0) <= version for field in fields)
+
+    def get(self, key, collection):
+        """Cached result for key, or _MISS if absent or invalidated by a write"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry, collection):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.bytes -= entry[1]
+                self.invalidations += 1
+            self.misses += 1
+            return _MISS
+
+    def put(self, key, value, fields, version, nbytes):
+        """Store value computed at write version; fields=None depends on every field"""
+        nbytes += ENTRY_OVERHEAD
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = [value, nbytes, version, fields]
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted[1]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def lookup(collection, key, fields, compute, size=sys.getsizeof):
+    """Return compute() for key through collection.cache, storing the result on a miss"""
+    cache = collection.cache
+    if cache is None:
+        return compute()
+    try:
+        result = cache.get(key, collection)
+    except TypeError:
+        # Unhashable value somewhere in the query: not cacheable
+        return compute()
+    if result is _MISS:
+        version = collection.write_version
+        result = compute()
+        cache.put(key, result, fields, version, size(result))
+    return result
+
+
+def _list_bytes(docs):
+    return sys.getsizeof(docs) + sum(map(_doc_bytes, docs))
+
+
+def _dict_bytes(counts):
+    return sys.getsizeof(counts) + sum(map(sys.getsizeof, counts)) + 32 * len(counts)
+
+
+def cache_count_documents(method):
+    @wraps(method)
+    def cached(self, query=None):
+        return lookup(
+            self, ("count_documents", query_key(query)), query_fields(query),
+            lambda: method(self, query),
+        )
+    return cached
+
+
+def cache_count_by(method):
+    @wraps(method)
+    def cached(self, field, filter=None):
+        counts = lookup(
+            self, ("count_by", field, query_key(filter)),
+            query_fields(filter) | _paths([field]),
+            lambda: method(self, field, filter), _dict_bytes,
+        )
+        return dict(counts)
+    return cached
+
+
+def cache_find_one(method):
+    @wraps(method)
+    def cached(self, query=None):
+        # The stored document itself is cached, so only the filter fields matter
+        return lookup(
+            self, ("find_one", query_key(query)), query_fields(query),
+            lambda: method(self, query),
+        )
+    return cached
+
+
+def cache_aggregate(method):
+    @wraps(method)
+    def cached(self, pipeline):
+        if self.cache is None:
+            return method(self, pipeline)
+        docs = lookup(
+            self, ("aggregate", freeze(pipeline)), pipeline_fields(pipeline),
+            lambda: list(method(self, pipeline)), _list_bytes,
+        )
+        # Stage outputs are owned by the cache: hand out copies
+        return map(dict, docs)
+    return cached
+
+
+def cached_find(cursor, execute):
+    """Matching documents of a find cursor (before projection) through the cache"""
+    sort = cursor._sort or {}
+    key = ("find", query_key(cursor.query), freeze(sort), cursor._skip, cursor._limit)
+    return iter(lookup(
+        cursor.collection, key, query_fields(cursor.query) | _paths(sort),
+        lambda: list(execute()),
+    ))
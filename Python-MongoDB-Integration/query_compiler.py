@@ -0,0 +1,108 @@
+"""
+Query compiler for the in-memory MockCollection.
+A filter such as {"dept": "CS", "gpa": {"$gte": 3.7}} is turned into one
+specialized predicate function. Plans are cached by query shape (field
+names and operators, not values), so repeated queries that only differ
+in their values reuse the same generated code.
+"""
+
+from functools import lru_cache
+
+# Operators understood by the matcher, in the order they are checked
+OPERATORS = {
+    "$gt": "{field} > {value}",
+    "$gte": "{field} >= {value}",
+    "$lt": "{field} < {value}",
+    "$lte": "{field} <= {value}",
+    "$eq": "not ({field} != {value})",
+}
+
+PLAN_CACHE_SIZE = 256
+
+
+def interpret_query(doc, query):
+    """Reference matcher that walks the query dict for every document"""
+    for key, value in query.items():
+        if key not in doc:
+            return False
+        if isinstance(value, dict):
+            if "$gt" in value and not (doc[key] > value["$gt"]):
+                return False
+            if "$gte" in value and not (doc[key] >= value["$gte"]):
+                return False
+            if "$lt" in value and not (doc[key] < value["$lt"]):
+                return False
+            if "$lte" in value and not (doc[key] <= value["$lte"]):
+                return False
+            if "$eq" in value and doc[key] != value["$eq"]:
+                return False
+        elif doc[key] != value:
+            return False
+    return True
+
+
+def query_shape(query):
+    """Return (shape, values): the cache key for query and its values in plan order"""
+    shape = []
+    values = []
+    for key in sorted(query):
+        value = query[key]
+        if isinstance(value, dict):
+            ops = tuple(op for op in OPERATORS if op in value)
+            values.extend(value[op] for op in ops)
+            shape.append((key, ops))
+        else:
+            values.append(value)
+            shape.append((key, None))
+    return tuple(shape), values
+
+
+def _match_all(doc):
+    return True
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _plan(shape):
+    """Generate a predicate factory for a query shape"""
+    namespace = {}
+    params = []
+    terms = []
+    for i, (key, ops) in enumerate(shape):
+        field_name = f"k{i}"
+        namespace[field_name] = key
+        field = f"doc[{field_name}]"
+        if ops is None:
+            value = f"v{len(params)}"
+            params.append(value)
+            terms.append(f"not ({field} != {value})")
+        elif not ops:
+            terms.append(f"{field_name} in doc")
+        else:
+            for op in ops:
+                value = f"v{len(params)}"
+                params.append(value)
+                terms.append(OPERATORS[op].format(field=field, value=value))
+    source = (
+        f"def make({', '.join(params)}):\n"
+        f"    def predicate(doc):\n"
+        f"        try:\n"
+        f"            return {' and '.join(f'({term})' for term in terms)}\n"
+        f"        except KeyError:\n"
+        f"            return False\n"
+        f"    return predicate\n"
+    )
+    exec(compile(source, f"<query plan {shape!r}>", "exec"), namespace)
+    return namespace["make"]
+
+
+def compile_query(query):
+    """Return a predicate doc -> bool equivalent to interpret_query(doc, query)"""
+    if not query:
+        return _match_all
+    shape, values = query_shape(query)
+    return _plan(shape)(*values)
+
+
+def plan_cache_info():
+    """Hit/miss statistics for the compiled plan cache"""
+    return _plan.cache_info()
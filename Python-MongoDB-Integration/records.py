@@ -0,0 +1,114 @@
+"""
+Compact fixed-schema storage for MockCollection.
+Documents are kept as __slots__ records generated once per schema instead
+of one dict per document; the slot layout is the shared key table, and
+fields outside the schema go into a per-record overflow dict. Records are
+mutable mappings themselves, so the rest of MockCollection uses them as-is.
+"""
+
+from collections.abc import MutableMapping
+
+from crud_demo import MockCollection
+from storage import DocumentStore
+
+# Field order of the student documents used throughout the demo
+STUDENT_FIELDS = ("name", "student_id", "age", "dept", "gpa", "enrolled_date", "_id")
+
+
+class Record(MutableMapping):
+    """Base class of the generated record types; unset slots are missing fields"""
+    __slots__ = ("_extra",)
+
+    # Set on each generated subclass: field name -> slot name, in schema order
+    _slots = {}
+
+    def __init__(self, doc=None):
+        self._extra = None
+        if doc:
+            for key, value in doc.items():
+                self[key] = value
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+
+    def __contains__(self, key):
+        slot = self._slots.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key, slot in self._slots.items():
+            if hasattr(self, slot):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        return dict(self)
+
+
+def make_record_type(fields, name="StudentRecord"):
+    """Generate a Record subclass with one slot per schema field"""
+    fields = tuple(fields)
+    if len(set(fields)) != len(fields):
+        raise ValueError(f"Duplicate fields in schema: {fields}")
+    # Slots are numbered so field names can never clash with mapping methods
+    slots = {field: f"_f{i}" for i, field in enumerate(fields)}
+    return type(name, (Record,), {"__slots__": tuple(slots.values()), "_slots": slots})
+
+
+class RecordStore(DocumentStore):
+    """DocumentStore that keeps each document as a compact schema record"""
+
+    def __init__(self, fields=STUDENT_FIELDS):
+        super().__init__()
+        self.record_type = make_record_type(fields)
+
+    def add(self, doc):
+        super().add(self.record_type(doc))
+
+
+class RecordCollection(MockCollection):
+    """MockCollection storing fixed-schema documents as __slots__ records"""
+
+    def __init__(self, fields=STUDENT_FIELDS):
+        super().__init__()
+        self.data = RecordStore(fields)
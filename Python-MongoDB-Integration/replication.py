@@ -0,0 +1,381 @@
+"""
+Replica-set stand-in: one primary MockCollection and N secondary copies.
+Every write on the primary becomes an oplog entry (the physical records
+DurableCollection logs), serialized once and queued to each secondary,
+where a background thread applies it, optionally after a configured
+delay. Reads follow the client's read preference, so read-scaling and
+stale-read experiments run in-process, and status() reports each
+member's replication lag, apply throughput and the reads it served.
+"""
+
+import pickle
+import queue
+import random
+import threading
+import time
+from collections import Counter, deque
+
+from concurrency import ThreadSafeCollection
+from crud_demo import MockCollection
+from persistence import apply_record
+
+READ_PREFERENCES = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+
+# Members this much slower than the nearest one are still "near", like the drivers' localThresholdMS
+LOCAL_THRESHOLD = 0.015
+APPLY_BATCH = 1024
+LAG_SAMPLES = 10_000
+
+_PROTOCOL = 5
+
+
+class ReadPreferenceError(Exception):
+    """Raised when no member of the replica set satisfies a read preference"""
+
+
+class WriteConcernError(Exception):
+    """Raised when a write is not replicated to enough members in time"""
+
+
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))] if samples else 0.0
+
+
+class _Primary(ThreadSafeCollection):
+    """ThreadSafeCollection that ships every write to its replica set's secondaries"""
+
+    def __init__(self, replica_set):
+        super().__init__()
+        self.replica_set = replica_set
+
+    def create_index(self, field, unique=False, kind="hash"):
+        with self.lock.write():
+            if field in self.indexes:
+                return MockCollection.create_index(self, field, unique=unique, kind=kind)
+            name = MockCollection.create_index(self, field, unique=unique, kind=kind)
+            self.replica_set._ship(("x", field, unique, kind))
+            return name
+
+    def _add(self, doc):
+        super()._add(doc)
+        self.replica_set._ship(("i", doc))
+
+    def _add_many(self, docs):
+        super()._add_many(docs)
+        if docs:
+            self.replica_set._ship(("I", docs))
+
+    def _patch(self, doc, changes, removed, touched=None):
+        super()._patch(doc, changes, removed, touched)
+        self.replica_set._ship(("u", doc["_id"], changes, removed))
+
+    def _replace(self, doc, replacement):
+        super()._replace(doc, replacement)
+        self.replica_set._ship(("r", doc["_id"], dict(doc)))
+
+    def _remove(self, doc):
+        super()._remove(doc)
+        self.replica_set._ship(("d", [doc["_id"]]))
+
+    def _remove_many(self, docs):
+        super()._remove_many(docs)
+        if docs:
+            self.replica_set._ship(("d", [doc["_id"] for doc in docs]))
+
+
+class Secondary:
+    """A ThreadSafeCollection copy kept up to date by an oplog applier thread"""
+
+    def __init__(self, name, replica_set, delay=0.0, latency=0.0):
+        self.name = name
+        self.delay = delay
+        self.latency = latency
+        self.collection = ThreadSafeCollection()
+        self.queue = queue.SimpleQueue()
+        self._replica_set = replica_set
+        self.applied_optime = 0
+        self.applied = 0
+        self.apply_seconds = 0.0
+        self.lags = deque(maxlen=LAG_SAMPLES)
+        self._thread = threading.Thread(target=self._run, name=f"{name}-applier", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while batch[-1] is not None and len(batch) < APPLY_BATCH:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if self.delay:
+                for entry in batch:
+                    wait = entry[1] + self.delay - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                    self._apply([entry])
+            elif batch:
+                self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch):
+        start = time.perf_counter()
+        collection = self.collection
+        with collection.lock.write():
+            for _, _, payload in batch:
+                apply_record(collection, pickle.loads(payload))
+        done = time.perf_counter()
+        replica_set = self._replica_set
+        with replica_set.condition:
+            self.applied_optime = batch[-1][0]
+            self.applied += len(batch)
+            self.apply_seconds += done - start
+            self.lags.extend(done - ts for _, ts, _ in batch)
+            replica_set._trim()
+            replica_set.condition.notify_all()
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+
+
+class ReplicaSet:
+    """A primary and its secondaries, connected by an asynchronously applied oplog"""
+
+    def __init__(self, secondaries=2, delays=None, latencies=None):
+        """
+        delays: per-secondary seconds before an entry is applied (secondaryDelaySecs).
+        latencies: simulated round-trip seconds of the primary then each secondary,
+        used by the "nearest" read preference.
+        """
+        latencies = list(latencies or [0.0] * (secondaries + 1))
+        delays = list(delays or [0.0] * secondaries)
+        if len(latencies) != secondaries + 1 or len(delays) != secondaries:
+            raise ValueError("need one delay per secondary and one latency per member")
+        self.condition = threading.Condition()
+        self.optime = 0
+        # (optime, timestamp) of the writes some secondary has not applied yet
+        self._unapplied = deque()
+        self.primary = _Primary(self)
+        self.primary_latency = latencies[0]
+        self.secondaries = [
+            Secondary(f"secondary{i + 1}", self, delay, latency)
+            for i, (delay, latency) in enumerate(zip(delays, latencies[1:]))
+        ]
+        self.reads = Counter()
+        self._reads_lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._optime_at_start = 0
+
+    def collection(self, read_preference="primary", max_staleness=None, write_concern=1, wtimeout=None):
+        """Client handle: writes go to the primary, reads follow read_preference"""
+        return ReplicaSetCollection(self, read_preference, max_staleness, write_concern, wtimeout)
+
+    # ---- replication -------------------------------------------------------
+
+    def _ship(self, record):
+        # Called under the primary's write lock, so optimes follow write order
+        payload = pickle.dumps(record, protocol=_PROTOCOL)
+        now = time.perf_counter()
+        self.optime += 1
+        if self.secondaries:
+            with self.condition:
+                self._unapplied.append((self.optime, now))
+        entry = (self.optime, now, payload)
+        for member in self.secondaries:
+            member.queue.put(entry)
+
+    def _trim(self):
+        applied = min(member.applied_optime for member in self.secondaries)
+        while self._unapplied and self._unapplied[0][0] <= applied:
+            self._unapplied.popleft()
+
+    def _acknowledged(self, optime):
+        return 1 + sum(member.applied_optime >= optime for member in self.secondaries)
+
+    def await_optime(self, optime, w=1, timeout=None):
+        """Block until w members (an int or "majority") have applied optime"""
+        members = len(self.secondaries) + 1
+        needed = members // 2 + 1 if w == "majority" else w
+        if needed > members:
+            raise WriteConcernError(f"w={w} needs more members than the {members} in the set")
+        with self.condition:
+            if not self.condition.wait_for(lambda: self._acknowledged(optime) >= needed, timeout):
+                raise WriteConcernError(f"waiting for replication timed out (w={w}, optime {optime})")
+
+    def sync(self, timeout=None):
+        """Wait until every secondary has applied every write made so far"""
+        self.await_optime(self.optime, len(self.secondaries) + 1, timeout)
+
+    def lag(self, member):
+        """Age in seconds of the oldest write member has not applied (0 when caught up)"""
+        with self.condition:
+            if not self._unapplied or member.applied_optime >= self._unapplied[-1][0]:
+                return 0.0
+            # Optimes are consecutive, so the next write to apply sits at a known offset
+            _, ts = self._unapplied[member.applied_optime + 1 - self._unapplied[0][0]]
+        return time.perf_counter() - ts
+
+    # ---- read routing ------------------------------------------------------
+
+    def select(self, read_preference="primary", max_staleness=None):
+        """(member name, collection) that serves a read under read_preference"""
+        if read_preference not in READ_PREFERENCES:
+            raise ValueError(f"read_preference must be one of {READ_PREFERENCES}, not {read_preference!r}")
+        primary = ("primary", self.primary_latency, self.primary)
+        if read_preference in ("primary", "primaryPreferred"):
+            # The primary of this stand-in never goes down
+            name, _, collection = primary
+        else:
+            secondaries = [
+                (member.name, member.latency, member.collection) for member in self.secondaries
+                if max_staleness is None or self.lag(member) <= max_staleness
+            ]
+            if read_preference == "nearest":
+                candidates = [primary, *secondaries]
+                nearest = min(latency for _, latency, _ in candidates)
+                candidates = [c for c in candidates if c[1] <= nearest + LOCAL_THRESHOLD]
+            elif secondaries:
+                candidates = secondaries
+            elif read_preference == "secondaryPreferred":
+                candidates = [primary]
+            else:
+                raise ReadPreferenceError("No replica set member matches read preference secondary")
+            name, _, collection = random.choice(candidates)
+        with self._reads_lock:
+            self.reads[name] += 1
+        return name, collection
+
+    # ---- metrics -----------------------------------------------------------
+
+    def status(self):
+        """Per-member optime, lag, apply throughput and reads served, like rs.status()"""
+        elapsed = time.perf_counter() - self._started
+        members = [{
+            "name": "primary",
+            "state": "PRIMARY",
+            "optime": self.optime,
+            "writes_per_sec": (self.optime - self._optime_at_start) / elapsed,
+            "reads": self.reads["primary"],
+        }]
+        with self.condition:
+            for member in self.secondaries:
+                lags = sorted(member.lags)
+                members.append({
+                    "name": member.name,
+                    "state": "SECONDARY",
+                    "optime": member.applied_optime,
+                    "lag_ops": self.optime - member.applied_optime,
+                    "lag_seconds": self.lag(member),
+                    "apply_lag_p50": _percentile(lags, 0.50),
+                    "apply_lag_p99": _percentile(lags, 0.99),
+                    "apply_lag_max": lags[-1] if lags else 0.0,
+                    "applied_per_sec": member.applied / member.apply_seconds if member.applied else 0.0,
+                    "reads": self.reads[member.name],
+                })
+        return {"members": members, "reads": sum(self.reads.values())}
+
+    def reset_metrics(self):
+        """Start the read counters, apply throughput and lag samples from zero"""
+        with self._reads_lock:
+            self.reads.clear()
+        with self.condition:
+            self._started = time.perf_counter()
+            self._optime_at_start = self.optime
+            for member in self.secondaries:
+                member.applied = 0
+                member.apply_seconds = 0.0
+                member.lags.clear()
+
+    def report(self):
+        """Human-readable table of status()"""
+        status = self.status()
+        lines = [f"{'member':<12} {'optime':>9} {'lag ops':>8} {'lag ms':>8} {'p50 ms':>8} "
+                 f"{'p99 ms':>8} {'apply/s':>11} {'reads':>9}"]
+        for member in status["members"]:
+            if member["state"] == "PRIMARY":
+                lines.append(f"{member['name']:<12} {member['optime']:>9,} {'':>8} {'':>8} {'':>8} "
+                             f"{'':>8} {'':>11} {member['reads']:>9,}")
+                continue
+            lines.append(
+                f"{member['name']:<12} {member['optime']:>9,} {member['lag_ops']:>8,} "
+                f"{member['lag_seconds'] * 1000:>8.2f} {member['apply_lag_p50'] * 1000:>8.2f} "
+                f"{member['apply_lag_p99'] * 1000:>8.2f} {member['applied_per_sec']:>11,.0f} "
+                f"{member['reads']:>9,}"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        """Apply what is still queued and stop the applier threads"""
+        for member in self.secondaries:
+            member.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _write(name):
+    def write(self, *args, **kwargs):
+        result = getattr(self.replica_set.primary, name)(*args, **kwargs)
+        if self.write_concern != 1:
+            self.replica_set.await_optime(self.replica_set.optime, self.write_concern, self.wtimeout)
+        return result
+    write.__name__ = name
+    return write
+
+
+def _read(name):
+    def read(self, *args, **kwargs):
+        _, collection = self.replica_set.select(self.read_preference, self.max_staleness)
+        return getattr(collection, name)(*args, **kwargs)
+    read.__name__ = name
+    return read
+
+
+class ReplicaSetCollection:
+    """MockCollection API over a ReplicaSet with a read preference and a write concern"""
+
+    def __init__(self, replica_set, read_preference="primary", max_staleness=None, write_concern=1,
+                 wtimeout=None):
+        if read_preference not in READ_PREFERENCES:
+            raise ValueError(f"read_preference must be one of {READ_PREFERENCES}, not {read_preference!r}")
+        if read_preference == "primary" and max_staleness is not None:
+            raise ValueError("max_staleness cannot be combined with read preference primary")
+        self.replica_set = replica_set
+        self.read_preference = read_preference
+        self.max_staleness = max_staleness
+        self.write_concern = write_concern
+        self.wtimeout = wtimeout
+
+    def with_options(self, read_preference=None, max_staleness=None, write_concern=None, wtimeout=None):
+        """Copy of this handle with some options replaced, like Collection.with_options"""
+        return ReplicaSetCollection(
+            self.replica_set,
+            read_preference or self.read_preference,
+            max_staleness if max_staleness is not None else self.max_staleness,
+            write_concern if write_concern is not None else self.write_concern,
+            wtimeout if wtimeout is not None else self.wtimeout,
+        )
+
+    find = _read("find")
+    find_one = _read("find_one")
+    count_documents = _read("count_documents")
+    count_by = _read("count_by")
+    aggregate = _read("aggregate")
+
+    create_index = _write("create_index")
+    insert_one = _write("insert_one")
+    insert_many = _write("insert_many")
+    update_one = _write("update_one")
+    update_many = _write("update_many")
+    replace_one = _write("replace_one")
+    delete_one = _write("delete_one")
+    delete_many = _write("delete_many")
+    bulk_write = _write("bulk_write")
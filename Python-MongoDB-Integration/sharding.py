@@ -0,0 +1,476 @@
+"""
+Sharded collection: one logical collection partitioned across N MockCollections.
+Documents are placed by a shard key, either hashed (even spread, equality
+routing only) or ranged by split points (range queries can skip shards).
+Like mongos, the router sends a query carrying the shard key to the one
+shard that can hold it and scatter-gathers everything else: counts are
+summed, sorted finds are k-way merged from per-shard top-k results and
+$group runs per shard with the partial accumulators merged on the router.
+"""
+
+import hashlib
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+
+from aggregation import (
+    ACCUMULATORS, _sort, _stage, _top_k, apply_stages, group_output, group_states,
+    sort_key, sort_value,
+)
+from bulk import upsert_document
+from crud_demo import MockCollection
+from cursor import Cursor
+from indexes import DuplicateKeyError, index_key
+from update_compiler import WriteError, compile_update
+
+STRATEGIES = ("hashed", "ranged")
+
+_by_id = itemgetter("_id")
+
+
+def _normalize(value):
+    """Collapse values the query matcher treats as equal (True, 1, 1.0) to one hash input"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def shard_hash(value):
+    """Stable 64-bit hash of a shard key value (Python's hash() is salted per process)"""
+    digest = hashlib.md5(repr(index_key(_normalize(value))).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _equality(spec):
+    """(True, value) if a query field spec pins the field to one value, else (False, None)"""
+    if not isinstance(spec, dict):
+        return True, spec
+    if "$eq" in spec:
+        return True, spec["$eq"]
+    return False, None
+
+
+def _merge_sorted(streams, spec):
+    """k-way merge of streams already ordered by spec, ties broken by insertion (_id) order"""
+    if not spec:
+        return heapq.merge(*streams, key=_by_id)
+    key = sort_key(spec)
+    return heapq.merge(*streams, key=lambda doc: (key(doc), doc["_id"]))
+
+
+class ShardedCursor(Cursor):
+    """find() cursor of a ShardedCollection: per-shard top-k results merged on the router"""
+
+    def _run(self):
+        shards = self.collection._route(self.query)
+        top_k = self._skip + self._limit if self._limit else None
+        streams = []
+        for shard in shards:
+            docs = shard._iter_matches(self.query)
+            if self._sort:
+                docs = _sort(iter(docs), self._sort, top_k)
+            elif top_k:
+                docs = islice(docs, top_k)
+            streams.append(docs)
+        docs = streams[0] if len(streams) == 1 else _merge_sorted(streams, self._sort)
+        return islice(docs, self._skip, top_k)
+
+    def explain(self):
+        """Per-shard plans under a SINGLE_SHARD / SHARD_MERGE / SHARD_MERGE_SORT stage"""
+        collection = self.collection
+        shards = collection._route(self.query, record=False)
+        if len(shards) == 1:
+            stage = "SINGLE_SHARD"
+        else:
+            stage = "SHARD_MERGE_SORT" if self._sort else "SHARD_MERGE"
+        plans = []
+        stats = []
+        totals = Counter()
+        for shard in shards:
+            cursor = shard.find(self.query, self.projection)
+            if self._sort:
+                cursor.sort(list(self._sort.items()))
+            if self._limit:
+                cursor.limit(self._skip + self._limit)
+            report = cursor.explain()
+            name = collection.shard_name(shard)
+            execution = report["executionStats"]
+            plans.append({"shardName": name, "winningPlan": report["queryPlanner"]["winningPlan"]})
+            stats.append({"shardName": name, **execution})
+            totals.update({key: execution[key] for key in
+                           ("totalKeysExamined", "totalDocsExamined", "executionTimeMillis")})
+        returned = sum(1 for _ in self._run())
+        return {
+            "queryPlanner": {
+                "parsedQuery": self.query or {},
+                "winningPlan": {"stage": stage, "shards": plans},
+            },
+            "executionStats": {
+                "nReturned": returned,
+                "executionTimeMillis": round(totals["executionTimeMillis"], 3),
+                "totalKeysExamined": totals["totalKeysExamined"],
+                "totalDocsExamined": totals["totalDocsExamined"],
+                "executionStages": {"stage": stage, "nReturned": returned, "shards": stats},
+            },
+        }
+
+
+class ShardedCollection:
+    """MockCollection API over documents partitioned across shard collections by a shard key"""
+
+    def __init__(self, shard_key, shards=4, strategy="hashed", split_points=None,
+                 shard_class=MockCollection):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategy must be one of {STRATEGIES}, not {strategy!r}")
+        if strategy == "ranged":
+            if not split_points:
+                raise ValueError("ranged sharding needs split_points")
+            # Shard i holds keys in [split_points[i - 1], split_points[i])
+            shards = len(split_points) + 1
+            self.split_keys = [sort_value(value) for value in split_points]
+            if self.split_keys != sorted(self.split_keys):
+                raise ValueError("split_points must be in ascending order")
+        elif shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.shard_key = shard_key
+        self.strategy = strategy
+        self.split_points = list(split_points or ())
+        self.shards = [shard_class() for _ in range(shards)]
+        # Every shard keeps an index on the shard key, as MongoDB requires
+        kind = "sorted" if strategy == "ranged" else "hash"
+        for shard in self.shards:
+            shard.create_index(shard_key, kind=kind)
+        self.counter = 1
+        self.indexes = {}
+        # Read by Cursor; instrumentation and caching live on the shards
+        self.cache = None
+        self.listeners = ()
+        self.parallel = None
+        # Routing statistics: operations per routing kind and per shard
+        self.routing = Counter()
+        self.shard_ops = [0] * shards
+
+    def shard_name(self, shard):
+        return f"shard{self.shards.index(shard)}"
+
+    def create_index(self, field, unique=False, kind="hash"):
+        """Build the index on every shard; unique indexes must be on the shard key"""
+        if unique and field != self.shard_key:
+            # A shard can only check uniqueness among the documents it holds
+            raise ValueError(
+                f"cannot create unique index over {field!r} with shard key pattern {self.shard_key!r}"
+            )
+        for shard in self.shards:
+            if field == self.shard_key and field in shard.indexes:
+                shard.indexes.pop(field)
+            shard.create_index(field, unique=unique, kind=kind)
+        self.indexes[field] = kind
+        return f"{field}_1"
+
+    # ---- routing -----------------------------------------------------------
+
+    def shard_for(self, value):
+        """Shard that holds documents whose shard key is value"""
+        if self.strategy == "hashed":
+            return self.shards[shard_hash(value) % len(self.shards)]
+        return self.shards[bisect_right(self.split_keys, sort_value(value))]
+
+    def _targets(self, query):
+        spec = (query or {}).get(self.shard_key)
+        if spec is None and self.shard_key not in (query or {}):
+            return self.shards
+        pinned, value = _equality(spec)
+        if pinned:
+            return [self.shard_for(value)]
+        if self.strategy == "hashed":
+            return self.shards
+        # Ranged: only the shards whose key range overlaps the predicate's
+        first, last = 0, len(self.shards) - 1
+        for op in ("$gt", "$gte"):
+            if op in spec:
+                first = max(first, bisect_right(self.split_keys, sort_value(spec[op])))
+        for op, bisect in (("$lt", bisect_left), ("$lte", bisect_right)):
+            if op in spec:
+                last = min(last, bisect(self.split_keys, sort_value(spec[op])))
+        return self.shards[first:last + 1] or self.shards[:1]
+
+    def _route(self, query, record=True):
+        """Shards a query has to visit, counted in the routing statistics"""
+        shards = self._targets(query)
+        if record:
+            if len(shards) == 1:
+                self.routing["targeted"] += 1
+            elif len(shards) == len(self.shards):
+                self.routing["broadcast"] += 1
+            else:
+                self.routing["partial"] += 1
+            for shard in shards:
+                self.shard_ops[self.shards.index(shard)] += 1
+        return shards
+
+    def _check_update(self, update):
+        fields = {path.split(".")[0] for op, spec in update.items() if op != "$setOnInsert"
+                  for path in spec}
+        if self.shard_key in fields:
+            raise WriteError(
+                f"Performing an update on the path '{self.shard_key}' would modify the shard key"
+            )
+
+    # ---- writes ------------------------------------------------------------
+
+    def _place(self, docs):
+        """Group docs by shard as [(shard, [(position, doc)])], before they have _ids"""
+        placed = {}
+        for position, doc in enumerate(docs):
+            if self.shard_key == "_id":
+                # Only the shard key may be unique, so no doc is rejected and all are numbered in order
+                value = self.counter + position
+            else:
+                value = doc.get(self.shard_key)
+            shard = self.shard_for(value)
+            placed.setdefault(id(shard), (shard, []))[1].append((position, doc))
+        return list(placed.values())
+
+    def _number(self, docs):
+        """Give the accepted docs their _ids, like bulk.checked_inserts"""
+        for doc in docs:
+            doc['_id'] = self.counter
+            self.counter += 1
+
+    def insert_one(self, doc):
+        shard, [(_, doc)] = self._place([doc])[0]
+        duplicates = shard._duplicates([doc])
+        if duplicates:
+            field = duplicates[0].field
+            raise DuplicateKeyError(f"E11000 duplicate key error: {field} {doc[field]!r}")
+        self._number([doc])
+        shard._add(doc)
+        self.routing["targeted"] += 1
+        self.shard_ops[self.shards.index(shard)] += 1
+        class Result:
+            def __init__(self, doc_id):
+                self.inserted_id = doc_id
+        return Result(doc['_id'])
+
+    def insert_many(self, docs):
+        docs = list(docs)
+        placed = self._place(docs)
+        duplicates = {}
+        for shard, items in placed:
+            for i, index in shard._duplicates([doc for _, doc in items]).items():
+                duplicates[items[i][0]] = index
+        # Ordered insert: keep everything before the first conflict, numbered in input order
+        stop = min(duplicates, default=len(docs))
+        self._number(docs[:stop])
+        for shard, items in placed:
+            batch = [doc for position, doc in items if position < stop]
+            if batch:
+                shard._add_many(batch)
+                self.shard_ops[self.shards.index(shard)] += 1
+        self.routing["targeted" if len(placed) == 1 else "broadcast"] += 1
+        if duplicates:
+            field = duplicates[stop].field
+            raise DuplicateKeyError(f"E11000 duplicate key error: {field} {docs[stop][field]!r}")
+        ids = [doc['_id'] for doc in docs]
+        class Result:
+            def __init__(self, ids):
+                self.inserted_ids = ids
+        return Result(ids)
+
+    def update_one(self, query, update, upsert=False):
+        self._check_update(update)
+        matched = modified = 0
+        upserted_id = None
+        for shard in self._route(query):
+            result = shard.update_one(query, update)
+            if result.matched_count:
+                matched, modified = result.matched_count, result.modified_count
+                break
+        else:
+            if upsert:
+                upserted_id = self._upsert(query, compile_update(update))
+        class Result:
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+
+    def update_many(self, query, update, upsert=False):
+        self._check_update(update)
+        matched = modified = 0
+        upserted_id = None
+        for shard in self._route(query):
+            result = shard.update_many(query, update)
+            matched += result.matched_count
+            modified += result.modified_count
+        if not matched and upsert:
+            upserted_id = self._upsert(query, compile_update(update))
+        class Result:
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+
+    def replace_one(self, query, replacement, upsert=False):
+        matched = modified = 0
+        upserted_id = None
+        for shard in self._route(query):
+            doc = shard.find_one(query)
+            if doc is None:
+                continue
+            key = self.shard_key
+            if index_key(replacement.get(key)) != index_key(doc.get(key)):
+                raise WriteError(
+                    f"After applying the update, the (immutable) shard key '{key}' "
+                    "was found to have been altered"
+                )
+            result = shard.replace_one(query, replacement)
+            matched, modified = result.matched_count, result.modified_count
+            break
+        else:
+            if upsert:
+                upserted_id = self._upsert(query, replacement=replacement)
+        class Result:
+            def __init__(self, matched, modified, upserted_id):
+                self.matched_count = matched
+                self.modified_count = modified
+                self.upserted_id = upserted_id
+        return Result(matched, modified, upserted_id)
+
+    def _upsert(self, query, apply=None, replacement=None):
+        return self.insert_one(upsert_document(query, apply, replacement)).inserted_id
+
+    def delete_one(self, query):
+        deleted = 0
+        for shard in self._route(query):
+            deleted = shard.delete_one(query).deleted_count
+            if deleted:
+                break
+        class Result:
+            def __init__(self, count):
+                self.deleted_count = count
+        return Result(deleted)
+
+    def delete_many(self, query):
+        deleted = sum(shard.delete_many(query).deleted_count for shard in self._route(query))
+        class Result:
+            def __init__(self, count):
+                self.deleted_count = count
+        return Result(deleted)
+
+    # ---- reads -------------------------------------------------------------
+
+    def find(self, query=None, projection=None):
+        return ShardedCursor(self, query, projection)
+
+    def find_one(self, query=None):
+        return next(self.find(query).limit(1), None)
+
+    def count_documents(self, query=None):
+        return sum(shard.count_documents(query) for shard in self._route(query))
+
+    def count_by(self, field, filter=None):
+        """Return {value: count} of field, summed over the shards the filter routes to"""
+        counts = Counter()
+        for shard in self._route(filter):
+            counts.update(shard.count_by(field, filter))
+        return dict(counts)
+
+    def _iter_matches(self, query):
+        """Matching documents of the routed shards in insertion order"""
+        streams = [shard._iter_matches(query) for shard in self._route(query, record=False)]
+        return streams[0] if len(streams) == 1 else heapq.merge(*streams, key=_by_id)
+
+    def aggregate(self, pipeline):
+        """
+        Run pipeline with a leading $match routed to the shards, then a
+        $group merged from per-shard partial groups or a $sort merged from
+        per-shard sorted runs; the remaining stages run on the router.
+        """
+        stages = [_stage(stage) for stage in pipeline]
+        query = None
+        if stages and stages[0][0] == "$match":
+            query, stages = stages[0][1], stages[1:]
+        shards = self._route(query)
+        name, spec = stages[0] if stages else (None, None)
+        if name == "$group" and all(
+            next(iter(acc)) in ACCUMULATORS for key, acc in spec.items() if key != "_id"
+        ):
+            docs = self._merge_groups(shards, query, spec)
+            stages = stages[1:]
+        elif name == "$sort":
+            top_k = _top_k(stages[1:])
+            streams = [_sort(iter(shard._iter_matches(query)), spec, top_k) for shard in shards]
+            docs = _merge_sorted(streams, spec)
+            stages = stages[1:]
+        else:
+            streams = [shard._iter_matches(query) for shard in shards]
+            docs = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=_by_id)
+        return apply_stages(iter(docs), stages)
+
+    def _merge_groups(self, shards, query, spec):
+        """$group output from the partial group states of each shard"""
+        merged = {}
+        for shard in shards:
+            for key, (group_id, accs, first) in group_states(shard._iter_matches(query), spec).items():
+                merged.setdefault(key, []).append((first["_id"], group_id, accs))
+        states = []
+        for parts in merged.values():
+            # Fold the partials in insertion order so $first matches an unsharded run
+            parts.sort(key=itemgetter(0))
+            first_id, group_id, accs = parts[0]
+            for _, _, more in parts[1:]:
+                for (_, acc), (_, other) in zip(accs, more):
+                    acc.merge(other)
+            states.append((first_id, group_id, accs))
+        states.sort(key=itemgetter(0))
+        return group_output(state[1:] for state in states)
+
+    # ---- statistics --------------------------------------------------------
+
+    def shard_distribution(self):
+        """Per-shard document counts and shares, like db.collection.getShardDistribution()"""
+        counts = [len(shard.data) for shard in self.shards]
+        total = sum(counts)
+        return [
+            {"shard": f"shard{i}", "documents": count, "share": count / total if total else 0.0,
+             "operations": self.shard_ops[i]}
+            for i, count in enumerate(counts)
+        ]
+
+    def stats(self):
+        """Load balance (max / mean documents per shard) and routing counters"""
+        distribution = self.shard_distribution()
+        counts = [shard["documents"] for shard in distribution]
+        mean = sum(counts) / len(counts)
+        routed = sum(self.routing.values())
+        return {
+            "shard_key": self.shard_key,
+            "strategy": self.strategy,
+            "shards": distribution,
+            "imbalance": max(counts) / mean if mean else 1.0,
+            "routing": dict(self.routing),
+            "targeted_share": self.routing["targeted"] / routed if routed else 0.0,
+        }
+
+    def report(self):
+        """Human-readable table of shard_distribution() and the routing counters"""
+        stats = self.stats()
+        lines = [f"{'shard':<8} {'documents':>10} {'share':>7} {'operations':>11}"]
+        for shard in stats["shards"]:
+            lines.append(f"{shard['shard']:<8} {shard['documents']:>10,} "
+                         f"{shard['share']:>7.1%} {shard['operations']:>11,}")
+        lines.append(f"imbalance (max / mean documents): {stats['imbalance']:.3f}")
+        routing = ", ".join(f"{kind} {count:,}" for kind, count in sorted(stats["routing"].items()))
+        lines.append(f"routing: {routing or 'none'} ({stats['targeted_share']:.1%} targeted)")
+        return "\n".join(lines)
@@ -0,0 +1,77 @@
+"""
+Primary-key storage for the in-memory MockCollection.
+Documents live in an insertion-ordered dict keyed by _id, so lookups and
+single deletes are O(1) and bulk deletes compact the store in one pass.
+Scans walk the dict lazily; a write made while one is open copies the dict
+first, so the scan carries on over the documents as they were.
+"""
+
+
+class DocumentStore:
+    """Insertion-ordered documents keyed by _id"""
+
+    # Rebuild the dict instead of deleting key by key once a bulk delete
+    # removes at least this fraction of the store (dicts never shrink on del).
+    COMPACT_RATIO = 0.25
+
+    def __init__(self):
+        self.docs = {}
+        # Tokens of the open scans over self.docs (a set, so threads sharing a read lock can't lose one)
+        self.scans = set()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __bool__(self):
+        return bool(self.docs)
+
+    def __iter__(self):
+        return iter(self.docs.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def get(self, doc_id, default=None):
+        return self.docs.get(doc_id, default)
+
+    def scan(self):
+        """Yield the documents in insertion order; writes during the scan do not disturb it"""
+        token = object()
+        scans = self.scans
+        scans.add(token)
+        try:
+            yield from self.docs.values()
+        finally:
+            scans.discard(token)
+
+    def first(self):
+        """Return the oldest document, or None if the store is empty"""
+        return next(iter(self.docs.values()), None)
+
+    def _writable(self):
+        """self.docs, copied first if an open scan is walking it"""
+        if self.scans:
+            self.docs = dict(self.docs)
+            self.scans = set()
+        return self.docs
+
+    def add(self, doc):
+        self._writable()[doc['_id']] = doc
+
+    def remove(self, doc_id):
+        del self._writable()[doc_id]
+
+    def remove_many(self, doc_ids):
+        """Delete every _id in doc_ids with at most one pass over the store"""
+        if len(doc_ids) >= len(self.docs) * self.COMPACT_RATIO:
+            doomed = doc_ids if isinstance(doc_ids, (set, frozenset)) else set(doc_ids)
+            # A new dict, so open scans keep the old one
+            self.docs = {
+                doc_id: doc for doc_id, doc in self.docs.items()
+                if doc_id not in doomed
+            }
+            self.scans = set()
+        else:
+            docs = self._writable()
+            for doc_id in doc_ids:
+                del docs[doc_id]
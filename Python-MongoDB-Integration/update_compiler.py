@@ -0,0 +1,343 @@
+"""
+Update compiler for the in-memory MockCollection.
+An update such as {"$set": {"dept": "CS"}, "$inc": {"age": 1}} is turned
+into one applier function per call. The applier never touches the
+document: it returns the top-level fields to assign and to remove, or
+None when the update would leave the document as it is, so writes (and
+their index maintenance) only happen for documents that really change.
+Generated code is cached by update shape, like compiled queries.
+"""
+
+import copy
+from functools import lru_cache
+
+from indexes import sort_rank
+
+PLAN_CACHE_SIZE = 256
+
+_MISSING = object()
+_NUMERIC = (int, float)
+
+
+class WriteError(Exception):
+    """Raised when an update cannot be applied to a document"""
+
+
+def _numeric(value):
+    return isinstance(value, _NUMERIC) and not isinstance(value, bool)
+
+
+def _check_numeric(op, field, value):
+    if not _numeric(value):
+        raise WriteError(
+            f"Cannot apply {op} to a value of non-numeric type. "
+            f"{{{field}: {value!r}}} has the field '{field}' of non-numeric type {type(value).__name__}"
+        )
+
+
+def same(old, new):
+    """True if storing new in place of old leaves the document unchanged"""
+    return type(old) is type(new) and old == new
+
+
+def _less(a, b):
+    """a < b, ordering values of different types by their sort bracket"""
+    rank_a, rank_b = sort_rank(a), sort_rank(b)
+    if rank_a != rank_b and rank_a is not None and rank_b is not None:
+        return rank_a < rank_b
+    try:
+        return a < b
+    except TypeError:
+        return False
+
+
+def _copy(value):
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+# ---- operators: (field, old value or _MISSING, argument) -> new value or _MISSING
+
+def _set(field, old, value):
+    return _copy(value)
+
+
+def _set_on_insert(field, old, value):
+    # Only applied when an upsert inserts; see bulk.upsert_document
+    return old
+
+
+def _unset(field, old, value):
+    return _MISSING
+
+
+def _inc(field, old, value):
+    if old is _MISSING:
+        return value
+    _check_numeric("$inc", field, old)
+    return old + value
+
+
+def _mul(field, old, value):
+    if old is _MISSING:
+        return value * 0
+    _check_numeric("$mul", field, old)
+    return old * value
+
+
+def _min(field, old, value):
+    return _copy(value) if old is _MISSING or _less(value, old) else old
+
+
+def _max(field, old, value):
+    return _copy(value) if old is _MISSING or _less(old, value) else old
+
+
+def _array(op, field, old):
+    if old is _MISSING:
+        return []
+    if not isinstance(old, list):
+        raise WriteError(
+            f"The field '{field}' must be an array but is of type {type(old).__name__}"
+        )
+    return list(old)
+
+
+def _push(field, old, each):
+    items = _array("$push", field, old)
+    items.extend(map(_copy, each))
+    return items
+
+
+def _add_to_set(field, old, each):
+    items = _array("$addToSet", field, old)
+    for value in each:
+        if value not in items:
+            items.append(_copy(value))
+    return items
+
+
+OPERATORS = {
+    "$set": _set,
+    "$unset": _unset,
+    "$setOnInsert": _set_on_insert,
+    "$inc": _inc,
+    "$mul": _mul,
+    "$min": _min,
+    "$max": _max,
+    "$push": _push,
+    "$addToSet": _add_to_set,
+}
+
+# Inline code for top-level fields; the others call OPERATORS[op] through fN
+_INLINE = {
+    "$set": (
+        "old = get({k}, M)\n"
+        "if old is M or type(old) is not type({v}) or old != {v}:\n"
+        "    ch[{k}] = {value}\n"
+    ),
+    "$unset": (
+        "if {k} in doc:\n"
+        "    rm.append({k})\n"
+    ),
+    "$inc": (
+        "old = get({k}, M)\n"
+        "if old is M:\n"
+        "    ch[{k}] = {v}\n"
+        "else:\n"
+        "    new = old + {v} if type(old) is int or type(old) is float else {f}({k}, old, {v})\n"
+        "    if type(new) is not type(old) or new != old:\n"
+        "        ch[{k}] = new\n"
+    ),
+}
+
+_GENERIC = (
+    "old = get({k}, M)\n"
+    "new = {f}({k}, old, {v})\n"
+    "if not same(old, new):\n"
+    "    ch[{k}] = new\n"
+)
+
+
+# ---- dotted paths ------------------------------------------------------------
+
+def _child(container, part, create):
+    """Value at part of a dict or list (created as {} if missing and create), else _MISSING"""
+    if isinstance(container, dict):
+        if part not in container:
+            if not create:
+                return _MISSING
+            container[part] = {}
+        return container[part]
+    if isinstance(container, list) and part.isdigit():
+        i = int(part)
+        if i >= len(container):
+            if not create:
+                return _MISSING
+            container.extend([None] * (i - len(container)) + [{}])
+        return container[i]
+    if create:
+        raise WriteError(f"Cannot create field '{part}' in element {container!r}")
+    return _MISSING
+
+
+def _store(container, part, value):
+    if isinstance(container, list):
+        i = int(part)
+        if value is _MISSING:
+            # $unset on an array element leaves a null, as MongoDB does
+            if i < len(container):
+                container[i] = None
+            return
+        container.extend([None] * (i + 1 - len(container)))
+        container[i] = value
+    elif value is _MISSING:
+        container.pop(part, None)
+    else:
+        container[part] = value
+
+
+def apply_nested(old, ops):
+    """New value of a top-level field after (operator, path parts, argument) ops on its subfields"""
+    created = old is not _MISSING
+    root = {} if old is _MISSING else copy.deepcopy(old)
+    for op, parts, value in ops:
+        unset = op is _unset
+        container = root
+        for part in parts[:-1]:
+            container = _child(container, part, not unset)
+            if container is _MISSING:
+                break
+        else:
+            last = parts[-1]
+            if isinstance(container, dict):
+                current = container.get(last, _MISSING)
+            elif isinstance(container, list) and last.isdigit():
+                current = container[int(last)] if int(last) < len(container) else _MISSING
+            elif unset:
+                continue
+            else:
+                raise WriteError(f"Cannot create field '{last}' in element {container!r}")
+            new = op(".".join(parts), current, value)
+            if new is not current:
+                _store(container, last, new)
+                created = created or not unset
+    return root if created else _MISSING
+
+
+# ---- compilation -------------------------------------------------------------
+
+def _check_paths(paths):
+    """Reject _id updates and paths that overlap (a and a.b), as MongoDB does"""
+    seen = set()
+    for path in sorted(paths, key=len):
+        if path == "_id" or path.startswith("_id."):
+            raise WriteError(
+                f"Performing an update on the path '{path}' would modify the immutable field '_id'"
+            )
+        parts = path.split(".")
+        for i in range(1, len(parts) + 1):
+            prefix = ".".join(parts[:i])
+            if prefix in seen:
+                raise WriteError(f"Updating the path '{path}' would create a conflict at '{prefix}'")
+        seen.add(path)
+
+
+def update_shape(update):
+    """Return (shape, values): the cache key for update and its arguments in plan order"""
+    if not update or not all(isinstance(op, str) and op.startswith("$") for op in update):
+        raise ValueError("update only works with $ operators")
+    entries = []
+    for op, fields in update.items():
+        if op not in OPERATORS:
+            raise WriteError(f"Unknown modifier: {op}")
+        for path, value in fields.items():
+            if op in ("$inc", "$mul") and not _numeric(value):
+                raise WriteError(f"Cannot {op[1:]} with non-numeric argument: {{{path}: {value!r}}}")
+            if op in ("$push", "$addToSet"):
+                if isinstance(value, dict) and "$each" in value:
+                    if not isinstance(value["$each"], list):
+                        raise WriteError(f"The argument to $each in {op} must be an array")
+                    value = tuple(value["$each"])
+                else:
+                    value = (value,)
+            mutable = op in ("$set", "$min", "$max") and isinstance(value, (dict, list))
+            entries.append(((path, op, mutable), value))
+    _check_paths([path for (path, _, _), _ in entries])
+    entries.sort(key=lambda entry: entry[0][0])
+    return tuple(key for key, _ in entries), [value for _, value in entries]
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _plan(shape):
+    """Generate an applier factory for an update shape"""
+    namespace = {"M": _MISSING, "same": same, "deepcopy": copy.deepcopy,
+                 "apply_nested": apply_nested}
+    body = []
+    nested = {}
+    make = []
+    for i, (path, op, mutable) in enumerate(shape):
+        value = f"v{i}"
+        if "." in path:
+            top, rest = path.split(".", 1)
+            nested.setdefault(top, []).append((op, tuple(rest.split(".")), value))
+            continue
+        key = f"k{i}"
+        fn = f"f{i}"
+        namespace[key] = path
+        namespace[fn] = OPERATORS[op]
+        code = _INLINE.get(op, _GENERIC)
+        body.append(code.format(
+            k=key, v=value, f=fn, value=f"deepcopy({value})" if mutable else value,
+        ))
+    for j, (top, ops) in enumerate(nested.items()):
+        key = f"t{j}"
+        namespace[key] = top
+        for op, _, _ in ops:
+            namespace[f"op_{op[1:]}"] = OPERATORS[op]
+        make.append(f"n{j} = ({''.join(f'(op_{op[1:]}, {parts!r}, {value}), ' for op, parts, value in ops)})")
+        body.append(
+            f"old = get({key}, M)\n"
+            f"new = apply_nested(old, n{j})\n"
+            f"if new is M:\n"
+            f"    pass\n"
+            f"elif not same(old, new):\n"
+            f"    ch[{key}] = new\n"
+        )
+    params = ", ".join(f"v{i}" for i in range(len(shape)))
+    indent = " " * 8
+    source = (
+        f"def make({params}):\n"
+        + "".join(f"    {line}\n" for line in make)
+        + "    def apply(doc):\n"
+        f"{indent}get = doc.get\n"
+        f"{indent}ch = {{}}\n"
+        f"{indent}rm = []\n"
+        + "".join(
+            "".join(f"{indent}{line}\n" for line in block.splitlines()) for block in body
+        )
+        + f"{indent}if ch or rm:\n"
+        f"{indent}    return ch, rm\n"
+        f"{indent}return None\n"
+        "    return apply\n"
+    )
+    exec(compile(source, f"<update plan {shape!r}>", "exec"), namespace)
+    return namespace["make"]
+
+
+def compile_update(update):
+    """
+    Return apply(doc) -> (changes, removed) or None for the update document.
+    changes maps top-level fields to their new values, removed lists the
+    top-level fields to delete. The applier carries the update as .update
+    and the top-level fields it may change as .fields.
+    """
+    shape, values = update_shape(update)
+    apply = _plan(shape)(*values)
+    apply.update = update
+    apply.fields = frozenset(path.split(".")[0] for path, _, _ in shape)
+    return apply
+
+
+def plan_cache_info():
+    """Hit/miss statistics for the compiled update plan cache"""
+    return _plan.cache_info()